@@ -0,0 +1,50 @@
+// Client for the rental delta stream (smart-contract/nftflex/stream.py).
+//
+// The first message is a snapshot of every rental, then one delta per changed rental carrying
+// only the changed fields. On reconnect the stream resumes after the last applied block.
+
+export type RentalFields = Record<string, string | number | boolean>;
+
+export type RentalStreamMessage =
+    | { type: "snapshot"; block: number; rentals: RentalFields[] }
+    | { type: "delta"; block: number; rentalId: number; changes: RentalFields };
+
+// Messages are handed over in order as they arrive; handlers should apply them synchronously
+// (deferring slow work such as metadata), or a delta can be applied before the snapshot it follows
+export interface RentalStreamHandlers {
+    onSnapshot: (rentals: RentalFields[]) => void;
+    onDelta: (rentalId: number, changes: RentalFields) => void;
+}
+
+export const connectRentalStream = (url: string, handlers: RentalStreamHandlers, retryMs = 2000): (() => void) => {
+    let lastBlock: number | null = null;
+    let socket: WebSocket | null = null;
+    let closed = false;
+
+    const open = () => {
+        // Resume from the block before: the connection may have dropped between two deltas of
+        // the last block, and deltas carry absolute values, so applying one twice is harmless
+        socket = new WebSocket(lastBlock === null ? url : `${url}?fromBlock=${lastBlock - 1}`);
+
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data) as RentalStreamMessage;
+            if (message.type === "snapshot") {
+                handlers.onSnapshot(message.rentals);
+            } else {
+                handlers.onDelta(message.rentalId, message.changes);
+            }
+            lastBlock = message.block;
+        };
+
+        socket.onclose = () => {
+            if (!closed) setTimeout(open, retryMs);
+        };
+    };
+
+    open();
+
+    return () => {
+        closed = true;
+        socket?.close();
+    };
+};
@@ -0,0 +1 @@
+"""Benchmarks for the off-chain NFTFlex services. Run from the smart-contract directory."""
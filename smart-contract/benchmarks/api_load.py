@@ -0,0 +1,156 @@
+# Load test for the rentals HTTP API (nftflex/api.py) over a synthetic marketplace.
+#
+# Serves an index of --rentals rentals with uvicorn in its own process and hits it with --concurrency aiohttp
+# clients for --duration seconds, mixing first pages, deep cursor pages, filtered queries and
+# conditional revalidations. Prints req/s and latency percentiles.
+#
+# Usage: python -m benchmarks.api_load --rentals 100000
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+from typing import List, Tuple
+
+import aiohttp
+import uvicorn
+
+from nftflex.api import create_app
+from nftflex.indexer import ZERO_ADDRESS, Rental, RentalIndex
+
+
+def build_index(count: int, seed: int = 0) -> Tuple[RentalIndex, List[str]]:
+    """An index of `count` random rentals spread over 1,000 owners and two collateral tokens, and the owners."""
+    rng = random.Random(seed)
+    owners = [f"0x{rng.getrandbits(160):040x}" for _ in range(1000)]
+    token = f"0x{rng.getrandbits(160):040x}"
+    now = 1_700_000_000
+
+    rentals = []
+    for rental_id in range(count):
+        rented = rng.random() < 0.3
+        start = now - rng.randrange(0, 86_400) if rented else 0
+        rentals.append(
+            Rental(
+                rentalId=rental_id,
+                nftAddress=token,
+                tokenId=rental_id + 1,
+                owner=rng.choice(owners),
+                renter=owners[rng.randrange(len(owners))] if rented else ZERO_ADDRESS,
+                startTime=start,
+                endTime=start + rng.randrange(1, 72) * 3600 if rented else 0,
+                pricePerHour=rng.randrange(1, 1000) * 10**15,
+                isFractional=False,
+                collateralToken=token if rng.random() < 0.5 else ZERO_ADDRESS,
+                collateralAmount=rng.randrange(0, 10) * 10**18,
+                pendingWithdrawal=rented,
+            )
+        )
+
+    index = RentalIndex()
+    index.apply(rentals, block_number=1, block_hash="0x" + "00" * 32, block_timestamp=now)
+    return index, owners
+
+
+def serve(count: int, port: int) -> None:
+    index, _ = build_index(count)
+    index.query(sort="pricePerHour")  # Build the sort caches before measuring
+    index.query(sort="endTime")
+    uvicorn.run(create_app(index), host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_for_server(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"API did not start on port {port}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def worker(session, base_url: str, owners: List[str], deadline: float, latencies: List[float], statuses: dict):
+    rng = random.Random()
+    etag = None
+    cursor = None
+
+    while time.perf_counter() < deadline:
+        kind = rng.random()
+        headers = {}
+        if kind < 0.3:
+            url = f"{base_url}/rentals?limit=50"
+        elif kind < 0.5:
+            # Walk deeper pages with the cursor of the previous one
+            url = f"{base_url}/rentals?sort=pricePerHour&limit=50" + (f"&cursor={cursor}" if cursor else "")
+        elif kind < 0.7:
+            url = f"{base_url}/rentals?owner={rng.choice(owners)}&limit=20"
+        elif kind < 0.85:
+            url = f"{base_url}/rentals?available=true&sort=endTime&order=desc&minPrice={10**17}&limit=50"
+        else:
+            # Revalidation of a page the client already has
+            url = f"{base_url}/rentals?limit=50"
+            if etag:
+                headers["If-None-Match"] = etag
+
+        start = time.perf_counter()
+        async with session.get(url, headers=headers) as response:
+            body = await response.read()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            etag = response.headers.get("ETag", etag)
+            if "sort=pricePerHour" in url and response.status == 200:
+                cursor = json.loads(body)["nextCursor"]
+
+
+async def run_load(base_url: str, owners: List[str], concurrency: int, duration: float):
+    latencies: List[float] = []
+    statuses: dict = {}
+    deadline = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(worker(session, base_url, owners, deadline, latencies, statuses) for _ in range(concurrency)))
+    return latencies, statuses
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the rentals HTTP API.")
+    parser.add_argument("--rentals", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    # The server runs in its own process so the load generator does not compete for its GIL
+    port = free_port()
+    server = multiprocessing.Process(target=serve, args=(args.rentals, port), daemon=True)
+    server.start()
+    _, owners = build_index(args.rentals)
+    wait_for_server(port)
+    print(f"Serving {args.rentals} rentals on port {port}")
+
+    try:
+        latencies, statuses = asyncio.run(run_load(f"http://127.0.0.1:{port}", owners, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+
+    print(f"{len(latencies)} requests in {args.duration:.0f}s with {args.concurrency} clients")
+    print(f"  throughput: {len(latencies) / args.duration:.0f} req/s")
+    print(f"  latency p50: {percentile(latencies, 50) * 1000:.2f}ms  p99: {percentile(latencies, 99) * 1000:.2f}ms")
+    print(f"  statuses: {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    main()
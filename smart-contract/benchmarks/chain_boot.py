@@ -0,0 +1,59 @@
+# Boot time of the local dev chain: full `ape run deploy` against loading the pre-baked state.
+#
+# Boots anvil both ways through nftflex.chainstate.boot() with a throwaway state directory,
+# registry and ABI directory, and reports each boot until NFTFlex is deployed and seeded.
+# Needs anvil and ape.
+#
+# Usage: python -m benchmarks.chain_boot --rounds 5
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+from nftflex.anvil import anvil_available, stop_anvil
+from nftflex.chainstate import boot
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark booting anvil from a saved state against a full deploy.")
+    parser.add_argument("--port", type=int, default=8645)
+    parser.add_argument("--rounds", type=int, default=5, help="Boots from the saved state")
+    args = parser.parse_args(argv)
+
+    if not anvil_available() or shutil.which("ape") is None:
+        print("Skipped: the boot benchmark needs anvil (Foundry) and ape on PATH")
+        return 0
+
+    directory = tempfile.mkdtemp()
+    state_dir = os.path.join(directory, "state")
+    registry_path = os.path.join(directory, "contract_addresses.json")
+    abi_dir = os.path.join(directory, "abis")
+    try:
+        process, report = boot(args.port, registry_path, state_dir, force_deploy=True, abi_dir=abi_dir)
+        stop_anvil(process)
+        full_boot = report["seconds"]
+        if not os.path.exists(report["path"]):
+            print("The deploy did not save a chain state, nothing to compare")
+            return 1
+
+        state_boots = []
+        for _ in range(args.rounds):
+            process, report = boot(args.port, registry_path, state_dir, abi_dir=abi_dir)
+            stop_anvil(process)
+            assert report["mode"] == "state"
+            state_boots.append(report["seconds"])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    state_boot = statistics.median(state_boots)
+    print(f"\n{'boot':<24}{'seconds':>10}")
+    print(f"{'ape run deploy':<24}{full_boot:>10.2f}")
+    print(f"{'saved state (median)':<24}{state_boot:>10.2f}")
+    print(f"\nBooting from the saved state is {full_boot / state_boot:.0f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
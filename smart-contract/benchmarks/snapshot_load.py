@@ -0,0 +1,99 @@
+# Cold start of a rental index from a columnar snapshot (nftflex/snapshot.py) against parsing a JSON dump.
+#
+# Writes --rentals synthetic rentals both ways, then loads each in a fresh process and reports
+# the time and resident memory until the index answers its first queries: one rental by ID and
+# the first page sorted by price.
+#
+# Usage: python -m benchmarks.snapshot_load --rentals 1000000
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.api_load import build_index
+from nftflex.indexer import Rental, RentalIndex
+from nftflex.snapshot import load_index, write_snapshot
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, in MB."""
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_json(path: str) -> RentalIndex:
+    with open(path, "r") as file:
+        dump = json.load(file)
+    rentals = [
+        Rental(**{**fields, **{key: int(fields[key]) for key in ("tokenId", "pricePerHour", "collateralAmount")}})
+        for fields in dump["rentals"]
+    ]
+    index = RentalIndex()
+    index.apply(rentals, dump["block"], dump["blockHash"], dump["timestamp"])
+    return index
+
+
+def measure(kind: str, path: str, results) -> None:
+    baseline = rss_mb()
+    start = time.perf_counter()
+    index = load_index(path) if kind == "snapshot" else load_json(path)
+    loaded = time.perf_counter() - start
+
+    index.rentals[len(index.rentals) // 2]
+    index.query(sort="pricePerHour", limit=50)
+    first_query = time.perf_counter() - start
+
+    results.put((kind, loaded, first_query, rss_mb() - baseline))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark loading rentals from a snapshot against a JSON dump.")
+    parser.add_argument("--rentals", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    snapshot_path = os.path.join(directory, "rentals.snapshot")
+    json_path = os.path.join(directory, "rentals.json")
+
+    index, _ = build_index(args.rentals)
+    start = time.perf_counter()
+    write_snapshot(snapshot_path, index)
+    print(f"Wrote {args.rentals:,} rentals as a snapshot in {time.perf_counter() - start:.2f}s")
+    with open(json_path, "w") as file:
+        json.dump(
+            {
+                "block": index.block_number,
+                "blockHash": index.block_hash,
+                "timestamp": index.modified_timestamp,
+                "rentals": [rental.to_json() for rental in index.rentals.values()],
+            },
+            file,
+        )
+    del index
+
+    # Each load runs in a fresh process, so neither sees the other's pages or allocations
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    rows = []
+    for kind, path in (("json", json_path), ("snapshot", snapshot_path)):
+        process = context.Process(target=measure, args=(kind, path, results))
+        process.start()
+        rows.append((*results.get(), os.path.getsize(path)))
+        process.join()
+
+    print(f"\n{'format':<12}{'file':>12}{'load':>12}{'first query':>14}{'RSS':>12}")
+    for kind, loaded, first_query, rss, size in rows:
+        print(f"{kind:<12}{size / 2**20:>10.0f}MB{loaded * 1000:>10.1f}ms{first_query * 1000:>12.1f}ms{rss:>10.0f}MB")
+
+    for path in (snapshot_path, json_path):
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
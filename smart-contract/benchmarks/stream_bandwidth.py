@@ -0,0 +1,145 @@
+# Bandwidth of WebSocket deltas (nftflex/stream.py) against the full reloads clients do today.
+#
+# Builds a marketplace of --rentals rentals, serves the stream with uvicorn in this process and
+# plays --actions random rent / extend / end / withdraw actions into the index while a WebSocket
+# client records every frame it receives. The same actions are then priced as full reloads:
+#
+#   json-rpc   client/src/views/HomeView.vue loadRentals(): getRentalCounter + one s_rentals
+#              eth_call per rental, after every action (JSON-RPC bodies only, no HTTP headers)
+#   http api   every page of GET /rentals?limit=200 (nftflex/api.py), after every action
+#
+# Usage: python -m benchmarks.stream_bandwidth --rentals 1000 --actions 500
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import uvicorn
+import websockets
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+
+from benchmarks.api_load import build_index, free_port, wait_for_server
+from nftflex.api import MAX_PAGE_SIZE
+from nftflex.indexer import ZERO_ADDRESS, RentalIndex
+from nftflex.stream import create_app
+
+
+HOUR = 3600
+RENTAL_TYPES = ["address", "uint256", "address", "address", "uint256", "uint256", "uint256", "bool", "address", "uint256", "bool"]
+
+
+def random_actions(index: RentalIndex, count: int, seed: int = 1):
+    """
+    `count` (block, timestamp, rental) updates from renting, extending, ending and withdrawing
+    random rentals. Each one reads the index, so apply it before taking the next.
+    """
+    rng = random.Random(seed)
+    rental_ids = list(index.rentals)
+    renter = f"0x{rng.getrandbits(160):040x}"
+    block = index.block_number
+    now = 1_700_000_000
+
+    for _ in range(count):
+        block += 1
+        now += 12
+        rental = index.rentals[rng.choice(rental_ids)]
+        if rental.renter == ZERO_ADDRESS:
+            hours = rng.randrange(1, 48)
+            update = dict(renter=renter, startTime=now, endTime=now + hours * HOUR, pendingWithdrawal=True)
+        elif rental.pendingWithdrawal and rng.random() < 0.5:
+            update = dict(pendingWithdrawal=False)
+        elif rental.pendingWithdrawal:
+            update = dict(endTime=max(rental.endTime, now) + rng.randrange(1, 24) * HOUR)
+        else:
+            update = dict(renter=ZERO_ADDRESS, startTime=0, endTime=0)
+        yield block, now, type(rental)(**{**rental.__dict__, **update})
+
+
+def json_rpc_reload_bytes(index: RentalIndex) -> int:
+    """Request and response bodies of one loadRentals(): getRentalCounter, then s_rentals(i) for each rental."""
+    def call_bytes(data: str, result: str) -> int:
+        request = {"jsonrpc": "2.0", "id": 1, "method": "eth_call", "params": [{"to": ZERO_ADDRESS, "data": data}, "latest"]}
+        response = {"jsonrpc": "2.0", "id": 1, "result": result}
+        return len(json.dumps(request, separators=(",", ":"))) + len(json.dumps(response, separators=(",", ":")))
+
+    counter_selector = "0x" + function_signature_to_4byte_selector("getRentalCounter()").hex()
+    rentals_selector = "0x" + function_signature_to_4byte_selector("s_rentals(uint256)").hex()
+
+    total = call_bytes(counter_selector, "0x" + encode(["uint256"], [len(index.rentals)]).hex())
+    for rental_id, rental in index.rentals.items():
+        values = list(rental.__dict__.values())[1:]
+        result = "0x" + encode(RENTAL_TYPES, values).hex()
+        total += call_bytes(rentals_selector + encode(["uint256"], [rental_id]).hex(), result)
+    return total
+
+
+def http_reload_bytes(index: RentalIndex) -> int:
+    """Bodies of every page of GET /rentals at the largest page size."""
+    total = 0
+    cursor = None
+    while True:
+        rentals, cursor = index.query(limit=MAX_PAGE_SIZE, cursor=cursor)
+        body = {"block": index.modified_block, "rentals": [rental.to_json() for rental in rentals], "nextCursor": cursor}
+        total += len(json.dumps(body, separators=(",", ":")))
+        if cursor is None:
+            return total
+
+
+async def receive_all(url: str, expected_block: int, frames: list) -> None:
+    async with websockets.connect(url, max_size=None) as websocket:
+        while True:
+            frame = await websocket.recv()
+            frames.append(frame)
+            if json.loads(frame)["block"] == expected_block:
+                return
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare WebSocket delta bandwidth with full reloads.")
+    parser.add_argument("--rentals", type=int, default=1_000)
+    parser.add_argument("--actions", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    index, _ = build_index(args.rentals)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(index), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_server(port)
+
+    frames = []
+    last_block = index.block_number + args.actions
+    client = threading.Thread(
+        target=asyncio.run, args=(receive_all(f"ws://127.0.0.1:{port}/ws", last_block, frames),), daemon=True
+    )
+    client.start()
+    while not frames:
+        time.sleep(0.01)
+    snapshot_bytes = len(frames[0])
+
+    json_rpc_bytes = http_bytes = 0
+    for block, timestamp, rental in random_actions(index, args.actions):
+        index.apply([rental], block, hex(block), timestamp)
+        json_rpc_bytes += json_rpc_reload_bytes(index)
+        http_bytes += http_reload_bytes(index)
+    client.join(timeout=60)
+    server.should_exit = True
+
+    delta_frames = frames[1:]
+    delta_bytes = sum(len(frame) for frame in delta_frames)
+    print(f"{args.actions} actions over {args.rentals} rentals\n")
+    print(f"{'strategy':<22}{'messages':>12}{'bytes':>16}{'bytes/action':>15}{'vs deltas':>11}")
+    rows = [
+        ("websocket deltas", len(delta_frames), delta_bytes),
+        ("json-rpc reloads", args.actions * (args.rentals + 1), json_rpc_bytes),
+        ("http api reloads", args.actions * -(-args.rentals // MAX_PAGE_SIZE), http_bytes),
+    ]
+    for name, messages, total in rows:
+        print(f"{name:<22}{messages:>12}{total:>16,}{total / args.actions:>15,.0f}{total / delta_bytes:>10.0f}x")
+    print(f"\nInitial snapshot: {snapshot_bytes:,} bytes, sent once per connection (not on resume)")
+
+
+if __name__ == "__main__":
+    main()
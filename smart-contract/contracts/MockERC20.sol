@@ -2,11 +2,16 @@
 pragma solidity ^0.8.0;
 
 import {ERC20} from "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import {ERC20Permit} from "@openzeppelin/contracts/token/ERC20/extensions/ERC20Permit.sol";
 
-contract MockERC20 is ERC20 {
+/// @notice ERC20 with EIP-2612 permit so tests can approve through a signature.
+contract MockERC20 is ERC20, ERC20Permit {
     address public owner;
 
-    constructor(string memory name, string memory symbol, uint8 decimals, uint256 initialSupply) ERC20(name, symbol) {
+    constructor(string memory name, string memory symbol, uint8 decimals, uint256 initialSupply)
+        ERC20(name, symbol)
+        ERC20Permit(name)
+    {
         _mint(msg.sender, initialSupply);
         owner = msg.sender;
     }
@@ -16,4 +21,4 @@ contract MockERC20 is ERC20 {
         require(msg.sender == owner, "Only owner can mint tokens");
         _mint(to, amount);
     }
-}
\ No newline at end of file
+}
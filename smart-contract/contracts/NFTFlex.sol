@@ -2,6 +2,7 @@
 pragma solidity ^0.8.24;
 
 import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import {IERC20Permit} from "@openzeppelin/contracts/token/ERC20/extensions/IERC20Permit.sol";
 import {IERC721} from "@openzeppelin/contracts/token/ERC721/IERC721.sol";
 
 // https://docs.soliditylang.org/en/latest/style-guide.html#order-of-layout
@@ -21,10 +22,27 @@ contract NFTFlex {
         bool pendingWithdrawal;
     }
 
+    struct Plan {
+        address owner;
+        address paymentToken; // ERC20 address, or 0x0 for native ETH
+        uint256 pricePerPeriod;
+        uint256 periodHours;
+        uint256 earnings; // Subscription fees not yet withdrawn
+        uint256 activeUntil; // Latest expiry of any subscription
+        bool closed; // Closed plans take no subscriptions and no longer cover their rentals
+    }
+
     // Variables
     mapping(uint256 => Rental) public s_rentals;
+    mapping(uint256 => uint256) private s_earnings; // rentalId => fees paid by the renter and not yet withdrawn
     uint256 private s_rentalCounter;
 
+    mapping(uint256 => Plan) public s_plans;
+    mapping(uint256 => uint256[]) private s_planRentals; // planId => rental IDs covered by the plan
+    mapping(uint256 => uint256) private s_rentalPlan; // rentalId => planId + 1, 0 when the rental is in no plan
+    mapping(uint256 => mapping(address => uint256)) private s_subscriptionEnd; // planId => subscriber => expiry
+    uint256 private s_planCounter;
+
     // Events
     event NFTFlex__RentalCreated(
         uint256 rentalId,
@@ -38,7 +56,14 @@ contract NFTFlex {
         uint256 rentalId, address indexed renter, uint256 startTime, uint256 endTime, uint256 collateralAmount
     );
     event NFTFlex__RentalEnded(uint256 rentalId, address indexed renter);
+    event NFTFlex__RentalExtended(uint256 rentalId, address indexed renter, uint256 endTime, uint256 extraFee);
     event NFTFlex__EarningsWithdrawn(uint256 rentalId, address indexed owner, uint256 amount);
+    event NFTFlex__PlanCreated(
+        uint256 planId, address indexed owner, uint256[] rentalIds, uint256 pricePerPeriod, uint256 periodHours
+    );
+    event NFTFlex__Subscribed(uint256 planId, address indexed subscriber, uint256 endTime, uint256 fee);
+    event NFTFlex__PlanEarningsWithdrawn(uint256 planId, address indexed owner, uint256 amount);
+    event NFTFlex__PlanClosed(uint256 planId, address indexed owner, uint256[] rentalIds);
 
     // Errors
     error NFTFlex__PriceMustBeGreaterThanZero();
@@ -52,10 +77,17 @@ contract NFTFlex {
     error NFTFlex__SenderIsNotOwnerOfTheNFT();
     error NFTFlex__CollateralRefundFailed();
     error NFTFlex__OnlyOwnerCanWithdrawEarnings();
-    error NFTFlex__RentalStillActive();
     error NFTFlex__FailedTransferingETHToOwner();
     error NFTFlex__EarningTransferFailed();
     error NFTFlex__OwnerNeedToWithdrawEarnings();
+    error NFTFlex__OnlyRenterCanExtendRental();
+    error NFTFlex__PermitRequiresERC20Collateral();
+    error NFTFlex__PlanMustIncludeRentals();
+    error NFTFlex__RentalAlreadyInPlan();
+    error NFTFlex__PlanDoesNotExist();
+    error NFTFlex__RentalInPlan();
+    error NFTFlex__PlanIsClosed();
+    error NFTFlex__PlanHasActiveSubscriptions();
 
     string a_new_var = "10";
 
@@ -110,6 +142,43 @@ contract NFTFlex {
      * @param _duration Number of hours to rent the NFT.
      */
     function rentNFT(uint256 _rentalId, uint256 _duration) external payable {
+        _rentNFT(_rentalId, _duration);
+    }
+
+    /**
+     * @dev Same as `rentNFT` for ERC-20 collateral, but approves the contract through an
+     * EIP-2612 permit signature so the renter does not need a separate `approve` transaction.
+     * The permit must cover `pricePerHour * _duration + collateralAmount`.
+     * @param _rentalId ID of the rental to rent.
+     * @param _duration Number of hours to rent the NFT.
+     * @param _deadline Timestamp until which the permit signature is valid.
+     * @param _v Recovery byte of the permit signature.
+     * @param _r First 32 bytes of the permit signature.
+     * @param _s Second 32 bytes of the permit signature.
+     */
+    function rentNFTWithPermit(uint256 _rentalId, uint256 _duration, uint256 _deadline, uint8 _v, bytes32 _r, bytes32 _s)
+        external
+    {
+        Rental storage rental = s_rentals[_rentalId];
+
+        if (rental.owner == address(0)) {
+            revert NFTFlex__RentalDoesNotExist();
+        }
+        if (rental.collateralToken == address(0)) {
+            revert NFTFlex__PermitRequiresERC20Collateral();
+        }
+
+        uint256 amount = rental.pricePerHour * _duration + rental.collateralAmount;
+
+        // A permit that was front-run (nonce already used) still leaves the allowance in place,
+        // so only the transfer below decides whether the rental can go ahead.
+        try IERC20Permit(rental.collateralToken).permit(msg.sender, address(this), amount, _deadline, _v, _r, _s) {} catch {}
+
+        _rentNFT(_rentalId, _duration);
+    }
+
+    /// @dev Shared body of `rentNFT` and `rentNFTWithPermit`.
+    function _rentNFT(uint256 _rentalId, uint256 _duration) internal {
         Rental storage rental = s_rentals[_rentalId];
 
         if (rental.owner == address(0)) {
@@ -121,6 +190,9 @@ contract NFTFlex {
         if (_duration == 0) {
             revert NFTFlex__DurationMustBeGreaterThanZero(); // ✅ Fixes invalid duration check
         }
+        if (s_rentalPlan[_rentalId] != 0) {
+            revert NFTFlex__RentalInPlan(); // Plan rentals are shared by subscribers, never rented exclusively
+        }
 
         uint256 collateral = rental.collateralAmount;
         uint256 totalPrice = rental.pricePerHour * _duration;
@@ -148,10 +220,55 @@ contract NFTFlex {
         rental.startTime = block.timestamp;
         rental.endTime = block.timestamp + (_duration * 1 hours); // Permanent hours
         rental.pendingWithdrawal = true;
+        s_earnings[_rentalId] += totalPrice;
 
         emit NFTFlex__RentalStarted(_rentalId, msg.sender, rental.startTime, rental.endTime, collateral);
     }
 
+    /**
+     * @dev Allows the current renter to keep the NFT longer without ending and re-renting it.
+     * Only the fee for the extra hours is charged; the collateral stays in the contract and
+     * the fee is added to the owner's withdrawable earnings.
+     * @param _rentalId ID of the rental to extend.
+     * @param _extraHours Number of hours to add to the rental.
+     */
+    function extendRental(uint256 _rentalId, uint256 _extraHours) external payable {
+        Rental storage rental = s_rentals[_rentalId];
+
+        if (rental.owner == address(0)) {
+            revert NFTFlex__RentalDoesNotExist();
+        }
+        if (msg.sender != rental.renter) {
+            revert NFTFlex__OnlyRenterCanExtendRental();
+        }
+        if (_extraHours == 0) {
+            revert NFTFlex__DurationMustBeGreaterThanZero();
+        }
+
+        uint256 extraFee = rental.pricePerHour * _extraHours;
+
+        if (rental.collateralToken == address(0)) {
+            if (msg.value != extraFee) {
+                revert NFTFlex__IncorrectPaymentAmount();
+            }
+        } else {
+            if (msg.value != 0) {
+                revert NFTFlex__IncorrectPaymentAmount();
+            }
+            if (!IERC20(rental.collateralToken).transferFrom(msg.sender, address(this), extraFee)) {
+                revert NFTFlex__CollateralTransferFailed();
+            }
+        }
+
+        // An expired rental is extended from now, so the renter never pays for hours already gone
+        uint256 extendFrom = rental.endTime > block.timestamp ? rental.endTime : block.timestamp;
+        rental.endTime = extendFrom + (_extraHours * 1 hours);
+        rental.pendingWithdrawal = true;
+        s_earnings[_rentalId] += extraFee;
+
+        emit NFTFlex__RentalExtended(_rentalId, msg.sender, rental.endTime, extraFee);
+    }
+
     /**
      * @dev Allows ther renter to end the rental and return tyhe NFT.
      * Collateral is refunded if all conditions are met.
@@ -202,12 +319,14 @@ contract NFTFlex {
      * @dev Allows the owner to withdraw earnings from the rental.
      * @param _rentalId ID of the rental to withdraw earnings for.
      *
-     * @dev Allows the owner of an NFT rental to withdraw earnings after the rental period has ended.
-     * The earnings are calculated based on the rental duration and price per hour.
+     * @dev Allows the owner of an NFT rental to withdraw the earnings accrued so far.
+     * The earnings are the rental and extension fees paid since the last withdrawal. Fees are
+     * prepaid, so they can be withdrawn while the rental is still active; only `endRental`
+     * waits for the rental period to end.
      *
      * Requirements:
      * - Only the owner of the NFT rental can withdraw earnings.
-     * - The rental must have been completed (i.e., there must be a renter, and the rental period should have ended).
+     * - There must be fees paid since the last withdrawal.
      * - Transfers earnings in either native ETH or ERC-20 tokens based on the collateral type.
      *
      * @param _rentalId ID of the rental for which earnings need to be withdrawn.
@@ -221,19 +340,18 @@ contract NFTFlex {
             revert NFTFlex__OnlyOwnerCanWithdrawEarnings();
         }
 
-        // Ensure that the rental has ended before withdrawing earnings
-        if (rental.renter == address(0) || block.timestamp < rental.endTime) {
-            revert NFTFlex__RentalStillActive();
-        }
-
-        // Calculate total earnings: price per hour * number of hours rented
-        uint256 totalEarnings = rental.pricePerHour * ((rental.endTime - rental.startTime) / 1 hours); // Permanent hours
+        // Total earnings: every rental and extension fee paid since the last withdrawal
+        uint256 totalEarnings = s_earnings[_rentalId];
 
         // Ensure there are earnings to withdraw
         if (totalEarnings == 0) {
             revert NFTFlex__EarningTransferFailed();
         }
 
+        // Reset rental earnings and pendingWithdrawal flag before paying out
+        s_earnings[_rentalId] = 0;
+        rental.pendingWithdrawal = false; // Reset the flag
+
         // Handle payment transfer logic based on the collateral type (ETH or ERC-20)
         if (rental.collateralToken == address(0)) {
             // Transfer earnings in ETH to the NFT owner
@@ -249,16 +367,221 @@ contract NFTFlex {
             }
         }
 
-        // Reset rental earnings and pendingWithdrawal flag
-        rental.pricePerHour = 0;
-        rental.pendingWithdrawal = false; // Reset the flag
-
         emit NFTFlex__EarningsWithdrawn(_rentalId, msg.sender, totalEarnings);
     }
 
+    /**
+     * @dev Allows a rental owner to bundle several of their rentals into a subscription plan.
+     * Subscribers pay `_pricePerPeriod` per period and get access to every rental in the plan.
+     * A rental can belong to one plan only, must not be rented at the time, and can no longer
+     * be rented through `rentNFT` while it is in a plan, so access is never exclusive and shared
+     * at the same time. `closePlan` releases the rentals once the subscriptions have expired.
+     * @param _rentalIds Rentals covered by the plan; all must be owned by the sender.
+     * @param _paymentToken Token address for payment (ERC20), or 0x0 for native ETH.
+     * @param _pricePerPeriod Subscription price per period.
+     * @param _periodHours Length of one period in hours (e.g. 720 for a 30-day plan).
+     */
+    function createPlan(
+        uint256[] calldata _rentalIds,
+        address _paymentToken,
+        uint256 _pricePerPeriod,
+        uint256 _periodHours
+    ) external {
+        if (_rentalIds.length == 0) {
+            revert NFTFlex__PlanMustIncludeRentals();
+        }
+        if (_pricePerPeriod == 0) {
+            revert NFTFlex__PriceMustBeGreaterThanZero();
+        }
+        if (_periodHours == 0) {
+            revert NFTFlex__DurationMustBeGreaterThanZero();
+        }
+
+        uint256 planId = s_planCounter;
+
+        // Plan membership is written once here so that subscribing never touches per-rental storage
+        for (uint256 i = 0; i < _rentalIds.length; i++) {
+            uint256 rentalId = _rentalIds[i];
+            if (s_rentals[rentalId].owner != msg.sender) {
+                revert NFTFlex__SenderIsNotOwnerOfTheNFT();
+            }
+            if (s_rentalPlan[rentalId] != 0) {
+                revert NFTFlex__RentalAlreadyInPlan();
+            }
+            if (s_rentals[rentalId].renter != address(0)) {
+                revert NFTFlex__NFTAlreadyRented();
+            }
+            s_rentalPlan[rentalId] = planId + 1;
+        }
+
+        s_plans[planId] = Plan({
+            owner: msg.sender,
+            paymentToken: _paymentToken,
+            pricePerPeriod: _pricePerPeriod,
+            periodHours: _periodHours,
+            earnings: 0,
+            activeUntil: 0,
+            closed: false
+        });
+        s_planRentals[planId] = _rentalIds;
+
+        emit NFTFlex__PlanCreated(planId, msg.sender, _rentalIds, _pricePerPeriod, _periodHours);
+
+        s_planCounter++;
+    }
+
+    /**
+     * @dev Subscribes the sender to a plan for a number of periods, granting access to every
+     * rental in the plan in a single payment. Subscribing again while active extends the expiry.
+     * @param _planId ID of the plan.
+     * @param _periods Number of periods to pay for.
+     */
+    function subscribe(uint256 _planId, uint256 _periods) external payable {
+        Plan storage plan = s_plans[_planId];
+
+        if (plan.owner == address(0)) {
+            revert NFTFlex__PlanDoesNotExist();
+        }
+        if (plan.closed) {
+            revert NFTFlex__PlanIsClosed();
+        }
+        if (_periods == 0) {
+            revert NFTFlex__DurationMustBeGreaterThanZero();
+        }
+
+        uint256 fee = plan.pricePerPeriod * _periods;
+
+        if (plan.paymentToken == address(0)) {
+            if (msg.value != fee) {
+                revert NFTFlex__IncorrectPaymentAmount();
+            }
+        } else {
+            if (msg.value != 0) {
+                revert NFTFlex__IncorrectPaymentAmount();
+            }
+            if (!IERC20(plan.paymentToken).transferFrom(msg.sender, address(this), fee)) {
+                revert NFTFlex__CollateralTransferFailed();
+            }
+        }
+
+        uint256 currentEnd = s_subscriptionEnd[_planId][msg.sender];
+        uint256 extendFrom = currentEnd > block.timestamp ? currentEnd : block.timestamp;
+        uint256 endTime = extendFrom + (_periods * plan.periodHours * 1 hours);
+
+        s_subscriptionEnd[_planId][msg.sender] = endTime;
+        if (endTime > plan.activeUntil) {
+            plan.activeUntil = endTime;
+        }
+        plan.earnings += fee;
+
+        emit NFTFlex__Subscribed(_planId, msg.sender, endTime, fee);
+    }
+
+    /**
+     * @dev Allows the plan owner to close a plan once every subscription to it has expired.
+     * The plan's rentals leave it and can be rented individually (or join another plan) again;
+     * fees not yet withdrawn stay withdrawable.
+     * @param _planId ID of the plan.
+     */
+    function closePlan(uint256 _planId) external {
+        Plan storage plan = s_plans[_planId];
+
+        if (msg.sender != plan.owner) {
+            revert NFTFlex__SenderIsNotOwnerOfTheNFT();
+        }
+        if (plan.closed) {
+            revert NFTFlex__PlanIsClosed();
+        }
+        if (block.timestamp < plan.activeUntil) {
+            revert NFTFlex__PlanHasActiveSubscriptions();
+        }
+
+        plan.closed = true;
+        uint256[] storage rentalIds = s_planRentals[_planId];
+        for (uint256 i = 0; i < rentalIds.length; i++) {
+            delete s_rentalPlan[rentalIds[i]];
+        }
+
+        emit NFTFlex__PlanClosed(_planId, msg.sender, rentalIds);
+    }
+
+    /**
+     * @dev Allows the plan owner to withdraw the subscription fees collected so far.
+     * @param _planId ID of the plan.
+     */
+    function withdrawPlanEarnings(uint256 _planId) external {
+        Plan storage plan = s_plans[_planId];
+
+        if (msg.sender != plan.owner) {
+            revert NFTFlex__OnlyOwnerCanWithdrawEarnings();
+        }
+
+        uint256 amount = plan.earnings;
+        if (amount == 0) {
+            revert NFTFlex__EarningTransferFailed();
+        }
+        plan.earnings = 0;
+
+        if (plan.paymentToken == address(0)) {
+            (bool success,) = plan.owner.call{value: amount}("");
+            if (!success) {
+                revert NFTFlex__FailedTransferingETHToOwner();
+            }
+        } else {
+            if (!IERC20(plan.paymentToken).transfer(plan.owner, amount)) {
+                revert NFTFlex__EarningTransferFailed();
+            }
+        }
+
+        emit NFTFlex__PlanEarningsWithdrawn(_planId, msg.sender, amount);
+    }
+
+    /**
+     * @dev Returns whether `_user` currently has access to a rental, either as its renter
+     * or through an active subscription to the plan that covers it. A rental has a renter or
+     * a plan, never both. Constant time.
+     * @param _rentalId ID of the rental.
+     * @param _user Address to check.
+     */
+    function hasAccess(uint256 _rentalId, address _user) external view returns (bool) {
+        Rental storage rental = s_rentals[_rentalId];
+        if (rental.renter == _user && _user != address(0) && block.timestamp < rental.endTime) {
+            return true;
+        }
+
+        uint256 planRef = s_rentalPlan[_rentalId];
+        return planRef != 0 && s_subscriptionEnd[planRef - 1][_user] > block.timestamp;
+    }
+
+    /**
+     * @dev Returns when `_subscriber`'s access to a plan expires (0 if never subscribed).
+     */
+    function getSubscriptionEnd(uint256 _planId, address _subscriber) external view returns (uint256) {
+        return s_subscriptionEnd[_planId][_subscriber];
+    }
+
+    /**
+     * @dev Returns the rental IDs covered by a plan.
+     */
+    function getPlanRentals(uint256 _planId) external view returns (uint256[] memory) {
+        return s_planRentals[_planId];
+    }
+
+    function getPlanCounter() external view returns (uint256) {
+        return s_planCounter;
+    }
+
     // Neet to test
     // Add this function to your contract
     function getRentalCounter() external view returns (uint256) {
         return s_rentalCounter;
     }
+
+    /**
+     * @dev Returns the fees the owner can currently withdraw for a rental.
+     * @param _rentalId ID of the rental.
+     */
+    function getPendingEarnings(uint256 _rentalId) external view returns (uint256) {
+        return s_earnings[_rentalId];
+    }
 }
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Python tooling shared by the NFTFlex scripts, tests and off-chain services.
+"""
@@ -0,0 +1,60 @@
+# Starts and stops local anvil nodes (Foundry) for scripts and tests.
+import shutil
+import subprocess
+import time
+from typing import List, Optional
+
+import requests
+
+from nftflex.seed import mnemonic
+
+
+def anvil_available() -> bool:
+    return shutil.which("anvil") is not None
+
+
+def start_anvil(
+    port: int,
+    chain_id: int = 31337,
+    extra_args: Optional[List[str]] = None,
+    timeout: float = 30.0,
+) -> subprocess.Popen:
+    """
+    Start anvil with the project mnemonic and wait until its RPC answers.
+
+    Args:
+        port (int): Port to listen on.
+        chain_id (int): Chain ID reported by the node.
+        extra_args (Optional[List[str]]): Extra anvil arguments, e.g. `["--load-state", path]`.
+        timeout (float): Seconds to wait for the RPC to come up.
+
+    Returns:
+        subprocess.Popen: The running anvil process; stop it with `stop_anvil`.
+    """
+    process = subprocess.Popen(
+        ["anvil", "--port", str(port), "--chain-id", str(chain_id), "--mnemonic", mnemonic, *(extra_args or [])],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"anvil exited with code {process.returncode} on port {port}")
+        try:
+            requests.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []}, timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.05)
+
+    stop_anvil(process)
+    raise TimeoutError(f"anvil did not start on port {port} within {timeout}s")
+
+
+def stop_anvil(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
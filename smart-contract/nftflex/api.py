@@ -0,0 +1,301 @@
+# HTTP API serving NFTFlex rentals from a locally indexed view of the chain.
+#
+#   GET /rentals?sort=pricePerHour&order=desc&limit=50&cursor=...&owner=0x..&available=true
+#               &collateralToken=0x..&minPrice=..&maxPrice=..
+#   GET /rentals/{rentalId}
+#   GET /status
+#
+# Responses carry an ETag and Last-Modified for the last block that changed any rental, so
+# clients revalidating an unchanged page get a 304 without a body.
+#
+# Usage: python -m nftflex.api --rpc-url http://127.0.0.1:8545
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from web3 import Web3
+
+from nftflex import instrumentation
+from nftflex.indexer import SORT_KEYS, ChainIndexer, RentalIndex, decode_cursor
+from nftflex.registry import load_registry
+from nftflex.snapshot import resume_indexer, write_snapshot
+
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MAX_PAGE_SIZE = 200
+MAX_CACHED_PAGES = 1024
+SNAPSHOT_EVERY = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _int_param(request: Request, name: str) -> Optional[int]:
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+def _bool_param(request: Request, name: str) -> Optional[bool]:
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    if value not in ("true", "false"):
+        raise BadRequest(f"{name} must be true or false")
+    return value == "true"
+
+
+def _not_modified(request: Request, etag: str, modified_timestamp: int) -> bool:
+    """Evaluates If-None-Match, or If-Modified-Since when no ETag was sent (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return modified_timestamp <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+class PageCache:
+    """Serialized response bodies of the current `modified_block`, least recently used evicted first."""
+
+    def __init__(self, max_pages: int = MAX_CACHED_PAGES):
+        self.max_pages = max_pages
+        self.block = None
+        self.pages: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, block: int, key: str, build_body) -> bytes:
+        with self._lock:
+            if block != self.block:
+                self.block = block
+                self.pages.clear()
+            body = self.pages.get(key)
+            if body is not None:
+                self.pages.move_to_end(key)
+                return body
+
+        body = json.dumps(build_body(), separators=(",", ":")).encode()
+        with self._lock:
+            if block == self.block:
+                self.pages[key] = body
+                if len(self.pages) > self.max_pages:
+                    self.pages.popitem(last=False)
+        return body
+
+
+def _cached_json(request: Request, index: RentalIndex, cache: PageCache, build_body) -> Response:
+    """Returns 304 when the client's copy is current, otherwise the JSON body from `build_body()`."""
+    # Read once: the sync thread may move the index on while this request is served
+    block, timestamp = index.modified_block, index.modified_timestamp
+    etag = f'"{block}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(timestamp, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if _not_modified(request, etag, timestamp):
+        return Response(status_code=304, headers=headers)
+
+    key = request.url.path + "?" + str(request.query_params)
+    body = cache.get_or_build(block, key, build_body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def create_app(
+    index: RentalIndex,
+    indexer: Optional[ChainIndexer] = None,
+    poll_interval: float = 2.0,
+    snapshot_path: Optional[str] = None,
+    snapshot_every: int = SNAPSHOT_EVERY,
+) -> Starlette:
+    """
+    Build the API app over `index`. When an `indexer` is given it is synced in a background
+    thread for as long as the app runs, writing a snapshot to `snapshot_path` (if set) every
+    `snapshot_every` blocks.
+    """
+    cache = PageCache()
+
+    async def list_rentals(request: Request) -> Response:
+        try:
+            sort = request.query_params.get("sort", "rentalId")
+            if sort not in SORT_KEYS:
+                raise BadRequest(f"sort must be one of {', '.join(SORT_KEYS)}")
+            order = request.query_params.get("order", "asc")
+            if order not in ("asc", "desc"):
+                raise BadRequest("order must be asc or desc")
+            limit = _int_param(request, "limit")
+            limit = 50 if limit is None else limit
+            if not 0 < limit <= MAX_PAGE_SIZE:
+                raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+            query = dict(
+                sort=sort,
+                descending=order == "desc",
+                limit=limit,
+                cursor=request.query_params.get("cursor"),
+                owner=request.query_params.get("owner"),
+                collateral_token=request.query_params.get("collateralToken"),
+                available=_bool_param(request, "available"),
+                min_price=_int_param(request, "minPrice"),
+                max_price=_int_param(request, "maxPrice"),
+            )
+            if query["cursor"]:
+                try:
+                    decode_cursor(query["cursor"])
+                except ValueError:
+                    raise BadRequest("invalid cursor")
+        except BadRequest as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        def build_body():
+            rentals, next_cursor = index.query(**query)
+            return {
+                "block": index.modified_block,
+                "rentals": [rental.to_json() for rental in rentals],
+                "nextCursor": next_cursor,
+            }
+
+        return _cached_json(request, index, cache, build_body)
+
+    async def get_rental(request: Request) -> Response:
+        rental = index.rentals.get(request.path_params["rental_id"])
+        if rental is None:
+            return JSONResponse({"error": "rental not found"}, status_code=404)
+        return _cached_json(request, index, cache, lambda: {"block": index.modified_block, "rental": rental.to_json()})
+
+    async def status(request: Request) -> Response:
+        return JSONResponse(
+            {
+                "blockNumber": index.block_number,
+                "blockHash": index.block_hash,
+                "modifiedBlock": index.modified_block,
+                "rentals": len(index.rentals),
+            }
+        )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        stop = threading.Event()
+        if indexer is not None:
+            threading.Thread(
+                target=run_sync_loop, args=(indexer, poll_interval, stop, snapshot_path, snapshot_every), daemon=True
+            ).start()
+        yield
+        stop.set()
+
+    return Starlette(
+        routes=[
+            Route("/rentals", list_rentals),
+            Route("/rentals/{rental_id:int}", get_rental),
+            Route("/status", status),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def run_sync_loop(
+    indexer: ChainIndexer,
+    poll_interval: float,
+    stop: threading.Event,
+    snapshot_path: Optional[str] = None,
+    snapshot_every: int = SNAPSHOT_EVERY,
+) -> None:
+    """
+    Sync the indexer every `poll_interval` seconds until `stop` is set. With a `snapshot_path`, a
+    snapshot is written after the first sync and then whenever the index has moved
+    `snapshot_every` blocks past the last one.
+    """
+    snapshot_block = None
+    while not stop.is_set():
+        try:
+            changed = indexer.sync()
+            if changed:
+                print(f"Indexed {len(changed)} changed rentals up to block {indexer.index.block_number}")
+            if snapshot_path and (snapshot_block is None or indexer.index.block_number - snapshot_block >= snapshot_every):
+                write_snapshot(snapshot_path, indexer.index)
+                snapshot_block = indexer.index.block_number
+                print(f"Wrote snapshot at block {snapshot_block} to {snapshot_path}")
+        except Exception as e:
+            print(f"Sync failed: {e}")
+        stop.wait(poll_interval)
+
+
+def build_indexer(
+    rpc_url: str,
+    registry_path: str,
+    abi_path: str,
+    snapshot_path: Optional[str] = None,
+    start_block: Optional[int] = None,
+) -> ChainIndexer:
+    """
+    Connect to `rpc_url` and index the NFTFlex address registered for its chain ID, starting
+    from the snapshot at `snapshot_path` when there is one. Without a snapshot, indexing starts
+    at `start_block`, or at the deploy block the registry records for the chain (genesis if none).
+    """
+    w3 = instrumentation.instrument(Web3(Web3.HTTPProvider(rpc_url)))
+    chain_id = str(w3.eth.chain_id)
+    registry = load_registry(registry_path)
+    if chain_id not in registry:
+        raise SystemExit(f"No NFTFlex address for chain {chain_id} in {registry_path}")
+
+    with open(abi_path, "r") as file:
+        abi = json.load(file)
+
+    entry = registry[chain_id]
+    if start_block is None:
+        start_block = entry.get("NFTFlexDeployBlock", 0)
+
+    if snapshot_path:
+        return resume_indexer(w3, entry["NFTFlex"], abi, snapshot_path, start_block=start_block)
+    return ChainIndexer(w3, entry["NFTFlex"], abi, start_block=start_block)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve NFTFlex rentals over HTTP.")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8545")
+    parser.add_argument("--registry", default=os.path.join(PROJECT_DIR, "contract_addresses.json"))
+    parser.add_argument("--abi", default=os.path.join(PROJECT_DIR, "abis", "NFTFlex_ABI.json"))
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--snapshot", help="Columnar snapshot to start from and keep up to date")
+    parser.add_argument("--snapshot-every", type=int, default=SNAPSHOT_EVERY, help="Blocks between snapshots")
+    parser.add_argument("--start-block", type=int, help="First block to index; defaults to the registered deploy block")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    instrumentation.from_env()
+
+    indexer = build_indexer(args.rpc_url, args.registry, args.abi, args.snapshot, args.start_block)
+    start = time.perf_counter()
+    indexer.sync()
+    print(f"Indexed {len(indexer.index.rentals)} rentals up to block {indexer.index.block_number} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    app = create_app(indexer.index, indexer, args.poll_interval, args.snapshot, args.snapshot_every)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
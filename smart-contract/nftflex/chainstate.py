@@ -0,0 +1,234 @@
+# Pre-baked local chain state: boot anvil with NFTFlex deployed and seeded, without redeploying.
+#
+# scripts/deploy.py dumps the seeded anvil chain (contracts, minted NFTs, listings, funded
+# accounts) to .chain-state/anvil-state-v<format>-<key>.json. The key hashes the contract
+# sources, ape-config.yaml, the seed data and the deploy script, so any change to what would be
+# deployed selects a new file. Booting loads a matching file into a fresh anvil and only falls
+# back to `ape run deploy` (which writes the file for next time) when there is none, or when it
+# cannot be loaded. The file also carries the contract ABIs, which booting writes to abis/ as
+# deploy.py would.
+#
+# Usage: python -m nftflex.chainstate --port 8545
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from nftflex.anvil import start_anvil, stop_anvil
+from nftflex.registry import update_registry
+
+
+PROJECT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# The NFTFLEX_* variables let boot() point the deploy.py it runs at its own state directory,
+# registry and ABI directory
+STATE_DIR = os.environ.get("NFTFLEX_STATE_DIR", os.path.join(PROJECT_DIR, ".chain-state"))
+REGISTRY_PATH = os.environ.get("NFTFLEX_REGISTRY", os.path.join(PROJECT_DIR, "contract_addresses.json"))
+ABI_DIR = os.environ.get("NFTFLEX_ABI_DIR", os.path.join(PROJECT_DIR, "abis"))
+STATE_FORMAT = 2
+# Everything that decides what deploy.py leaves on chain, relative to the project directory
+STATE_INPUTS = ("contracts/*.sol", "ape-config.yaml", "nftflex/seed.py", "scripts/deploy.py")
+
+
+def state_key(project_dir: str = PROJECT_DIR) -> str:
+    """Hash of the contract sources and seed data a pre-baked state was built from."""
+    digest = hashlib.sha256(f"format {STATE_FORMAT}\n".encode())
+    paths = sorted(path for pattern in STATE_INPUTS for path in glob.glob(os.path.join(project_dir, pattern)))
+    for path in paths:
+        digest.update(os.path.relpath(path, project_dir).replace(os.sep, "/").encode() + b"\0")
+        with open(path, "rb") as file:
+            digest.update(file.read())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def state_path(key: str, state_dir: str = STATE_DIR) -> str:
+    return os.path.join(state_dir, f"anvil-state-v{STATE_FORMAT}-{key}.json")
+
+
+def rpc(url: str, method: str, params: Optional[List[Any]] = None, timeout: float = 60.0) -> Any:
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}
+    body = requests.post(url, json=payload, timeout=timeout).json()
+    if "error" in body:
+        raise RuntimeError(f"{method} failed: {body['error']}")
+    return body["result"]
+
+
+def is_anvil(w3) -> bool:
+    try:
+        return w3.client_version.lower().startswith("anvil")
+    except Exception:
+        return False
+
+
+def save_abis(abis: Dict[str, List[Dict[str, Any]]], abi_dir: str = ABI_DIR) -> None:
+    """Write each ABI to `<abi_dir>/<contract>_ABI.json`, the files deploy.py's save_abi writes."""
+    os.makedirs(abi_dir, exist_ok=True)
+    for contract_name, abi in abis.items():
+        with open(os.path.join(abi_dir, f"{contract_name}_ABI.json"), "w") as file:
+            json.dump(abi, file, indent=4)
+
+
+def save_state(
+    w3,
+    contracts: Dict[str, Any],
+    abis: Dict[str, List[Dict[str, Any]]],
+    deploy_seconds: float,
+    state_dir: str = STATE_DIR,
+) -> str:
+    """
+    Dump the chain `w3` is connected to (an anvil node) into the state file for the current
+    sources, and remove the files of older keys.
+
+    Args:
+        w3: web3 connected to the freshly seeded anvil.
+        contracts (Dict[str, Any]): The registry entry deploy.py wrote for this chain.
+        abis (Dict[str, List[Dict[str, Any]]]): Contract name => ABI of the deployed contracts.
+        deploy_seconds (float): How long the deployment took, reported when the state is loaded.
+
+    Returns:
+        str: Path of the state file.
+    """
+    key = state_key()
+    path = state_path(key, state_dir)
+    state = w3.provider.make_request("anvil_dumpState", [])["result"]
+
+    os.makedirs(state_dir, exist_ok=True)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(
+            {
+                "format": STATE_FORMAT,
+                "key": key,
+                "chainId": w3.eth.chain_id,
+                "blockNumber": w3.eth.block_number,
+                "contracts": contracts,
+                "abis": abis,
+                "deploySeconds": round(deploy_seconds, 3),
+                "state": state,
+            },
+            file,
+        )
+    os.replace(f"{path}.tmp", path)
+
+    for stale in glob.glob(os.path.join(state_dir, "anvil-state-*.json")):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def load_state(url: str, path: str) -> Dict[str, Any]:
+    """
+    Load a state file into the anvil node at `url`.
+
+    Returns:
+        Dict[str, Any]: The file's metadata (everything but the state itself).
+    """
+    with open(path, "r") as file:
+        saved = json.load(file)
+
+    chain_id = int(rpc(url, "eth_chainId"), 16)
+    if chain_id != saved["chainId"]:
+        raise RuntimeError(f"{path} was dumped from chain {saved['chainId']}, the node is chain {chain_id}")
+    rpc(url, "anvil_loadState", [saved.pop("state")])
+    return saved
+
+
+def boot(
+    port: int = 8545,
+    registry_path: str = REGISTRY_PATH,
+    state_dir: str = STATE_DIR,
+    force_deploy: bool = False,
+    abi_dir: str = ABI_DIR,
+) -> Tuple[subprocess.Popen, Dict[str, Any]]:
+    """
+    Start anvil on `port` with NFTFlex deployed and seeded: from the pre-baked state when one
+    matches the current sources, otherwise by running scripts/deploy.py against it. A state file
+    that cannot be loaded is deleted and a fresh anvil deployed to instead. Either way the
+    registry and `abi_dir` end up describing the contracts on the chain.
+
+    Returns:
+        Tuple[subprocess.Popen, Dict[str, Any]]: The anvil process and a boot report with `mode`
+        ("state" or "deploy") and `seconds`; for "state" also the metadata of the file, including
+        `bootSeconds`, how long the full boot it replaces took.
+    """
+    start = time.perf_counter()
+    path = state_path(state_key(), state_dir)
+    url = f"http://127.0.0.1:{port}"
+    process = start_anvil(port)
+
+    try:
+        if os.path.exists(path) and not force_deploy:
+            try:
+                saved = load_state(url, path)
+                update_registry(registry_path, {saved["chainId"]: saved["contracts"]})
+                save_abis(saved.pop("abis"), abi_dir)
+                return process, {"mode": "state", "path": path, "seconds": time.perf_counter() - start, **saved}
+            except Exception as e:
+                # Corrupt, cut short, or dumped by an anvil that cannot read it back. The load may
+                # have got halfway, so the deploy gets a fresh node
+                print(f"Cannot boot from {path} ({e}), deploying instead")
+                os.remove(path)
+                stop_anvil(process)
+                process = start_anvil(port)
+
+        subprocess.run(
+            ["ape", "run", "deploy", "--network", f"ethereum:local:{url}"],
+            cwd=PROJECT_DIR,
+            env={
+                **os.environ,
+                "NFTFLEX_STATE_DIR": os.path.abspath(state_dir),
+                "NFTFLEX_REGISTRY": os.path.abspath(registry_path),
+                "NFTFLEX_ABI_DIR": os.path.abspath(abi_dir),
+            },
+            check=True,
+        )
+        seconds = time.perf_counter() - start
+        if os.path.exists(path):
+            # Kept with the state, so booting from it can report what it saved
+            with open(path, "r") as file:
+                saved = json.load(file)
+            saved["bootSeconds"] = round(seconds, 3)
+            with open(f"{path}.tmp", "w") as file:
+                json.dump(saved, file)
+            os.replace(f"{path}.tmp", path)
+        return process, {"mode": "deploy", "path": path, "seconds": seconds}
+    except BaseException:
+        stop_anvil(process)
+        raise
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Boot a local anvil chain with NFTFlex deployed and seeded.")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    parser.add_argument("--abi-dir", default=ABI_DIR)
+    parser.add_argument("--force-deploy", action="store_true", help="Deploy even if a matching state exists")
+    args = parser.parse_args(argv)
+
+    process, report = boot(args.port, args.registry, args.state_dir, args.force_deploy, args.abi_dir)
+    if report["mode"] == "state":
+        full_boot = report.get("bootSeconds", report["deploySeconds"])
+        print(f"Booted from {os.path.relpath(report['path'])} in {report['seconds']:.2f}s (block {report['blockNumber']})")
+        print(f"  a full boot with `ape run deploy` took {full_boot:.2f}s, {full_boot / report['seconds']:.0f}x longer")
+    else:
+        print(f"Booted with a full deploy in {report['seconds']:.2f}s")
+        if os.path.exists(report["path"]):
+            print(f"  state saved to {os.path.relpath(report['path'])}; the next boot loads it instead")
+
+    print(f"anvil is listening on http://127.0.0.1:{args.port}, Ctrl+C to stop")
+    try:
+        process.wait()
+    except KeyboardInterrupt:
+        stop_anvil(process)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
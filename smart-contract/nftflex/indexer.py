@@ -0,0 +1,360 @@
+# Local, queryable view of every NFTFlex rental, kept in sync from contract events.
+#
+# Events only say *which* rentals changed (NFTFlex__RentalCreated does not even carry the
+# collateral), so each sync reads the changed rentals from `s_rentals` at the synced block.
+# Plan membership is not part of `s_rentals`; it is taken from the plan events themselves.
+import base64
+import threading
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, MutableMapping, Optional, Tuple
+
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+SORT_KEYS = ("rentalId", "pricePerHour", "endTime")
+MAX_CACHED_ORDERS = 256
+
+# Events that change a rental's state; all of them carry `rentalId`
+RENTAL_EVENTS = (
+    "NFTFlex__RentalCreated",
+    "NFTFlex__RentalStarted",
+    "NFTFlex__RentalExtended",
+    "NFTFlex__RentalEnded",
+    "NFTFlex__EarningsWithdrawn",
+)
+# Events that move rentals in or out of a plan, with whether they are in one afterwards; they carry `rentalIds`
+PLAN_EVENTS = {
+    "NFTFlex__PlanCreated": True,
+    "NFTFlex__PlanClosed": False,
+}
+
+
+@dataclass
+class Rental:
+    """One `s_rentals` entry, with its ID."""
+    rentalId: int
+    nftAddress: str
+    tokenId: int
+    owner: str
+    renter: str
+    startTime: int
+    endTime: int
+    pricePerHour: int
+    isFractional: bool
+    collateralToken: str
+    collateralAmount: int
+    pendingWithdrawal: bool
+    inPlan: bool = False
+
+    @property
+    def is_available(self) -> bool:
+        # Plan rentals are shared by subscribers and cannot be rented on their own
+        return self.renter == ZERO_ADDRESS and not self.inPlan
+
+    def matches(
+        self, owner: Optional[str] = None, collateral_token: Optional[str] = None, available: Optional[bool] = None
+    ) -> bool:
+        """Whether the rental passes the equality filters of `RentalIndex.query` (lower-case addresses)."""
+        return (
+            (owner is None or self.owner.lower() == owner)
+            and (collateral_token is None or self.collateralToken.lower() == collateral_token)
+            and (available is None or self.is_available == available)
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        # uint256 values go out as strings, like the client's INFTRental
+        return {
+            "rentalId": self.rentalId,
+            "nftAddress": self.nftAddress,
+            "tokenId": str(self.tokenId),
+            "owner": self.owner,
+            "renter": self.renter,
+            "startTime": self.startTime,
+            "endTime": self.endTime,
+            "pricePerHour": str(self.pricePerHour),
+            "isFractional": self.isFractional,
+            "collateralToken": self.collateralToken,
+            "collateralAmount": str(self.collateralAmount),
+            "pendingWithdrawal": self.pendingWithdrawal,
+            "inPlan": self.inPlan,
+        }
+
+
+def encode_cursor(sort_value: int, rental_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{sort_value}:{rental_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    sort_value, rental_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+    return int(sort_value), int(rental_id)
+
+
+class RentalIndex:
+    """
+    In-memory rentals keyed by ID, plus the block they were indexed at.
+
+    `modified_block` is the last block that changed any rental; HTTP caching keys on it, so
+    blocks that do not touch NFTFlex keep cached pages valid.
+
+    Callables in `listeners` are called as `listener(block_number, [(old, new), ...])` after
+    each `apply` that changed something; `old` is None for new rentals.
+    """
+
+    def __init__(self):
+        self.rentals: Dict[int, Rental] = {}
+        self.block_number = 0
+        self.block_hash = ""
+        self.modified_block = 0
+        self.modified_timestamp = 0
+        # (sort, owner, collateral token, available) => matching (sort value, rental ID) pairs, ascending
+        self._sorted: "OrderedDict[tuple, List[Tuple[int, int]]]" = OrderedDict()
+        self._by_owner: Optional[Dict[str, List[int]]] = None
+        self.listeners: List[Callable[[int, List[Tuple[Optional[Rental], Rental]]], None]] = []
+        self._lock = threading.Lock()
+
+    def apply(self, rentals: Iterable[Rental], block_number: int, block_hash: str, block_timestamp: int) -> List[Rental]:
+        """
+        Store updated rentals as of `block_number`.
+
+        Returns:
+            List[Rental]: The rentals that actually changed.
+        """
+        changes = []
+        with self._lock:
+            for rental in rentals:
+                old = self.rentals.get(rental.rentalId)
+                if old != rental:
+                    self.rentals[rental.rentalId] = rental
+                    changes.append((old, rental))
+
+            self.block_number = block_number
+            self.block_hash = block_hash
+            if changes:
+                self.modified_block = block_number
+                self.modified_timestamp = block_timestamp
+                self._sorted.clear()
+                self._by_owner = None
+
+        if changes:
+            for listener in self.listeners:
+                listener(block_number, changes)
+
+        return [new for _, new in changes]
+
+    def read_all(self) -> Tuple[int, List[Rental]]:
+        """
+        The indexed block number and every rental as of that block, read under the lock so a
+        concurrent `apply` can never mix rentals of two blocks.
+        """
+        with self._lock:
+            return self.block_number, list(self.rentals.values())
+
+    def copy(self) -> "RentalIndex":
+        """
+        A detached copy of the indexed state, taken under the lock. Rentals are never modified in
+        place, so they are shared rather than cloned; `rentals` must provide a cheap `copy()`.
+        """
+        copy = RentalIndex()
+        with self._lock:
+            copy.rentals = self.rentals.copy()
+            copy.block_number, copy.block_hash = self.block_number, self.block_hash
+            copy.modified_block, copy.modified_timestamp = self.modified_block, self.modified_timestamp
+        return copy
+
+    def replace_rentals(self, replace: Callable[[MutableMapping], MutableMapping]) -> None:
+        """
+        Swap `rentals` for `replace(rentals)` under the lock, e.g. to move them onto a fresh snapshot.
+        The replacement must hold the same rentals; listeners are not called.
+        """
+        with self._lock:
+            self.rentals = replace(self.rentals)
+            self._sorted.clear()
+            self._by_owner = None
+
+    def _sorted_keys(
+        self, sort: str, owner: Optional[str] = None, collateral_token: Optional[str] = None, available: Optional[bool] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        (sort value, rental ID) pairs of the rentals matching the equality filters, in ascending order.
+
+        Each combination is built once and reused until the next change, so a selective filter
+        (one owner, only available rentals) never scans past the rentals it excludes.
+        """
+        cache_key = (sort, owner, collateral_token, available)
+        keys = self._sorted.get(cache_key)
+        if keys is not None:
+            self._sorted.move_to_end(cache_key)
+            return keys
+
+        if hasattr(self.rentals, "sort_keys"):
+            # Columnar rentals (nftflex/snapshot.py) filter and sort on their columns, without
+            # decoding every rental
+            keys = self.rentals.sort_keys(sort, owner, collateral_token, available)
+        elif owner is None and collateral_token is None and available is None:
+            keys = sorted((getattr(rental, sort), rental_id) for rental_id, rental in self.rentals.items())
+        elif owner is not None:
+            # Owners hold few rentals each, so sorting theirs beats filtering the full order
+            keys = sorted(
+                (getattr(self.rentals[rental_id], sort), rental_id)
+                for rental_id in self._rentals_by_owner().get(owner, [])
+                if self.rentals[rental_id].matches(None, collateral_token, available)
+            )
+        else:
+            keys = [key for key in self._sorted_keys(sort) if self.rentals[key[1]].matches(None, collateral_token, available)]
+
+        self._sorted[cache_key] = keys
+        if len(self._sorted) > MAX_CACHED_ORDERS:
+            self._sorted.popitem(last=False)
+        return keys
+
+    def _rentals_by_owner(self) -> Dict[str, List[int]]:
+        if self._by_owner is None:
+            self._by_owner = {}
+            for rental_id, rental in self.rentals.items():
+                self._by_owner.setdefault(rental.owner.lower(), []).append(rental_id)
+        return self._by_owner
+
+    def query(
+        self,
+        sort: str = "rentalId",
+        descending: bool = False,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        owner: Optional[str] = None,
+        collateral_token: Optional[str] = None,
+        available: Optional[bool] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> Tuple[List[Rental], Optional[str]]:
+        """
+        One page of rentals matching the filters, in `sort` order.
+
+        Args:
+            sort (str): One of `SORT_KEYS`; ties are broken by rental ID.
+            descending (bool): Reverse the order.
+            limit (int): Page size.
+            cursor (Optional[str]): `next_cursor` of the previous page.
+            owner (Optional[str]): Only rentals listed by this address.
+            collateral_token (Optional[str]): Only rentals paid in this token (0x0 for ETH).
+            available (Optional[bool]): Only rentals that are (or are not) free to rent.
+            min_price (Optional[int]): Lowest `pricePerHour`, inclusive.
+            max_price (Optional[int]): Highest `pricePerHour`, inclusive.
+
+        Returns:
+            Tuple[List[Rental], Optional[str]]: The page and the cursor of the next one, if any.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+
+        owner = owner.lower() if owner else None
+        collateral_token = collateral_token.lower() if collateral_token else None
+
+        with self._lock:
+            keys = self._sorted_keys(sort, owner, collateral_token, available)
+
+            if descending:
+                end = len(keys) if cursor is None else bisect_left(keys, decode_cursor(cursor))
+                positions = range(end - 1, -1, -1)
+            else:
+                start = 0 if cursor is None else bisect_right(keys, decode_cursor(cursor))
+                positions = range(start, len(keys))
+
+            page: List[Rental] = []
+            next_cursor = None
+            for position in positions:
+                rental = self.rentals[keys[position][1]]
+                if min_price is not None and rental.pricePerHour < min_price:
+                    continue
+                if max_price is not None and rental.pricePerHour > max_price:
+                    continue
+
+                if len(page) == limit:
+                    last = page[-1]
+                    next_cursor = encode_cursor(getattr(last, sort), last.rentalId)
+                    break
+                page.append(rental)
+
+        return page, next_cursor
+
+
+class ChainIndexer:
+    """Keeps a `RentalIndex` in sync with an NFTFlex deployment through web3.py."""
+
+    def __init__(
+        self,
+        w3,
+        address: str,
+        abi: List[Dict[str, Any]],
+        index: Optional[RentalIndex] = None,
+        confirmations: int = 0,
+        max_block_range: int = 2000,
+        start_block: int = 0,
+    ):
+        self.w3 = w3
+        self.contract = w3.eth.contract(address=address, abi=abi)
+        self.index = index or RentalIndex()
+        self.confirmations = confirmations
+        self.max_block_range = max_block_range
+        # The contract has no events before its deploy block, so a fresh index starts there
+        self.start_block = start_block
+        # An ABI from before an event existed would leave its rentals stale without any error
+        event_names = (*RENTAL_EVENTS, *PLAN_EVENTS)
+        abi_events = {item.get("name") for item in abi if item.get("type") == "event"}
+        missing = [name for name in event_names if name not in abi_events]
+        if missing:
+            raise ValueError(f"NFTFlex ABI is missing {', '.join(missing)}; regenerate it with `ape run deploy`")
+        self._events = [(name, getattr(self.contract.events, name)) for name in event_names]
+
+    def read_rental(self, rental_id: int, block_number: int, in_plan: bool = False) -> Rental:
+        values = self.contract.functions.s_rentals(rental_id).call(block_identifier=block_number)
+        return Rental(rental_id, *values, in_plan)
+
+    def changed_rentals(self, from_block: int, to_block: int) -> Dict[int, Optional[bool]]:
+        """
+        Rentals touched by events in `[from_block, to_block]`, in first-seen order, each mapped to
+        whether it is in a plan after the last plan event for it (None when no plan event touched it).
+        """
+        logs = []
+        # RPC providers cap the block range of eth_getLogs
+        for start in range(from_block, to_block + 1, self.max_block_range):
+            end = min(start + self.max_block_range - 1, to_block)
+            logs += self.w3.eth.get_logs({"address": self.contract.address, "fromBlock": start, "toBlock": end})
+
+        rentals: Dict[int, Optional[bool]] = {}
+        for log in logs:
+            for name, event in self._events:
+                try:
+                    decoded = event().process_log(log)
+                except Exception:
+                    continue
+                if name in PLAN_EVENTS:
+                    for rental_id in decoded["args"]["rentalIds"]:
+                        rentals[rental_id] = PLAN_EVENTS[name]
+                else:
+                    rentals.setdefault(decoded["args"]["rentalId"], None)
+                break
+        return rentals
+
+    def sync(self) -> List[Rental]:
+        """
+        Index every block since the last sync.
+
+        Returns:
+            List[Rental]: Rentals whose state changed.
+        """
+        head = self.w3.eth.block_number - self.confirmations
+        if head <= self.index.block_number and self.index.block_hash:
+            return []
+
+        from_block = self.index.block_number + 1 if self.index.block_hash else self.start_block
+        block = self.w3.eth.get_block(head)
+        rentals = []
+        for rental_id, in_plan in self.changed_rentals(from_block, head).items():
+            if in_plan is None:
+                known = self.index.rentals.get(rental_id)
+                in_plan = known.inPlan if known is not None else False
+            rentals.append(self.read_rental(rental_id, head, in_plan))
+
+        return self.index.apply(rentals, head, "0x" + bytes(block["hash"]).hex(), block["timestamp"])
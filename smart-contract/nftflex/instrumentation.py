@@ -0,0 +1,429 @@
+# Opt-in JSON-RPC and transaction instrumentation for the deploy script and off-chain services.
+#
+# Wraps a web3 provider's `make_request`, which both web3.py and ape send every request through,
+# and records per JSON-RPC method and per contract function: call counts, errors, latency
+# histograms, gas used and time from sending a transaction to its first receipt. `span()` times
+# script phases and how much of each went to RPC, so the rest is compilation or ape overhead.
+#
+#   NFTFLEX_TRACE=trace.jsonl        one JSON event per line, plus a summary table at exit
+#   NFTFLEX_METRICS_PORT=9100        Prometheus text format on http://127.0.0.1:9100/metrics
+#
+# Nothing is wrapped unless one of them is set (or enable() is called), so the only cost when
+# off is the `_active is None` check in instrument() and span().
+import atexit
+import json
+import os
+import threading
+import time
+import warnings
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Dict, List, Optional, Tuple
+
+import rlp
+from eth_utils import function_abi_to_4byte_selector
+
+
+ENV_TRACE = "NFTFLEX_TRACE"
+ENV_METRICS_PORT = "NFTFLEX_METRICS_PORT"
+# Upper bounds in seconds, as for a Prometheus histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEPLOYMENT = "<deploy>"
+# web3.py majors that build the middleware chain around `provider.make_request` once and keep it
+# in the private `provider._request_func_cache`, keyed on the middleware
+REQUEST_FUNC_CACHE_VERSIONS = (6, 7)
+
+_active: Optional["Instrumentation"] = None
+
+
+def _hex(value) -> str:
+    return "0x" + bytes(value).hex() if isinstance(value, (bytes, bytearray)) else str(value).lower()
+
+
+def _web3_major() -> int:
+    try:
+        return int(version("web3").split(".")[0])
+    except (PackageNotFoundError, ValueError):
+        return 0
+
+
+def _quantity(value) -> int:
+    """A JSON-RPC quantity: hex string from raw responses, int from some providers."""
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` quantile (capped at the largest value seen)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class FunctionStats:
+    """What one contract function cost: calls, transactions, gas and receipt waits."""
+
+    def __init__(self):
+        self.calls = 0  # eth_call / eth_estimateGas
+        self.transactions = 0
+        self.reverted = 0
+        self.gas_used = 0
+        self.latency = Histogram()  # Every request made for the function: calls, estimates and sends
+        self.time_to_receipt = Histogram()
+
+
+class Instrumentation:
+    def __init__(self, trace_path: Optional[str] = None):
+        self.methods: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.functions: Dict[str, FunctionStats] = {}
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.started = time.perf_counter()
+        self._selectors: Dict[str, str] = {}  # "0x12345678" => "Contract.function"
+        self._init_codes: List[Tuple[str, str]] = []  # (init code hex, contract)
+        self._pending: Dict[str, Tuple[str, float]] = {}  # tx hash => (function, sent at)
+        self._thread = threading.local()  # RPC seconds spent by the current thread
+        self._lock = threading.Lock()
+        self.trace_path = trace_path
+        self._trace = open(trace_path, "w", buffering=1 << 16) if trace_path else None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    """
+    Setup
+    """
+    def register_contract(self, name: str, abi: List[Dict[str, Any]], bytecode: Optional[str] = None) -> None:
+        """Name calls to `abi`'s functions (and deployments of `bytecode`) `name.function` in reports."""
+        for item in abi:
+            if item.get("type") == "function":
+                selector = "0x" + function_abi_to_4byte_selector(item).hex()
+                self._selectors[selector] = f"{name}.{item['name']}"
+        if bytecode:
+            self._init_codes.append((bytecode.lower().removeprefix("0x"), name))
+
+    def instrument(self, w3):
+        """Record every request `w3`'s provider makes. Returns `w3`."""
+        provider = w3.provider
+        if getattr(provider, "_nftflex_instrumented", False):
+            return w3
+
+        make_request = provider.make_request
+
+        def instrumented_make_request(method, params):
+            start = time.perf_counter()
+            error = None
+            try:
+                response = make_request(method, params)
+                if isinstance(response, dict) and response.get("error"):
+                    rpc_error = response["error"]
+                    error = str(rpc_error.get("message") if isinstance(rpc_error, dict) else rpc_error)
+                return response
+            except Exception as e:
+                response = None
+                error = type(e).__name__
+                raise
+            finally:
+                self.record(str(method), params, response, time.perf_counter() - start, error)
+
+        provider.make_request = instrumented_make_request
+        provider._nftflex_instrumented = True
+        self._reset_request_func(provider)
+        return w3
+
+    @staticmethod
+    def _reset_request_func(provider) -> None:
+        """
+        Make web3.py rebuild its middleware chain around the wrapped make_request. ape calls
+        make_request directly, but web3.py calls the chain it built on the first request.
+        """
+        if not hasattr(provider, "_request_func_cache"):
+            return
+        if _web3_major() in REQUEST_FUNC_CACHE_VERSIONS:
+            provider._request_func_cache = (None, None)
+        else:
+            warnings.warn(
+                f"web3 {_web3_major()} may keep sending requests made before instrument() past the "
+                "instrumentation; instrument providers before their first request",
+                RuntimeWarning,
+            )
+
+    """
+    Recording
+    """
+    def _label(self, tx: Dict[str, Any]) -> Optional[str]:
+        data = _hex(tx.get("data") or tx.get("input") or "")
+        if not tx.get("to"):
+            code = data.removeprefix("0x")
+            names = [name for init_code, name in self._init_codes if code.startswith(init_code)]
+            return f"{names[0]}.{DEPLOYMENT}" if names else DEPLOYMENT
+        if len(data) < 10:
+            return None
+        return self._selectors.get(data[:10], data[:10])
+
+    def _decode_raw(self, raw: str) -> Dict[str, Any]:
+        """`to` and `data` of a signed transaction: legacy, EIP-2930 or EIP-1559."""
+        payload = bytes.fromhex(_hex(raw)[2:])
+        if payload[0] >= 0xC0:
+            fields = rlp.decode(payload)
+            return {"to": fields[3], "data": fields[5]}
+        fields = rlp.decode(payload[1:])
+        offset = 4 if payload[0] == 1 else 5
+        return {"to": fields[offset], "data": fields[offset + 2]}
+
+    def _function_of(self, method: str, params) -> Optional[str]:
+        try:
+            if method in ("eth_call", "eth_estimateGas", "eth_sendTransaction"):
+                return self._label(params[0])
+            if method == "eth_sendRawTransaction":
+                return self._label(self._decode_raw(params[0]))
+        except Exception:
+            pass
+        return None
+
+    def record(self, method: str, params, response, duration: float, error: Optional[str] = None) -> None:
+        function = self._function_of(method, params)
+        result = response.get("result") if isinstance(response, dict) else None
+        now = time.perf_counter()
+        self._thread.rpc_seconds = getattr(self._thread, "rpc_seconds", 0.0) + duration
+
+        receipt = None
+        with self._lock:
+            self.methods.setdefault(method, Histogram()).observe(duration)
+            if error:
+                self.errors[method] = self.errors.get(method, 0) + 1
+
+            if function:
+                stats = self.functions.setdefault(function, FunctionStats())
+                stats.latency.observe(duration)
+                if method in ("eth_sendTransaction", "eth_sendRawTransaction"):
+                    stats.transactions += 1
+                    if result:
+                        self._pending[_hex(result)] = (function, now - duration)
+                else:
+                    stats.calls += 1
+
+            if method == "eth_getTransactionReceipt" and result and _hex(params[0]) in self._pending:
+                function, sent_at = self._pending.pop(_hex(params[0]))
+                stats = self.functions[function]
+                # eth-tester (ape's local test provider) answers in snake_case
+                gas_used = _quantity(result.get("gasUsed", result.get("gas_used", 0)))
+                status = _quantity(result.get("status", 1))
+                stats.gas_used += gas_used
+                stats.reverted += status == 0
+                stats.time_to_receipt.observe(now - sent_at)
+                receipt = {
+                    "function": function,
+                    "tx": _hex(params[0]),
+                    "gasUsed": gas_used,
+                    "status": status,
+                    "timeToReceipt": round(now - sent_at, 6),
+                }
+
+        if self._trace:
+            self.trace({"type": "rpc", "method": method, "function": function, "duration": round(duration, 6), "error": error})
+            if receipt:
+                self.trace({"type": "receipt", **receipt})
+
+    def trace(self, event: Dict[str, Any]) -> None:
+        if self._trace:
+            line = json.dumps({"time": round(time.time(), 6), **event}, separators=(",", ":"))
+            with self._lock:
+                if self._trace:
+                    self._trace.write(line + "\n")
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a phase of a script, and how much of it this thread spent waiting on RPC."""
+        rpc_before = getattr(self._thread, "rpc_seconds", 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            rpc = getattr(self._thread, "rpc_seconds", 0.0) - rpc_before
+            with self._lock:
+                span = self.spans.setdefault(name, {"count": 0, "wall": 0.0, "rpc": 0.0})
+                span["count"] += 1
+                span["wall"] += wall
+                span["rpc"] += rpc
+            self.trace({"type": "span", "name": name, "duration": round(wall, 6), "rpc": round(rpc, 6)})
+
+    """
+    Reporting
+    """
+    def summary(self) -> str:
+        lines = [f"Instrumented for {time.perf_counter() - self.started:.2f}s"]
+        with self._lock:
+            if self.spans:
+                lines.append(f"\n{'phase':<28}{'count':>7}{'wall':>11}{'rpc':>11}{'other':>11}")
+                for name, span in self.spans.items():
+                    lines.append(
+                        f"{name:<28}{span['count']:>7}{span['wall']:>10.3f}s{span['rpc']:>10.3f}s"
+                        f"{span['wall'] - span['rpc']:>10.3f}s"
+                    )
+
+            lines.append(f"\n{'rpc method':<28}{'calls':>7}{'errors':>8}{'total':>11}{'mean':>10}{'p95':>10}{'max':>10}")
+            for method, histogram in sorted(self.methods.items(), key=lambda item: -item[1].sum):
+                lines.append(
+                    f"{method:<28}{histogram.count:>7}{self.errors.get(method, 0):>8}{histogram.sum:>10.3f}s"
+                    f"{histogram.sum / histogram.count * 1000:>8.1f}ms{histogram.quantile(0.95) * 1000:>8.1f}ms"
+                    f"{histogram.max * 1000:>8.1f}ms"
+                )
+
+            if self.functions:
+                lines.append(
+                    f"\n{'contract function':<36}{'calls':>7}{'txs':>6}{'reverted':>10}{'rpc mean':>10}{'rpc p95':>10}"
+                    f"{'gas used':>13}{'gas/tx':>10}{'receipt p50':>13}{'max':>10}"
+                )
+                for function, stats in sorted(self.functions.items()):
+                    latency, receipts = stats.latency, stats.time_to_receipt
+                    lines.append(
+                        f"{function:<36}{stats.calls:>7}{stats.transactions:>6}{stats.reverted:>10}"
+                        f"{latency.sum / latency.count * 1000:>8.1f}ms{latency.quantile(0.95) * 1000:>8.1f}ms"
+                        f"{stats.gas_used:>13,}{stats.gas_used // receipts.count if receipts.count else 0:>10,}"
+                        f"{receipts.quantile(0.5) * 1000:>11.1f}ms{receipts.max * 1000:>8.1f}ms"
+                    )
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name: str, label: str, value: str, h: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}="{value}"}} {h.sum}')
+            lines.append(f'{name}_count{{{label}="{value}"}} {h.count}')
+
+        with self._lock:
+            lines.append("# TYPE nftflex_rpc_request_duration_seconds histogram")
+            for method, h in sorted(self.methods.items()):
+                histogram("nftflex_rpc_request_duration_seconds", "method", method, h)
+            lines.append("# TYPE nftflex_rpc_errors_total counter")
+            for method, count in sorted(self.errors.items()):
+                lines.append(f'nftflex_rpc_errors_total{{method="{method}"}} {count}')
+
+            for metric, attribute in (
+                ("nftflex_contract_calls_total", "calls"),
+                ("nftflex_contract_transactions_total", "transactions"),
+                ("nftflex_contract_reverted_total", "reverted"),
+                ("nftflex_contract_gas_used_total", "gas_used"),
+            ):
+                lines.append(f"# TYPE {metric} counter")
+                for function, stats in sorted(self.functions.items()):
+                    lines.append(f'{metric}{{function="{function}"}} {getattr(stats, attribute)}')
+            lines.append("# TYPE nftflex_contract_call_duration_seconds histogram")
+            for function, stats in sorted(self.functions.items()):
+                histogram("nftflex_contract_call_duration_seconds", "function", function, stats.latency)
+            lines.append("# TYPE nftflex_transaction_time_to_receipt_seconds histogram")
+            for function, stats in sorted(self.functions.items()):
+                if stats.transactions:
+                    histogram("nftflex_transaction_time_to_receipt_seconds", "function", function, stats.time_to_receipt)
+
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve `prometheus()` on http://host:port/metrics from a background thread."""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = instrumentation.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+        if self._trace:
+            with self._lock:
+                self._trace.close()
+                self._trace = None
+
+
+def enable(trace_path: Optional[str] = None, metrics_port: Optional[int] = None, report: bool = True) -> Instrumentation:
+    """Turn instrumentation on for this process; prints the summary at exit when `report` is set."""
+    global _active
+    if _active is None:
+        _active = Instrumentation(trace_path)
+        if metrics_port:
+            _active.serve_metrics(metrics_port)
+
+        instrumentation = _active
+
+        def finish():
+            if report:
+                print("\n" + instrumentation.summary())
+                if instrumentation.trace_path:
+                    print(f"Trace written to {instrumentation.trace_path}")
+            instrumentation.close()
+
+        atexit.register(finish)
+    return _active
+
+
+def from_env() -> Optional[Instrumentation]:
+    """enable() when NFTFLEX_TRACE or NFTFLEX_METRICS_PORT is set, otherwise stay off."""
+    trace_path = os.environ.get(ENV_TRACE)
+    metrics_port = os.environ.get(ENV_METRICS_PORT)
+    if not trace_path and not metrics_port:
+        return None
+    return enable(trace_path or None, int(metrics_port) if metrics_port else None)
+
+
+def active() -> Optional[Instrumentation]:
+    return _active
+
+
+def instrument(w3):
+    """Instrument `w3` if instrumentation is on. Returns `w3`."""
+    if _active is None:
+        return w3
+    return _active.instrument(w3)
+
+
+def register_contract(name: str, abi: List[Dict[str, Any]], bytecode: Optional[str] = None) -> None:
+    if _active is not None:
+        _active.register_contract(name, abi, bytecode)
+
+
+def span(name: str):
+    """`Instrumentation.span()` when instrumentation is on, otherwise a no-op context manager."""
+    if _active is None:
+        return nullcontext()
+    return _active.span(name)
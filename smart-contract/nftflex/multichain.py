@@ -0,0 +1,228 @@
+# Deploys and seeds NFTFlex and SimpleNFT on several networks at once, one worker per chain.
+#
+# Uses the artifacts from `ape compile` (.build/__local__.json) and plain web3.py, since an ape
+# process is connected to one provider at a time. The addresses end up in contract_addresses.json,
+# keyed by chain ID (see nftflex/registry.py).
+#
+# Usage: python -m nftflex.multichain --config deploy_networks.json
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from eth_account import Account
+from web3 import Web3
+
+from nftflex import instrumentation, seed
+from nftflex.registry import update_registry
+
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MANIFEST_PATH = os.path.join(PROJECT_DIR, ".build", "__local__.json")
+
+
+def load_networks(config_path: str) -> List[Dict[str, Any]]:
+    """
+    Load the networks to deploy to. `${VAR}` in an `rpc_url` is read from the environment;
+    networks whose URL is still unresolved or empty (`VAR=` in .env) are skipped.
+
+    Args:
+        config_path (str): JSON file with a `networks` list of `{"name", "rpc_url"}` entries.
+
+    Returns:
+        List[Dict[str, Any]]: The networks that can be deployed to.
+    """
+    with open(config_path, "r") as file:
+        networks = json.load(file)["networks"]
+
+    resolved = []
+    for network in networks:
+        rpc_url = os.path.expandvars(network["rpc_url"]).strip()
+        if not rpc_url or "$" in rpc_url:
+            print(f"Skipping {network['name']}: {network['rpc_url']} is not set")
+            continue
+        resolved.append({**network, "rpc_url": rpc_url})
+    return resolved
+
+
+def load_contract_types(manifest_path: str = MANIFEST_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Read ABIs and deployment bytecode of the compiled contracts.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Contract name => {"abi": ..., "bytecode": ...}.
+    """
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"'{manifest_path}' does not exist, run `ape compile` first")
+
+    with open(manifest_path, "r") as file:
+        contract_types = json.load(file)["contractTypes"]
+
+    return {
+        name: {"abi": contract_types[name]["abi"], "bytecode": contract_types[name]["deploymentBytecode"]["bytecode"]}
+        for name in ("SimpleNFT", "NFTFlex")
+    }
+
+
+def load_deployer():
+    """The account from DEPLOYER_PRIVATE_KEY, or the mnemonic account deploy.py uses locally."""
+    private_key = os.environ.get("DEPLOYER_PRIVATE_KEY")
+    if private_key:
+        return Account.from_key(private_key)
+
+    Account.enable_unaudited_hdwallet_features()
+    return Account.from_mnemonic(seed.mnemonic, account_path=f"m/44'/60'/0'/0/{seed.deployer_account_index}")
+
+
+class ChainDeployer:
+    """Sends the deployment transactions for one chain, in nonce order."""
+
+    def __init__(self, rpc_url: str, account, contract_types: Dict[str, Dict[str, Any]]):
+        self.w3 = instrumentation.instrument(Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 60})))
+        self.account = account
+        self.contract_types = contract_types
+        self.chain_id = self.w3.eth.chain_id
+        self.nonce = self.w3.eth.get_transaction_count(account.address)
+        self.deploy_blocks: Dict[str, int] = {}
+
+    def transact(self, call) -> Any:
+        """Sign and send a contract call or constructor, then wait for its receipt."""
+        tx = call.build_transaction({"from": self.account.address, "nonce": self.nonce, "chainId": self.chain_id})
+        signed = self.account.sign_transaction(tx)
+        tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        self.nonce += 1
+
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+        if receipt.status != 1:
+            raise RuntimeError(f"Transaction {tx_hash.hex()} reverted on chain {self.chain_id}")
+        return receipt
+
+    def deploy(self, name: str):
+        contract_type = self.contract_types[name]
+        factory = self.w3.eth.contract(abi=contract_type["abi"], bytecode=contract_type["bytecode"])
+        receipt = self.transact(factory.constructor())
+        self.deploy_blocks[name] = receipt.blockNumber
+        return self.w3.eth.contract(address=receipt.contractAddress, abi=contract_type["abi"])
+
+
+def deploy_to_network(network: Dict[str, Any], account, contract_types: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deploy both contracts to one network and mint and list the seed NFTs, like scripts/deploy.py.
+
+    Returns:
+        Dict[str, Any]: Chain ID, registry entry and per-phase timings in seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    deployer = ChainDeployer(network["rpc_url"], account, contract_types)
+    timings["connect"] = time.perf_counter() - start
+
+    phase = time.perf_counter()
+    simple_nft = deployer.deploy("SimpleNFT")
+    nft_flex = deployer.deploy("NFTFlex")
+    timings["deploy"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    for metadata_url in seed.metadata_urls:
+        token_id = simple_nft.functions.nextTokenId().call()
+        deployer.transact(simple_nft.functions.mint(account.address, metadata_url))
+        deployer.transact(
+            nft_flex.functions.createRental(
+                simple_nft.address,
+                token_id,
+                seed.price_per_hour,
+                seed.is_fractional,
+                seed.collateral_token,
+                seed.collateral_amount,
+            )
+        )
+    timings["seed"] = time.perf_counter() - phase
+    timings["total"] = time.perf_counter() - start
+
+    return {
+        "chain_id": deployer.chain_id,
+        "entry": {
+            "network": network["name"],
+            "SimpleNFT": simple_nft.address,
+            "NFTFlex": nft_flex.address,
+            # The indexer starts here instead of scanning the chain from genesis
+            "NFTFlexDeployBlock": deployer.deploy_blocks["NFTFlex"],
+        },
+        "timings": timings,
+    }
+
+
+def deploy_all(
+    networks: List[Dict[str, Any]],
+    registry_path: str,
+    account=None,
+    contract_types: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Deploy to every network concurrently and merge the addresses into the registry.
+
+    A failing network does not stop the others; it is reported with its error and left out
+    of the registry.
+
+    Returns:
+        List[Dict[str, Any]]: One result per network, in the order given.
+    """
+    account = account or load_deployer()
+    contract_types = contract_types or load_contract_types()
+    for name, contract_type in contract_types.items():
+        instrumentation.register_contract(name, contract_type["abi"], contract_type["bytecode"])
+
+    def run(network):
+        try:
+            with instrumentation.span(f"deploy {network['name']}"):
+                return {"network": network["name"], **deploy_to_network(network, account, contract_types)}
+        except Exception as e:
+            return {"network": network["name"], "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(networks))) as executor:
+        results = list(executor.map(run, networks))
+
+    update_registry(registry_path, {result["chain_id"]: result["entry"] for result in results if "error" not in result})
+    return results
+
+
+def print_report(results: List[Dict[str, Any]], elapsed: float) -> None:
+    print(f"\n{'network':<16}{'chain':>10}{'connect':>10}{'deploy':>10}{'seed':>10}{'total':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['network']:<16}  failed: {result['error']}")
+            continue
+        t = result["timings"]
+        print(
+            f"{result['network']:<16}{result['chain_id']:>10}"
+            f"{t['connect']:>9.2f}s{t['deploy']:>9.2f}s{t['seed']:>9.2f}s{t['total']:>9.2f}s"
+        )
+    print(f"Wall-clock for all chains: {elapsed:.2f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Deploy NFTFlex and SimpleNFT to several networks at once.")
+    parser.add_argument("--config", default=os.path.join(PROJECT_DIR, "deploy_networks.json"))
+    parser.add_argument("--registry", default=os.path.join(PROJECT_DIR, "contract_addresses.json"))
+    args = parser.parse_args(argv)
+    instrumentation.from_env()
+
+    networks = load_networks(args.config)
+    if not networks:
+        print("No networks to deploy to.")
+        return 1
+
+    start = time.perf_counter()
+    results = deploy_all(networks, args.registry)
+    print_report(results, time.perf_counter() - start)
+    print(f"Contract addresses saved to {args.registry}")
+
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# EIP-2612 permit signatures for ERC-20 collateral.
+# Docs -> https://eips.ethereum.org/EIPS/eip-2612
+from typing import Any, Dict, Tuple
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+
+
+PERMIT_TYPES = {
+    "EIP712Domain": [
+        {"name": "name", "type": "string"},
+        {"name": "version", "type": "string"},
+        {"name": "chainId", "type": "uint256"},
+        {"name": "verifyingContract", "type": "address"},
+    ],
+    "Permit": [
+        {"name": "owner", "type": "address"},
+        {"name": "spender", "type": "address"},
+        {"name": "value", "type": "uint256"},
+        {"name": "nonce", "type": "uint256"},
+        {"name": "deadline", "type": "uint256"},
+    ],
+}
+
+
+def build_permit_message(
+    token_name: str,
+    token_address: str,
+    chain_id: int,
+    owner: str,
+    spender: str,
+    value: int,
+    nonce: int,
+    deadline: int,
+    version: str = "1",
+) -> Dict[str, Any]:
+    """
+    Build the EIP-712 typed data for an ERC-20 permit.
+
+    Args:
+        token_name (str): The token's `name()`, which OpenZeppelin's ERC20Permit uses as the domain name.
+        token_address (str): Address of the token contract.
+        chain_id (int): Chain ID the permit is valid on.
+        owner (str): Address that owns the tokens and signs the permit.
+        spender (str): Address allowed to spend the tokens (the NFTFlex contract).
+        value (int): Allowance granted by the permit.
+        nonce (int): The owner's current `nonces(owner)` on the token.
+        deadline (int): Timestamp after which the permit is rejected.
+        version (str): Domain version, "1" for OpenZeppelin's ERC20Permit.
+
+    Returns:
+        Dict[str, Any]: The full typed-data message.
+    """
+    return {
+        "types": PERMIT_TYPES,
+        "primaryType": "Permit",
+        "domain": {
+            "name": token_name,
+            "version": version,
+            "chainId": chain_id,
+            "verifyingContract": token_address,
+        },
+        "message": {
+            "owner": owner,
+            "spender": spender,
+            "value": value,
+            "nonce": nonce,
+            "deadline": deadline,
+        },
+    }
+
+
+def sign_permit(private_key, message: Dict[str, Any]) -> Tuple[int, bytes, bytes]:
+    """
+    Sign a permit message built by `build_permit_message`.
+
+    Args:
+        private_key: The owner's private key (hex string or bytes).
+        message (Dict[str, Any]): The typed-data message.
+
+    Returns:
+        Tuple[int, bytes, bytes]: The `(v, r, s)` arguments for `permit` / `rentNFTWithPermit`.
+    """
+    signed = Account.sign_message(encode_typed_data(full_message=message), private_key)
+    return signed.v, signed.r.to_bytes(32, "big"), signed.s.to_bytes(32, "big")
+
+
+def permit_signature(token, account, spender: str, value: int, deadline: int, chain_id: int) -> Tuple[int, bytes, bytes]:
+    """
+    Read the token's name and the account's nonce, then sign a permit for `spender`.
+
+    Args:
+        token: The ERC-20 contract instance (must implement EIP-2612).
+        account: The token owner; must expose `address` and `private_key` (e.g. an ape test account).
+        spender (str): Address allowed to spend the tokens.
+        value (int): Allowance granted by the permit.
+        deadline (int): Timestamp after which the permit is rejected.
+        chain_id (int): Chain ID the permit is valid on.
+
+    Returns:
+        Tuple[int, bytes, bytes]: The `(v, r, s)` signature parts.
+    """
+    message = build_permit_message(
+        token.name(),
+        str(token.address),
+        chain_id,
+        str(account.address),
+        str(spender),
+        value,
+        token.nonces(account.address),
+        deadline,
+    )
+    return sign_permit(account.private_key, message)
@@ -0,0 +1,41 @@
+# Contract address registry shared by the deploy scripts and the client.
+#
+# contract_addresses.json maps each chain ID to the addresses deployed on it:
+# {"31337": {"network": "local", "SimpleNFT": "0x...", "NFTFlex": "0x..."}}
+import json
+import os
+from typing import Any, Dict
+
+
+def load_registry(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the registry, or an empty one if the file is missing.
+
+    A file in the old single-network format ({"network": ..., "NFTFlex": ...}) has no chain ID,
+    so it is dropped rather than guessed.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as file:
+        registry = json.load(file)
+
+    return {chain_id: entry for chain_id, entry in registry.items() if isinstance(entry, dict)}
+
+
+def update_registry(path: str, entries: Dict[int, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Write `entries` (chain ID => addresses) into the registry, keeping the other chains.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The registry as written.
+    """
+    registry = load_registry(path)
+    for chain_id, entry in entries.items():
+        registry[str(chain_id)] = entry
+
+    registry = dict(sorted(registry.items(), key=lambda item: int(item[0])))
+    with open(path, "w") as file:
+        json.dump(registry, file, indent=4)
+
+    return registry
@@ -0,0 +1,18 @@
+# Seed data listed on every fresh deployment (scripts/deploy.py and nftflex.multichain).
+
+metadata_urls = [
+    "ipfs://QmQth5R8PWcM3GVrmeSrfmDrBXFk646x8Er4iU46zAD5Tm", # Bhawal Resort & Spa
+    "ipfs://QmZmPMzHxDKL4zmbBw6M4YhAuAkeUsFnvYV7uupuGoHte8", # The Royena Resort Ltd
+    "ipfs://QmbbLW4nkf3iGkEBPBUL8swMtWJ8PARNTFdJYAkMCDE9Ft", # Chuti Resort Gazipur
+    "ipfs://QmPn55rVcTsse3ZyVMG7vRVvTnRuvUZsxrAnCwFxXzqf4P", # CCULB Resort & Convention Hall
+    "ipfs://Qma9SwWr3JQoVny5E5yhkhu2iPjUDVNeNcBJT1AgE4z6Hn" # Third Terrace Resorts
+]
+
+price_per_hour = int(1e18)  # 1 ETH
+is_fractional = False
+collateral_token = "0x0000000000000000000000000000000000000000"  # Native ETH as collateral
+collateral_amount = int(2e18)  # 2 ETH
+
+# ape-config.yaml `test` mnemonic, also anvil's default; deploy.py uses the last of its 5 accounts
+mnemonic = "test test test test test test test test test test test junk"
+deployer_account_index = 4
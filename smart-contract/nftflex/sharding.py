@@ -0,0 +1,248 @@
+# Runs the ape test suite split across several processes.
+#
+# Every shard is a separate `ape test` process on the in-process `test` provider, so each one
+# gets its own chain, its own deployments and the accounts from the mnemonic in ape-config.yaml.
+# Time warps (`chain.mine(timestamp=...)`) therefore never leak between shards.
+#
+# Usage: python -m nftflex.sharding -n 4 tests/
+#        python -m nftflex.sharding -n 4 --baseline tests/   # also time a single process for the speedup
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TEST_NETWORK = "ethereum:local:test"
+COUNTERS = ("tests", "failures", "errors", "skipped")
+POLL_SECONDS = 0.1
+
+
+def collect_test_ids(paths: List[str], network: str = TEST_NETWORK) -> List[str]:
+    """
+    Collect pytest node IDs without running the tests.
+
+    Args:
+        paths (List[str]): Test files or directories to collect from.
+        network (str): Network choice passed to `ape test`.
+
+    Returns:
+        List[str]: Node IDs such as `tests/test_NFTFlex.py::test_create_rental`.
+    """
+    result = subprocess.run(
+        ["ape", "test", *paths, "--network", network, "--collect-only", "-q"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [line.strip() for line in result.stdout.splitlines() if "::" in line]
+
+
+def partition(test_ids: List[str], shards: int) -> List[List[str]]:
+    """
+    Split node IDs into at most `shards` groups of near-equal size.
+
+    Tests of the same file are dealt round-robin so slow files (e.g. gas benchmarks) are spread
+    over all shards instead of landing on one.
+
+    Args:
+        test_ids (List[str]): Node IDs in collection order.
+        shards (int): Number of shards wanted.
+
+    Returns:
+        List[List[str]]: Non-empty groups of node IDs.
+    """
+    groups: List[List[str]] = [[] for _ in range(max(1, shards))]
+    for index, test_id in enumerate(test_ids):
+        groups[index % len(groups)].append(test_id)
+    return [group for group in groups if group]
+
+
+def merge_junit_reports(report_paths: List[str], output_path: str) -> Dict[str, int]:
+    """
+    Merge per-shard JUnit XML files into a single report.
+
+    A shard that wrote no report (it crashed, or failed before pytest started) gets a synthetic
+    suite with one errored test case, so the merged report can never look cleaner than the run.
+
+    Args:
+        report_paths (List[str]): JUnit XML files written by the shards.
+        output_path (str): Where to write the merged report.
+
+    Returns:
+        Dict[str, int]: Totals for tests, failures, errors and skipped.
+    """
+    merged = ET.Element("testsuites")
+    totals = {counter: 0 for counter in COUNTERS}
+    total_time = 0.0
+
+    for path in report_paths:
+        if not os.path.exists(path):
+            merged.append(_missing_report_suite(path))
+            totals["tests"] += 1
+            totals["errors"] += 1
+            continue
+        root = ET.parse(path).getroot()
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        for suite in suites:
+            for counter in COUNTERS:
+                totals[counter] += int(suite.get(counter, 0))
+            total_time += float(suite.get("time", 0))
+            merged.append(suite)
+
+    for counter, value in totals.items():
+        merged.set(counter, str(value))
+    merged.set("time", f"{total_time:.3f}")
+    ET.ElementTree(merged).write(output_path, encoding="utf-8", xml_declaration=True)
+
+    return totals
+
+
+def _missing_report_suite(path: str) -> ET.Element:
+    """Build the JUnit suite recorded for a shard whose report file does not exist."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    suite = ET.Element("testsuite", name=name, tests="1", failures="0", errors="1", skipped="0", time="0")
+    testcase = ET.SubElement(suite, "testcase", classname="nftflex.sharding", name=name, time="0")
+    error = ET.SubElement(testcase, "error", message=f"{name} wrote no JUnit report")
+    error.text = f"Expected {path}; see the shard log next to it."
+    return suite
+
+
+def _run_groups(
+    groups: List[List[str]],
+    report_dir: str,
+    network: str,
+    extra_args: Optional[List[str]],
+) -> Tuple[List[int], List[float], float]:
+    """
+    Start one `ape test` process per group and wait for all of them.
+
+    Returns:
+        Tuple[List[int], List[float], float]: Return code and duration in seconds of every shard,
+        and the wall-clock time of the whole run.
+    """
+    processes = []
+
+    start = time.perf_counter()
+    for index, group in enumerate(groups):
+        shard_report = os.path.join(report_dir, f"shard-{index}.xml")
+        log = open(os.path.join(report_dir, f"shard-{index}.log"), "w")
+        command = ["ape", "test", *group, "--network", network, f"--junitxml={shard_report}", *(extra_args or [])]
+        process = subprocess.Popen(command, cwd=PROJECT_DIR, stdout=log, stderr=subprocess.STDOUT)
+        processes.append((process, log))
+
+    # Poll instead of waiting in order, so every shard's duration is taken when it actually ends
+    durations: List[Optional[float]] = [None] * len(processes)
+    while None in durations:
+        for index, (process, log) in enumerate(processes):
+            if durations[index] is None and process.poll() is not None:
+                durations[index] = time.perf_counter() - start
+                log.close()
+        if None in durations:
+            time.sleep(POLL_SECONDS)
+
+    elapsed = time.perf_counter() - start
+    return [process.returncode for process, _ in processes], durations, elapsed
+
+
+def run_shards(
+    test_ids: List[str],
+    shards: int,
+    report_path: str,
+    network: str = TEST_NETWORK,
+    extra_args: Optional[List[str]] = None,
+    baseline: bool = False,
+) -> int:
+    """
+    Run the tests in parallel shards and write one merged JUnit report.
+
+    Prints the duration of every shard and the wall-clock time of the run. With `baseline`, the
+    same tests are first run in a single process so the speedup of sharding can be reported.
+
+    Args:
+        test_ids (List[str]): Node IDs to run.
+        shards (int): Number of parallel `ape test` processes.
+        report_path (str): Path of the merged JUnit XML report.
+        network (str): Network choice; must give each process its own chain.
+        extra_args (Optional[List[str]]): Extra arguments forwarded to every `ape test`.
+        baseline (bool): Also time a single-process run of the same tests.
+
+    Returns:
+        int: 0 when every shard passed, 1 otherwise.
+    """
+    baseline_elapsed = None
+    if baseline:
+        _, _, baseline_elapsed = _run_groups(
+            [test_ids], tempfile.mkdtemp(prefix="nftflex-baseline-"), network, extra_args
+        )
+        print(f"Single process: {len(test_ids)} tests, {baseline_elapsed:.1f}s")
+
+    groups = partition(test_ids, shards)
+    report_dir = tempfile.mkdtemp(prefix="nftflex-shards-")
+    returncodes, durations, elapsed = _run_groups(groups, report_dir, network, extra_args)
+    totals = merge_junit_reports(
+        [os.path.join(report_dir, f"shard-{index}.xml") for index in range(len(groups))], report_path
+    )
+
+    for index, (group, duration) in enumerate(zip(groups, durations)):
+        print(f"Shard {index}: {len(group)} tests, {duration:.1f}s")
+    print(
+        f"{totals['tests']} tests in {len(groups)} shards, {elapsed:.1f}s wall-clock: "
+        f"{totals['failures']} failed, {totals['errors']} errors, {totals['skipped']} skipped"
+    )
+    if baseline_elapsed is not None:
+        print(format_speedup(baseline_elapsed, elapsed, len(groups)))
+    print(f"Merged report: {report_path}")
+    failed_shards = [index for index, returncode in enumerate(returncodes) if returncode != 0]
+    for index in failed_shards:
+        print(f"Shard {index} failed, see {os.path.join(report_dir, f'shard-{index}.log')}")
+
+    return 1 if failed_shards else 0
+
+
+def format_speedup(baseline_seconds: float, sharded_seconds: float, shards: int) -> str:
+    """
+    Describe how much faster the sharded run was than a single process.
+
+    Args:
+        baseline_seconds (float): Wall-clock time of the single-process run.
+        sharded_seconds (float): Wall-clock time of the sharded run.
+        shards (int): Number of shards used.
+
+    Returns:
+        str: e.g. `Speedup: 3.1x with 4 shards (78% parallel efficiency)`.
+    """
+    speedup = baseline_seconds / sharded_seconds if sharded_seconds > 0 else float("inf")
+    return f"Speedup: {speedup:.1f}x with {shards} shards ({speedup / shards:.0%} parallel efficiency)"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the ape test suite in parallel shards.")
+    parser.add_argument("paths", nargs="*", default=["tests"], help="Test files or directories.")
+    parser.add_argument("-n", "--shards", type=int, default=os.cpu_count() or 1, help="Number of shards.")
+    parser.add_argument("--report", default="test-report.xml", help="Merged JUnit XML report path.")
+    parser.add_argument(
+        "--baseline", action="store_true", help="Also run the tests in one process and report the speedup."
+    )
+    args, extra_args = parser.parse_known_args(argv)
+
+    # Compile once up front so the shards do not race on writing .build/
+    subprocess.run(["ape", "compile"], cwd=PROJECT_DIR, check=True)
+
+    test_ids = collect_test_ids(args.paths)
+    if not test_ids:
+        print("No tests collected.")
+        return 1
+
+    return run_shards(
+        test_ids, args.shards, os.path.abspath(args.report), extra_args=extra_args, baseline=args.baseline
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
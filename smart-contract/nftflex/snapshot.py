@@ -0,0 +1,388 @@
+# Columnar snapshot of every NFTFlex rental, loaded with mmap instead of parsed.
+#
+# A snapshot is one file: a fixed header, then one fixed-width column per `Rental` field, each
+# starting on a 64-byte boundary. Loading maps the file and wraps the columns in NumPy arrays,
+# so it costs the same for 10 rentals as for 10 million; pages are read only when touched.
+#
+#   header   magic "NFXSNAP\0", format version, rental count, block number, block hash,
+#            block and timestamp of the last change to any rental (HTTP caching keys on them)
+#   columns  rentalId u64 | nftAddress 20B | tokenId u256 | owner 20B | renter 20B | startTime u64
+#            | endTime u64 | pricePerHour u256 | collateralToken 20B | collateralAmount u256
+#            | flags u8 (isFractional 1, pendingWithdrawal 2, inPlan 4)
+#
+# Integers are little-endian, u256 and addresses big-endian bytes. A snapshot is tagged with
+# the block it was taken at; resume_indexer() checks that block's hash against the chain and
+# then only syncs the events after it. Rentals that change after loading are kept apart from
+# the mapped rows until the next write_snapshot(), which moves the index onto the new file.
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+from heapq import merge
+from typing import Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+import numpy as np
+from eth_utils import to_checksum_address
+
+from nftflex.indexer import ChainIndexer, Rental, RentalIndex
+
+
+MAGIC = b"NFXSNAP\0"
+VERSION = 3
+# magic, version, reserved, count, block number, block hash, modified block, modified timestamp
+HEADER = struct.Struct("<8sIIQQ32sQQ")
+ALIGNMENT = 64
+IS_FRACTIONAL, PENDING_WITHDRAWAL, IN_PLAN = 1, 2, 4
+
+# (column, dtype, bytes per rental) in file order
+COLUMNS = (
+    ("rentalId", "<u8", 1),
+    ("nftAddress", "u1", 20),
+    ("tokenId", "u1", 32),
+    ("owner", "u1", 20),
+    ("renter", "u1", 20),
+    ("startTime", "<u8", 1),
+    ("endTime", "<u8", 1),
+    ("pricePerHour", "u1", 32),
+    ("collateralToken", "u1", 20),
+    ("collateralAmount", "u1", 32),
+    ("flags", "u1", 1),
+)
+NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _layout(count: int) -> Tuple[Dict[str, int], int]:
+    """Byte offset of each column for `count` rentals, and the file size."""
+    offsets = {}
+    offset = HEADER.size
+    for name, dtype, width in COLUMNS:
+        offset += -offset % ALIGNMENT
+        offsets[name] = offset
+        offset += count * np.dtype(dtype).itemsize * width
+    return offsets, offset
+
+
+def _columns_of(rentals: List[Rental]) -> Dict[str, np.ndarray]:
+    """Columns of `rentals`, in the order given."""
+    count = len(rentals)
+    columns = {}
+    for name in ("rentalId", "startTime", "endTime"):
+        columns[name] = np.fromiter((getattr(rental, name) for rental in rentals), dtype="<u8", count=count)
+    for name in ("nftAddress", "owner", "renter", "collateralToken"):
+        raw = b"".join(bytes.fromhex(getattr(rental, name)[2:]) for rental in rentals)
+        columns[name] = np.frombuffer(raw, dtype="u1").reshape(count, 20)
+    for name in ("tokenId", "pricePerHour", "collateralAmount"):
+        raw = b"".join(getattr(rental, name).to_bytes(32, "big") for rental in rentals)
+        columns[name] = np.frombuffer(raw, dtype="u1").reshape(count, 32)
+    flags = (
+        (IS_FRACTIONAL if r.isFractional else 0)
+        | (PENDING_WITHDRAWAL if r.pendingWithdrawal else 0)
+        | (IN_PLAN if r.inPlan else 0)
+        for r in rentals
+    )
+    columns["flags"] = np.fromiter(flags, dtype="u1", count=count)
+    return columns
+
+
+def _build_columns(rentals) -> Dict[str, np.ndarray]:
+    """Columns of `rentals` (a `RentalIndex.rentals`), ordered by rental ID."""
+    if isinstance(rentals, SnapshotRentals):
+        # Patch what changed since loading into the mapped columns, instead of decoding every rental
+        positions = [rentals._position(rental_id) for rental_id in rentals._changed]
+        changed = [rental for rental, position in zip(rentals._changed.values(), positions) if position is not None]
+        added = [rental for rental, position in zip(rentals._changed.values(), positions) if position is None]
+        patched = _columns_of(changed)
+        appended = _columns_of(added)
+        columns = {}
+        for name, column in rentals.snapshot.columns.items():
+            columns[name] = np.concatenate([column, appended[name]])
+            columns[name][[position for position in positions if position is not None]] = patched[name]
+    else:
+        columns = _columns_of(list(rentals.values()))
+
+    order = np.argsort(columns["rentalId"], kind="stable")
+    if (np.diff(order) != 1).any():
+        columns = {name: column[order] for name, column in columns.items()}
+    return columns
+
+
+def write_snapshot(path: str, index: RentalIndex) -> None:
+    """
+    Write every rental of `index` as of `index.block_number`.
+
+    The rentals are copied under the index lock and encoded outside it, so syncing and queries
+    are not held up by the write. The file is written next to `path` and renamed over it, so
+    readers never map a partial snapshot. An index loaded from a snapshot is then moved onto the
+    new file, so the rentals it kept aside since loading do not pile up.
+    """
+    state = index.copy()
+    columns = _build_columns(state.rentals)
+    block_number, block_hash = state.block_number, state.block_hash
+    modified_block, modified_timestamp = state.modified_block, state.modified_timestamp
+
+    count = len(columns["rentalId"])
+    offsets, size = _layout(count)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                0,
+                count,
+                block_number,
+                bytes.fromhex(block_hash[2:]).rjust(32, b"\0"),
+                modified_block,
+                modified_timestamp,
+            )
+        )
+        for name, _, _ in COLUMNS:
+            file.write(b"\0" * (offsets[name] - file.tell()))
+            file.write(columns[name].tobytes())
+        assert file.tell() == size
+    os.replace(temp_path, path)
+
+    if isinstance(state.rentals, SnapshotRentals):
+        snapshot = Snapshot(path)
+        index.replace_rentals(lambda rentals: _rebase(rentals, snapshot, state.rentals._changed))
+
+
+def _rebase(rentals: MutableMapping, snapshot: "Snapshot", written: Dict[int, Rental]) -> MutableMapping:
+    """
+    `rentals` on top of `snapshot`, which holds `written`: only the rentals stored since the
+    snapshot was copied stay aside from its rows.
+    """
+    if not isinstance(rentals, SnapshotRentals):
+        return rentals
+    rebased = SnapshotRentals(snapshot)
+    for rental_id, rental in rentals._changed.items():
+        if written.get(rental_id) is not rental:
+            rebased[rental_id] = rental
+    return rebased
+
+
+class Snapshot:
+    """A mapped snapshot file: `columns` are read-only NumPy views of it."""
+
+    def __init__(self, path: str):
+        # Everything is checked before mapping: mmap refuses empty files with a bare ValueError
+        with open(path, "rb") as file:
+            file_size = os.fstat(file.fileno()).st_size
+            if file_size < HEADER.size:
+                raise SnapshotError(f"{path} is not an NFTFlex snapshot")
+            magic, version, _, count, self.block_number, block_hash, self.modified_block, self.modified_timestamp = (
+                HEADER.unpack(file.read(HEADER.size))
+            )
+            if magic != MAGIC:
+                raise SnapshotError(f"{path} is not an NFTFlex snapshot")
+            if version != VERSION:
+                raise SnapshotError(f"{path} has snapshot format {version}, expected {VERSION}")
+
+            offsets, size = _layout(count)
+            if file_size != size:
+                raise SnapshotError(f"{path} is truncated")
+
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.count = count
+        self.block_hash = "0x" + block_hash.hex()
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype, width in COLUMNS:
+            column = np.frombuffer(self._map, dtype=dtype, count=count * width, offset=offsets[name])
+            self.columns[name] = column.reshape(count, width) if width > 1 else column
+        self._rows_by_address: Dict[str, Dict[str, np.ndarray]] = {}
+        self._available: Optional[np.ndarray] = None
+
+    def rental(self, position: int) -> Rental:
+        c = self.columns
+        flags = int(c["flags"][position])
+        return Rental(
+            rentalId=int(c["rentalId"][position]),
+            nftAddress=to_checksum_address(c["nftAddress"][position].tobytes()),
+            tokenId=int.from_bytes(c["tokenId"][position].tobytes(), "big"),
+            owner=to_checksum_address(c["owner"][position].tobytes()),
+            renter=to_checksum_address(c["renter"][position].tobytes()),
+            startTime=int(c["startTime"][position]),
+            endTime=int(c["endTime"][position]),
+            pricePerHour=int.from_bytes(c["pricePerHour"][position].tobytes(), "big"),
+            isFractional=bool(flags & IS_FRACTIONAL),
+            collateralToken=to_checksum_address(c["collateralToken"][position].tobytes()),
+            collateralAmount=int.from_bytes(c["collateralAmount"][position].tobytes(), "big"),
+            pendingWithdrawal=bool(flags & PENDING_WITHDRAWAL),
+            inPlan=bool(flags & IN_PLAN),
+        )
+
+    def uint256_values(self, name: str, rows: Optional[np.ndarray] = None) -> List[int]:
+        """
+        A u256 column (only `rows` of it, if given) as Python ints, without a per-row conversion
+        when every value fits 64 bits.
+        """
+        column = self.columns[name] if rows is None else self.columns[name][rows]
+        words = column.view(">u8")  # 4 big-endian words per rental
+        if not words[:, :3].any():
+            return words[:, 3].tolist()
+        return [int.from_bytes(row.tobytes(), "big") for row in column]
+
+    def rows_by_address(self, name: str) -> Dict[str, np.ndarray]:
+        """Lower-case address => ascending positions of the rows holding it in the address column `name`."""
+        lookup = self._rows_by_address.get(name)
+        if lookup is None:
+            # One 20-byte value per row, so rows group with a single sort instead of a decode each
+            keys = np.ascontiguousarray(self.columns[name]).view("V20").ravel()
+            addresses, inverse = np.unique(keys, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(addresses)))[:-1]
+            lookup = {
+                "0x" + address.tobytes().hex(): rows for address, rows in zip(addresses, np.split(order, bounds))
+            }
+            self._rows_by_address[name] = lookup
+        return lookup
+
+    def available_rows(self) -> np.ndarray:
+        """Per row, whether the rental has no renter and is in no plan (`Rental.is_available`)."""
+        if self._available is None:
+            self._available = ~self.columns["renter"].any(axis=1) & (self.columns["flags"] & IN_PLAN == 0)
+        return self._available
+
+    def matching_rows(
+        self, owner: Optional[str] = None, collateral_token: Optional[str] = None, available: Optional[bool] = None
+    ) -> Optional[np.ndarray]:
+        """Ascending positions of the rows passing the equality filters of `RentalIndex.query`; None without filters."""
+        rows = None
+        for name, address in (("owner", owner), ("collateralToken", collateral_token)):
+            if address is not None:
+                found = self.rows_by_address(name).get(address, NO_ROWS)
+                rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        if available is not None:
+            matching = self.available_rows() == available
+            rows = np.flatnonzero(matching) if rows is None else rows[matching[rows]]
+        return rows
+
+
+class SnapshotRentals(MutableMapping):
+    """
+    `RentalIndex.rentals` backed by a `Snapshot`: rentals are decoded from the columns on
+    access, and rentals stored after loading shadow their snapshot row.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self._ids = snapshot.columns["rentalId"]
+        self._changed: Dict[int, Rental] = {}
+        self._added = 0  # Changed rentals that are not in the snapshot
+        self._shadowed = np.zeros(len(self._ids), dtype=bool)  # Rows overridden by `_changed`
+
+    def copy(self) -> "SnapshotRentals":
+        """The same rentals; later changes to either one do not show in the other."""
+        copy = SnapshotRentals.__new__(SnapshotRentals)
+        copy.snapshot, copy._ids = self.snapshot, self._ids
+        copy._changed, copy._added, copy._shadowed = dict(self._changed), self._added, self._shadowed.copy()
+        return copy
+
+    def _position(self, rental_id: int) -> Optional[int]:
+        position = int(np.searchsorted(self._ids, rental_id))
+        if position < len(self._ids) and self._ids[position] == rental_id:
+            return position
+        return None
+
+    def __getitem__(self, rental_id: int) -> Rental:
+        rental = self._changed.get(rental_id)
+        if rental is not None:
+            return rental
+        position = self._position(rental_id) if isinstance(rental_id, int) and rental_id >= 0 else None
+        if position is None:
+            raise KeyError(rental_id)
+        return self.snapshot.rental(position)
+
+    def __setitem__(self, rental_id: int, rental: Rental) -> None:
+        if rental_id not in self._changed:
+            position = self._position(rental_id)
+            if position is None:
+                self._added += 1
+            else:
+                self._shadowed[position] = True
+        self._changed[rental_id] = rental
+
+    def __delitem__(self, rental_id: int) -> None:
+        raise TypeError("rentals are never removed")
+
+    def __iter__(self) -> Iterator[int]:
+        for rental_id in self._ids.tolist():
+            yield rental_id
+        for rental_id in self._changed:
+            if self._position(rental_id) is None:
+                yield rental_id
+
+    def __len__(self) -> int:
+        return len(self._ids) + self._added
+
+    def sort_keys(
+        self,
+        sort: str,
+        owner: Optional[str] = None,
+        collateral_token: Optional[str] = None,
+        available: Optional[bool] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        (sort value, rental ID) pairs of the rentals passing the equality filters of
+        `RentalIndex.query`, in ascending order. Snapshot rows are filtered and read on the
+        columns; only the rentals changed since loading are looked at one by one.
+        """
+        rows = self.snapshot.matching_rows(owner, collateral_token, available)
+        if self._changed:
+            rows = np.flatnonzero(~self._shadowed) if rows is None else rows[~self._shadowed[rows]]
+
+        if sort in ("rentalId", "startTime", "endTime"):
+            column = self.snapshot.columns[sort]
+            values = (column if rows is None else column[rows]).tolist()
+        else:
+            values = self.snapshot.uint256_values(sort, rows)
+        ids = (self._ids if rows is None else self._ids[rows]).tolist()
+
+        base = sorted(zip(values, ids))
+        changed = sorted(
+            (getattr(rental, sort), rental_id)
+            for rental_id, rental in self._changed.items()
+            if rental.matches(owner, collateral_token, available)
+        )
+        return list(merge(base, changed)) if changed else base
+
+
+def load_index(path: str) -> RentalIndex:
+    """A `RentalIndex` over the snapshot at `path`, as of its block."""
+    snapshot = Snapshot(path)
+    index = RentalIndex()
+    index.rentals = SnapshotRentals(snapshot)
+    index.block_number = snapshot.block_number
+    index.block_hash = snapshot.block_hash
+    index.modified_block = snapshot.modified_block
+    index.modified_timestamp = snapshot.modified_timestamp
+    return index
+
+
+def resume_indexer(w3, address: str, abi, path: str, **kwargs) -> ChainIndexer:
+    """
+    A `ChainIndexer` starting from the snapshot at `path`, so its first sync only reads the
+    events after the snapshot block. Starts from `start_block` (genesis by default) when there
+    is no usable snapshot or the chain no longer has the snapshot block (reorg, or a different chain).
+    """
+    index = None
+    if os.path.exists(path):
+        try:
+            index = load_index(path)
+            block = w3.eth.get_block(index.block_number)
+            if "0x" + bytes(block["hash"]).hex() != index.block_hash:
+                print(f"Snapshot block {index.block_number} is not on this chain, indexing from the start block")
+                index = None
+        except SnapshotError as e:
+            print(f"Ignoring snapshot: {e}")
+            index = None
+        except Exception as e:
+            print(f"Snapshot block is not available ({e}), indexing from the start block")
+            index = None
+
+    return ChainIndexer(w3, address, abi, index=index, **kwargs)
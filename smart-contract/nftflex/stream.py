@@ -0,0 +1,210 @@
+# WebSocket push of rental state changes, so clients patch single rentals instead of reloading.
+#
+#   ws://host/ws                 -> {"type": "snapshot", "block": N, "rentals": [...]}, then deltas
+#   ws://host/ws?fromBlock=N     -> every delta after block N, then live deltas
+#                                   (a snapshot instead if the deltas after N are no longer kept)
+#
+# A delta carries only the fields that changed:
+#   {"type": "delta", "block": 123, "rentalId": 4, "changes": {"renter": "0x..", "endTime": 1700000000}}
+# Deltas hold new values, not differences, so applying one twice is harmless: reconnecting clients
+# pass the block before the last one they applied as `fromBlock`, in case they were cut off halfway
+# through that block's deltas.
+#
+# Usage: python -m nftflex.stream --rpc-url http://127.0.0.1:8545
+import argparse
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from nftflex import instrumentation
+from nftflex.api import SNAPSHOT_EVERY, build_indexer, run_sync_loop
+from nftflex.indexer import ChainIndexer, Rental, RentalIndex
+
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DELTA_RETENTION = 10_000
+CLIENT_QUEUE_SIZE = 1_000
+
+
+def encode(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+def rental_delta(block: int, old: Optional[Rental], new: Rental) -> str:
+    """The delta message for one rental: every field for a new rental, the changed ones otherwise."""
+    new_fields = new.to_json()
+    if old is None:
+        changes = new_fields
+    else:
+        old_fields = old.to_json()
+        changes = {key: value for key, value in new_fields.items() if old_fields[key] != value}
+    changes.pop("rentalId", None)
+    return encode({"type": "delta", "block": block, "rentalId": new.rentalId, "changes": changes})
+
+
+class DeltaLog:
+    """The last `retention` encoded deltas, so reconnecting clients can resume from a block."""
+
+    def __init__(self, retention: int = DELTA_RETENTION, truncated_through: int = -1):
+        self.retention = retention
+        self.deltas: "deque[Tuple[int, str]]" = deque()
+        self.truncated_through = truncated_through  # Highest block with a delta that was dropped (or never kept)
+
+    def append(self, block: int, messages: List[str]) -> None:
+        for message in messages:
+            self.deltas.append((block, message))
+        while len(self.deltas) > self.retention:
+            dropped_block, _ = self.deltas.popleft()
+            self.truncated_through = max(self.truncated_through, dropped_block)
+
+    def since(self, block: int) -> Optional[List[str]]:
+        """Deltas after `block`, or None when some of them were already dropped."""
+        if block < self.truncated_through:
+            return None
+        return [message for delta_block, message in self.deltas if delta_block > block]
+
+
+class RentalStream:
+    """Turns index changes into delta messages and fans them out to connected WebSockets."""
+
+    def __init__(self, index: RentalIndex, retention: int = DELTA_RETENTION):
+        self.index = index
+        # The deltas up to the block the index already holds were never seen by this stream, so a
+        # client resuming from before it must get a snapshot instead of an empty backlog
+        self.log = DeltaLog(retention, truncated_through=index.block_number)
+        self.block = index.block_number
+        self.clients: Set[asyncio.Queue] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        index.listeners.append(self._on_change)
+
+    def _on_change(self, block: int, changes: List[Tuple[Optional[Rental], Rental]]) -> None:
+        # Called from the sync thread; hand over to the event loop, which owns the log and queues
+        messages = [rental_delta(block, old, new) for old, new in changes]
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.publish, block, messages)
+        else:
+            self.log.append(block, messages)
+            self.block = block
+
+    def publish(self, block: int, messages: List[str]) -> None:
+        self.log.append(block, messages)
+        self.block = block
+        for queue in list(self.clients):
+            for message in messages:
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # Too slow to keep up: drop what it has queued and disconnect it; it can
+                    # resume from the last block it applied
+                    self.clients.discard(queue)
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(None)
+                    break
+
+    def snapshot(self) -> str:
+        # Deltas of the snapshot block may still be queued for the event loop and reach the
+        # client after the snapshot, which re-applying makes harmless
+        block, rentals = self.index.read_all()
+        return encode({"type": "snapshot", "block": block, "rentals": [rental.to_json() for rental in rentals]})
+
+    def subscribe(self, from_block: Optional[int]) -> Tuple[asyncio.Queue, List[str]]:
+        """Register a client; returns its queue and the messages to send before live deltas."""
+        backlog = self.log.since(from_block) if from_block is not None else None
+        if backlog is None:
+            backlog = [self.snapshot()]
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.clients.add(queue)
+        return queue, backlog
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.clients.discard(queue)
+
+
+def create_app(
+    index: RentalIndex,
+    indexer: Optional[ChainIndexer] = None,
+    poll_interval: float = 1.0,
+    retention: int = DELTA_RETENTION,
+    snapshot_path: Optional[str] = None,
+    snapshot_every: int = SNAPSHOT_EVERY,
+) -> Starlette:
+    stream = RentalStream(index, retention)
+
+    async def websocket_endpoint(websocket: WebSocket) -> None:
+        from_block = websocket.query_params.get("fromBlock")
+        await websocket.accept()
+        try:
+            from_block = int(from_block) if from_block is not None else None
+        except ValueError:
+            await websocket.close(code=1008, reason="fromBlock must be an integer")
+            return
+
+        queue, backlog = stream.subscribe(from_block)
+        try:
+            for message in backlog:
+                await websocket.send_text(message)
+            while True:
+                message = await queue.get()
+                if message is None:
+                    await websocket.close(code=1013, reason="client too slow, resume from the last block")
+                    return
+                await websocket.send_text(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            stream.unsubscribe(queue)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        stream.loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        if indexer is not None:
+            threading.Thread(
+                target=run_sync_loop, args=(indexer, poll_interval, stop, snapshot_path, snapshot_every), daemon=True
+            ).start()
+        yield
+        stop.set()
+        stream.loop = None
+
+    app = Starlette(routes=[WebSocketRoute("/ws", websocket_endpoint)], lifespan=lifespan)
+    app.state.stream = stream
+    return app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Push NFTFlex rental changes over WebSocket.")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8545")
+    parser.add_argument("--registry", default=os.path.join(PROJECT_DIR, "contract_addresses.json"))
+    parser.add_argument("--abi", default=os.path.join(PROJECT_DIR, "abis", "NFTFlex_ABI.json"))
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--snapshot", help="Columnar snapshot to start from and keep up to date")
+    parser.add_argument("--snapshot-every", type=int, default=SNAPSHOT_EVERY, help="Blocks between snapshots")
+    parser.add_argument("--start-block", type=int, help="First block to index; defaults to the registered deploy block")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args(argv)
+    instrumentation.from_env()
+
+    indexer = build_indexer(args.rpc_url, args.registry, args.abi, args.snapshot, args.start_block)
+    indexer.sync()
+    print(f"Indexed {len(indexer.index.rentals)} rentals up to block {indexer.index.block_number}")
+
+    app = create_app(
+        indexer.index, indexer, args.poll_interval, snapshot_path=args.snapshot, snapshot_every=args.snapshot_every
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
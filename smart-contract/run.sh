@@ -47,6 +47,9 @@ ape test --network ethereum:local:test
 ape test -s -v
 ape test tests/test_NFTFlex.py -s
 
+# Parallel tests: one `ape test` process (and one isolated in-process chain) per shard
+python -m nftflex.sharding -n 4 tests/
+
 
 
 
@@ -83,9 +86,24 @@ ape console
 
 # Deployment
 ape run deploy --network ethereum:local:test
+# Same, with per-RPC-method / per-contract-function metrics, a JSON trace and a summary table at exit
+NFTFLEX_TRACE=deploy-trace.jsonl ape run deploy --network ethereum:local:test
 # Since Anvil is part of Foundry
 ape run deploy --network ethereum:local:foundry
 
+# Local dev chain: anvil with NFTFlex deployed and seeded, loaded from .chain-state/ when the
+# contract sources and seed data are unchanged, otherwise deployed (and saved) by `ape run deploy`
+python -m nftflex.chainstate --port 8545
+
+# Deploy to every network in deploy_networks.json at once (addresses keyed by chain ID)
+python -m nftflex.multichain --config deploy_networks.json
+
+# Push rental changes to the frontend over WebSocket (set VITE_RENTAL_STREAM_URL=ws://127.0.0.1:8001/ws in client/.env)
+python -m nftflex.stream --rpc-url http://127.0.0.1:8545
+
+# Start the rentals API from a columnar snapshot and only index the blocks after it
+python -m nftflex.api --rpc-url http://127.0.0.1:8545 --snapshot rentals.snapshot
+
 # Copy essential files to frontend
 cp -r abis/NFTFlex_ABI.json ../client/src/abis/NFTFlex.json && cp -r abis/SimpleNFT_ABI.json ../client/src/abis/SimpleNFT.json && cp -r contract_addresses.json ../client/src/contract_addresses.json
 
@@ -3,23 +3,24 @@
 # Scripts -> https://docs.apeworx.io/ape/stable/userguides/scripts.html
 import json
 import os
+import sys
+import time
 from ape import accounts, project, networks
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
 
+# Define the path to the parent directory and the file
+parent_dir = os.path.dirname(os.path.abspath(__file__))  # Get the current script's directory
+sys.path.insert(0, os.path.join(parent_dir, '..'))  # Make the `nftflex` helper package importable
 
+from nftflex import chainstate, instrumentation, seed
+from nftflex.registry import update_registry
 
-metadata_urls = [
-    "ipfs://QmQth5R8PWcM3GVrmeSrfmDrBXFk646x8Er4iU46zAD5Tm", # Bhawal Resort & Spa
-    "ipfs://QmZmPMzHxDKL4zmbBw6M4YhAuAkeUsFnvYV7uupuGoHte8", # The Royena Resort Ltd
-    "ipfs://QmbbLW4nkf3iGkEBPBUL8swMtWJ8PARNTFdJYAkMCDE9Ft", # Chuti Resort Gazipur
-    "ipfs://QmPn55rVcTsse3ZyVMG7vRVvTnRuvUZsxrAnCwFxXzqf4P", # CCULB Resort & Convention Hall
-    "ipfs://Qma9SwWr3JQoVny5E5yhkhu2iPjUDVNeNcBJT1AgE4z6Hn" # Third Terrace Resorts
-]
+# Opt-in RPC and transaction metrics: NFTFLEX_TRACE=trace.jsonl and/or NFTFLEX_METRICS_PORT=9100
+instrumentation.from_env()
 
+metadata_urls = seed.metadata_urls
 
-# Define the path to the parent directory and the file
-parent_dir = os.path.dirname(os.path.abspath(__file__))  # Get the current script's directory
 local_json_path = os.path.join(parent_dir, '..', '.build', '__local__.json')  # Path to the parent directory JSON file
 
 def save_abi(contract_name: str) -> None:
@@ -74,19 +75,21 @@ def save_abi(contract_name: str) -> None:
         print(f"ABI not found for contract '{contract_name}' in the JSON data!")
         return
 
-    # Write the ABI to a new JSON file
+    # Write the ABI to a new JSON file (abis/, unless nftflex.chainstate.boot() points it elsewhere)
+    abi_path = os.path.join(chainstate.ABI_DIR, f'{contract_name}_ABI.json')
     try:
-        with open(f'abis/{contract_name}_ABI.json', 'w') as contract_file:
+        os.makedirs(chainstate.ABI_DIR, exist_ok=True)
+        with open(abi_path, 'w') as contract_file:
             json.dump(contract_abi, contract_file, indent=4)
         print(f"ABI for contract '{contract_name}' saved successfully!")
     except IOError:
-        print(f"Error writing the ABI to the file '{contract_name}_ABI.json'!")
+        print(f"Error writing the ABI to the file '{abi_path}'!")
     except Exception as e:
         print(f"An unexpected error occurred while writing the ABI: {e}")
 
 
 
-def deploy_contracts(account) -> Dict[str, str]:
+def deploy_contracts(account) -> Tuple[Dict[str, str], int]:
     """
     Deploy SimpleNFT and NFTFlex contracts.
     
@@ -94,7 +97,7 @@ def deploy_contracts(account) -> Dict[str, str]:
         account: The account used for deploying the contracts.
     
     Returns:
-        Dict[str, str]: A dictionary containing the deployed contract addresses.
+        Tuple[Dict[str, str], int]: The deployed contract addresses, and the block NFTFlex was deployed in.
     """
     print("Deploying SimpleNFT...")
     simple_nft = account.deploy(project.SimpleNFT)
@@ -107,7 +110,7 @@ def deploy_contracts(account) -> Dict[str, str]:
     return {
         "SimpleNFT": simple_nft.address,
         "NFTFlex": nft_flex.address
-    }
+    }, nft_flex.receipt.block_number
 
 
 def list_nfts_for_rental(account, simple_nft, nft_flex, token_id: int, metadata_url: str) -> None:
@@ -124,10 +127,10 @@ def list_nfts_for_rental(account, simple_nft, nft_flex, token_id: int, metadata_
     nft_flex.createRental(
         simple_nft.address,
         token_id,
-        int(1e18),  # Price per hour (1 ETH)
-        False,  # Not fractional
-        "0x0000000000000000000000000000000000000000",  # Native ETH as collateral
-        int(2e18),  # Collateral amount (2 ETH)
+        seed.price_per_hour,  # Price per hour (1 ETH)
+        seed.is_fractional,  # Not fractional
+        seed.collateral_token,  # Native ETH as collateral
+        seed.collateral_amount,  # Collateral amount (2 ETH)
         sender=account
     )
     print(f"Created rental for token ID {token_id} with metadata {metadata_url}")
@@ -155,23 +158,84 @@ def mint_nft(account, simple_nft, metadata_url: str) -> int:
     return token_id
 
 
-def save_contract_data(active_network, contract_addresses) -> None:
+def save_chain_state(active_network, contract_addresses, deploy_block: int, deploy_seconds: float) -> None:
+    """
+    Dump the seeded local anvil chain, so `python -m nftflex.chainstate` can boot it without
+    redeploying. Other networks are left alone.
+    
+    Args:
+        active_network: The active network in use.
+        contract_addresses: A dictionary containing contract addresses.
+        deploy_block (int): The block NFTFlex was deployed in.
+        deploy_seconds (float): How long deploying and seeding took.
+    """
+    web3 = getattr(active_network, "web3", None)
+    if web3 is None or not chainstate.is_anvil(web3):
+        return
+
+    contract_data = {
+        "network": active_network.network.name,
+        **contract_addresses,
+        "NFTFlexDeployBlock": deploy_block
+    }
+    # Booting from the state skips this script, so it must also bring the ABIs save_abi writes
+    abis = {
+        contract_name: [item.model_dump(mode="json", by_alias=True) for item in getattr(project, contract_name).contract_type.abi]
+        for contract_name in contract_addresses
+    }
+    path = chainstate.save_state(web3, contract_data, abis, deploy_seconds)
+    print(f"Chain state saved to {path}")
+
+
+def save_contract_data(active_network, contract_addresses, deploy_block: int) -> None:
     """
-    Save the deployed contract addresses to a JSON file.
+    Save the deployed contract addresses to contract_addresses.json (or the registry
+    nftflex.chainstate.boot() asks for) under the active chain ID, keeping the addresses already
+    recorded for other chains.
     
     Args:
         active_network: The active network in use.
         contract_addresses: A dictionary containing contract addresses.
+        deploy_block (int): The block NFTFlex was deployed in; the indexer starts there.
     """
     contract_data = {
         "network": active_network.network.name,
-        **contract_addresses
+        **contract_addresses,
+        "NFTFlexDeployBlock": deploy_block
     }
 
-    with open("contract_addresses.json", "w") as file:
-        json.dump(contract_data, file, indent=4)
+    update_registry(chainstate.REGISTRY_PATH, {active_network.chain_id: contract_data})
+
+    print(f"Contract addresses for chain {active_network.chain_id} saved to {chainstate.REGISTRY_PATH}")
+
+def compile_contracts() -> Dict[str, Any]:
+    """
+    Compile the contracts if their sources changed. ape compiles lazily, on the first access to a
+    contract type, so this forces it here instead of in whichever step touches a contract first.
+    
+    Returns:
+        Dict[str, Any]: Contract name => compiled contract type.
+    """
+    return {contract_name: getattr(project, contract_name).contract_type for contract_name in ("SimpleNFT", "NFTFlex")}
+
+
+def instrument_provider(active_network, contract_types: Dict[str, Any]) -> None:
+    """
+    Record every RPC request of the active provider and name contract calls and deployments in the
+    report. Does nothing unless instrumentation is enabled.
+    
+    Args:
+        active_network: The active network in use.
+        contract_types (Dict[str, Any]): The compiled contract types, from compile_contracts().
+    """
+    if instrumentation.active() is None:
+        return
+
+    instrumentation.instrument(active_network.web3)
+    for contract_name, contract_type in contract_types.items():
+        abi = [item.model_dump(mode="json", by_alias=True) for item in contract_type.abi]
+        instrumentation.register_contract(contract_name, abi, contract_type.deployment_bytecode.bytecode)
 
-    print("Contract addresses saved to contract_addresses.json")
 
 def list_accounts():
     # List all account aliases
@@ -203,6 +267,8 @@ def list_accounts():
 
 
 def main():
+    start = time.perf_counter()
+
     # Determine the network and select the appropriate provider
     active_network = networks.active_provider
     print(f"Deploying on {active_network} network...")
@@ -210,8 +276,13 @@ def main():
     # Load an account to deploy the contracts
     account = accounts.test_accounts[-1]
 
+    with instrumentation.span("compile"):
+        contract_types = compile_contracts()
+    instrument_provider(active_network, contract_types)
+
     # Deploy the contracts
-    contract_addresses = deploy_contracts(account)
+    with instrumentation.span("deploy"):
+        contract_addresses, deploy_block = deploy_contracts(account)
 
     # Mint and list NFTs for rental
     simple_nft = project.SimpleNFT.at(contract_addresses["SimpleNFT"])
@@ -221,15 +292,18 @@ def main():
     # list_nfts_for_rental(account, simple_nft, nft_flex, token_id)
     # Assuming your images are uploaded to IPFS and you have their URLs
     # Iterate over metadata_urls to mint NFTs
-    for metadata_url in metadata_urls:
-        token_id = mint_nft(account, simple_nft, metadata_url)
-        list_nfts_for_rental(account, simple_nft, nft_flex, token_id, metadata_url) # Renting price and collateral
+    with instrumentation.span("seed"):
+        for metadata_url in metadata_urls:
+            token_id = mint_nft(account, simple_nft, metadata_url)
+            list_nfts_for_rental(account, simple_nft, nft_flex, token_id, metadata_url) # Renting price and collateral
 
 
     # Save contract data and ABI files
-    save_contract_data(active_network, contract_addresses)
-    save_abi("SimpleNFT")
-    save_abi("NFTFlex")
+    with instrumentation.span("save"):
+        save_contract_data(active_network, contract_addresses, deploy_block)
+        save_abi("SimpleNFT")
+        save_abi("NFTFlex")
+        save_chain_state(active_network, contract_addresses, deploy_block, time.perf_counter() - start)
 
     list_accounts()
 
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+from ape import accounts, project
+
+# Make the `nftflex` helper package importable from the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+"""
+Shared setup for the contract tests
+"""
+@pytest.fixture
+def owner():
+    """The first test account: deploys the contracts and lists the NFTs."""
+    return accounts.test_accounts[0]
+
+@pytest.fixture
+def user():
+    """A second test account, the renter."""
+    return accounts.test_accounts[1]
+
+@pytest.fixture
+def nft_flex_contract(owner):
+    """Deploys NFTFlex before each test."""
+    return owner.deploy(project.NFTFlex)
+
+@pytest.fixture
+def nft_contract(owner):
+    """Deploys SimpleNFT before each test."""
+    return owner.deploy(project.SimpleNFT)
@@ -3,6 +3,7 @@ import pytest
 import time
 from ape import accounts, project, chain, exceptions
 from eth_tester.exceptions import TransactionFailed
+from nftflex.permit import permit_signature
 
 
 
@@ -404,9 +405,10 @@ def test_only_owner_can_withdraw(nft_flex_contract, nft_contract, nft_address, o
     assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__OnlyOwnerCanWithdrawEarnings)
 
 
-def test_cannot_withdraw_before_rental_ends(nft_flex_contract, nft_contract, nft_address, owner, user, minted_nft):
+def test_can_withdraw_while_rental_active(nft_flex_contract, nft_contract, nft_address, owner, user, minted_nft):
     """
-    Ensures that the owner cannot withdraw earnings before the rental period ends.
+    Ensures that the owner can withdraw the prepaid fees before the rental period ends,
+    while the renter still cannot end the rental early.
     """
     
     # Step 1: Owner lists NFT for rental
@@ -423,12 +425,16 @@ def test_cannot_withdraw_before_rental_ends(nft_flex_contract, nft_contract, nft
     # Step 2: User starts rental
     nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
 
-    # Step 3: Owner tries to withdraw earnings too early
+    # Step 3: Owner withdraws while the rental is active
+    tx = nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+
+    assert tx.events.filter(nft_flex_contract.NFTFlex__EarningsWithdrawn)[0].amount == price_per_hour * duration
+    assert nft_flex_contract.s_rentals(rental_id).renter == user
+
     with pytest.raises(exceptions.ContractLogicError) as exc_info:
-        nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+        nft_flex_contract.endRental(rental_id, sender=user)
 
-    assert "NFTFlex__RentalStillActive" == exc_info.type.__name__
-    assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__RentalStillActive)
+    assert "NFTFlex__RentalPeriodNotEnded" == exc_info.type.__name__
 
 
 def test_cannot_withdraw_zero_earnings(nft_flex_contract, minted_nft, nft_address, owner, user):
@@ -586,4 +592,407 @@ def test_successful_erc20_withdrawal(nft_flex_contract, nft_contract, nft_addres
     assert event.owner == owner
     assert event.amount == expected_earnings
 
-    assert mock_erc20.balanceOf(owner) == initial_balance + expected_earnings
\ No newline at end of file
+    assert mock_erc20.balanceOf(owner) == initial_balance + expected_earnings
+
+
+# 🚀 STEP 9: Extending a rental in place
+def test_only_renter_can_extend_rental(nft_flex_contract, owner, user, minted_nft, nft_address):
+    """
+    Ensures that only the current renter can extend a rental.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.extendRental(rental_id, 1, value=price_per_hour, sender=owner)  # ❌ Owner is not the renter
+
+    assert "NFTFlex__OnlyRenterCanExtendRental" == exc_info.type.__name__
+    assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__OnlyRenterCanExtendRental)
+
+
+def test_extend_rental_requires_exact_fee(nft_flex_contract, owner, user, minted_nft, nft_address):
+    """
+    Ensures the renter pays exactly the fee for the extra hours and no collateral again.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.extendRental(rental_id, 1, value=price_per_hour + collateral_amount, sender=user)
+
+    assert "NFTFlex__IncorrectPaymentAmount" == exc_info.type.__name__
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.extendRental(rental_id, 0, value=0, sender=user)
+
+    assert "NFTFlex__DurationMustBeGreaterThanZero" == exc_info.type.__name__
+
+
+def test_extend_rental_moves_end_time_and_accrues_earnings(nft_flex_contract, owner, user, minted_nft, nft_address):
+    """
+    Ensures an extension keeps the collateral in place, moves endTime forward and
+    lets the owner withdraw both the original and the extension fees.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    rental_before = nft_flex_contract.s_rentals(rental_id)
+    contract_balance_before = nft_flex_contract.balance
+
+    extra_hours = 3
+    tx = nft_flex_contract.extendRental(rental_id, extra_hours, value=price_per_hour * extra_hours, sender=user)
+
+    rental = nft_flex_contract.s_rentals(rental_id)
+    assert rental.renter == user
+    assert rental.startTime == rental_before.startTime
+    assert rental.endTime == rental_before.endTime + extra_hours * 3600
+    assert nft_flex_contract.balance == contract_balance_before + price_per_hour * extra_hours
+    assert nft_flex_contract.getPendingEarnings(rental_id) == price_per_hour * (duration + extra_hours)
+
+    event = list(tx.events.filter(nft_flex_contract.NFTFlex__RentalExtended))[0]
+    assert event["rentalId"] == rental_id
+    assert event["renter"] == user
+    assert event["endTime"] == rental.endTime
+    assert event["extraFee"] == price_per_hour * extra_hours
+
+    # The extended rental is still active at the original end time
+    chain.mine(timestamp=rental_before.endTime + 1)
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.endRental(rental_id, sender=user)
+    assert "NFTFlex__RentalPeriodNotEnded" == exc_info.type.__name__
+
+    chain.mine(timestamp=rental.endTime + 1)
+    tx = nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+    event = tx.events.filter(nft_flex_contract.NFTFlex__EarningsWithdrawn)[0]
+    assert event.amount == price_per_hour * (duration + extra_hours)
+    assert nft_flex_contract.getPendingEarnings(rental_id) == 0
+
+    # Only the collateral is left to refund
+    nft_flex_contract.endRental(rental_id, sender=user)
+    assert nft_flex_contract.balance == 0
+
+
+def test_extend_expired_rental_after_withdrawal(nft_flex_contract, owner, user, minted_nft, nft_address):
+    """
+    Ensures an expired rental can be renewed after the owner withdrew, starting from now,
+    and that the owner must withdraw the new fee before the renter can end it.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+
+    rental = nft_flex_contract.s_rentals(rental_id)
+    chain.mine(timestamp=rental.endTime + 600)
+    nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+
+    tx = nft_flex_contract.extendRental(rental_id, 1, value=price_per_hour, sender=user)
+
+    rental = nft_flex_contract.s_rentals(rental_id)
+    assert rental.endTime == chain.blocks.head.timestamp + 3600
+    assert rental.pendingWithdrawal
+
+    chain.mine(timestamp=rental.endTime + 1)
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.endRental(rental_id, sender=user)
+    assert "NFTFlex__OwnerNeedToWithdrawEarnings" == exc_info.type.__name__
+
+    tx = nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+    assert tx.events.filter(nft_flex_contract.NFTFlex__EarningsWithdrawn)[0].amount == price_per_hour
+
+
+
+def test_withdraw_during_repeatedly_extended_rental(nft_flex_contract, owner, user, minted_nft, nft_address):
+    """
+    Ensures a renter who keeps extending before each expiry cannot lock the owner's earnings:
+    every extension fee is withdrawable as soon as it is paid.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+
+    withdrawn = 0
+    for _ in range(3):
+        rental = nft_flex_contract.s_rentals(rental_id)
+        chain.mine(timestamp=rental.endTime - 60)  # A minute before expiry
+        nft_flex_contract.extendRental(rental_id, 1, value=price_per_hour, sender=user)
+
+        tx = nft_flex_contract.withdrawEarnings(rental_id, sender=owner)
+        withdrawn += tx.events.filter(nft_flex_contract.NFTFlex__EarningsWithdrawn)[0].amount
+
+        rental = nft_flex_contract.s_rentals(rental_id)
+        assert chain.blocks.head.timestamp < rental.endTime
+        assert not rental.pendingWithdrawal
+        assert nft_flex_contract.getPendingEarnings(rental_id) == 0
+
+    assert withdrawn == price_per_hour * (duration + 3)
+
+    # Only the collateral is left to refund once the renter stops extending
+    chain.mine(timestamp=nft_flex_contract.s_rentals(rental_id).endTime + 1)
+    nft_flex_contract.endRental(rental_id, sender=user)
+    assert nft_flex_contract.balance == 0
+
+
+def test_extend_erc20_rental(nft_flex_contract, nft_address, owner, funded_user, minted_nft, mock_erc20):
+    """
+    Ensures an ERC-20 rental is extended by pulling the extra fee with transferFrom,
+    and that sending ETH along with it is rejected.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, mock_erc20.address, collateral_amount, sender=owner
+    )
+    mock_erc20.approve(nft_flex_contract.address, price_per_hour * duration + collateral_amount, sender=funded_user)
+    nft_flex_contract.rentNFT(rental_id, duration, sender=funded_user)
+    rental_before = nft_flex_contract.s_rentals(rental_id)
+
+    extra_hours = 3
+    extra_fee = price_per_hour * extra_hours
+    mock_erc20.approve(nft_flex_contract.address, extra_fee, sender=funded_user)
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.extendRental(rental_id, extra_hours, value=extra_fee, sender=funded_user)
+
+    assert "NFTFlex__IncorrectPaymentAmount" == exc_info.type.__name__
+
+    renter_balance = mock_erc20.balanceOf(funded_user)
+    contract_balance = mock_erc20.balanceOf(nft_flex_contract)
+    tx = nft_flex_contract.extendRental(rental_id, extra_hours, sender=funded_user)
+
+    assert mock_erc20.balanceOf(funded_user) == renter_balance - extra_fee
+    assert mock_erc20.balanceOf(nft_flex_contract) == contract_balance + extra_fee
+    assert mock_erc20.allowance(funded_user, nft_flex_contract.address) == 0
+    assert nft_flex_contract.s_rentals(rental_id).endTime == rental_before.endTime + extra_hours * 3600
+    assert nft_flex_contract.getPendingEarnings(rental_id) == price_per_hour * (duration + extra_hours)
+    assert tx.events.filter(nft_flex_contract.NFTFlex__RentalExtended)[0].extraFee == extra_fee
+
+    # Without a new approval the pull fails and the rental is left as it was
+    with pytest.raises(exceptions.ContractLogicError):
+        nft_flex_contract.extendRental(rental_id, 1, sender=funded_user)
+
+    assert nft_flex_contract.getPendingEarnings(rental_id) == price_per_hour * (duration + extra_hours)
+
+
+
+# 🚀 STEP 10: Renting with an EIP-2612 permit instead of approve
+def test_rent_nft_with_permit(nft_flex_contract, nft_address, owner, funded_user, minted_nft, mock_erc20):
+    """
+    Ensures an ERC-20 rental can be started in one transaction using a permit signature.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, mock_erc20.address, collateral_amount, sender=owner
+    )
+
+    total_payment = price_per_hour * duration + collateral_amount
+    deadline = chain.blocks.head.timestamp + 3600
+    v, r, s = permit_signature(mock_erc20, funded_user, nft_flex_contract.address, total_payment, deadline, chain.chain_id)
+
+    initial_balance = mock_erc20.balanceOf(funded_user)
+    tx = nft_flex_contract.rentNFTWithPermit(rental_id, duration, deadline, v, r, s, sender=funded_user)
+
+    rental = nft_flex_contract.s_rentals(rental_id)
+    assert rental.renter == funded_user
+    assert mock_erc20.balanceOf(funded_user) == initial_balance - total_payment
+    assert mock_erc20.balanceOf(nft_flex_contract) == total_payment
+    assert mock_erc20.nonces(funded_user) == 1
+    assert len(list(tx.events.filter(nft_flex_contract.NFTFlex__RentalStarted))) == 1
+
+
+def test_rent_nft_with_permit_requires_erc20_collateral(nft_flex_contract, nft_address, owner, user, minted_nft):
+    """
+    Ensures permit renting is rejected for rentals paid in native ETH.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+    )
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.rentNFTWithPermit(rental_id, duration, 0, 27, b"\x00" * 32, b"\x00" * 32, sender=user)
+
+    assert "NFTFlex__PermitRequiresERC20Collateral" == exc_info.type.__name__
+    assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__PermitRequiresERC20Collateral)
+
+
+def test_rent_nft_with_invalid_permit_fails(nft_flex_contract, nft_address, owner, funded_user, minted_nft, mock_erc20):
+    """
+    Ensures a permit for too small an amount does not let the rental start.
+    """
+
+    nft_flex_contract.createRental(
+        nft_address, minted_nft, price_per_hour, is_fractional, mock_erc20.address, collateral_amount, sender=owner
+    )
+
+    deadline = chain.blocks.head.timestamp + 3600
+    v, r, s = permit_signature(mock_erc20, funded_user, nft_flex_contract.address, collateral_amount, deadline, chain.chain_id)
+
+    with pytest.raises(exceptions.ContractLogicError):
+        nft_flex_contract.rentNFTWithPermit(rental_id, duration, deadline, v, r, s, sender=funded_user)
+
+    assert nft_flex_contract.s_rentals(rental_id).renter == "0x0000000000000000000000000000000000000000"
+
+
+# 🚀 STEP 11: Subscription plans
+@pytest.fixture
+def listed_rentals(nft_flex_contract, nft_contract, nft_address, owner):
+    """Mints and lists one NFT per resort and returns the rental IDs."""
+    rental_ids = []
+    for metadata_url in metadata_urls:
+        nft_contract.mint(owner, metadata_url, sender=owner)
+        token_id = nft_contract.nextTokenId() - 1
+        nft_flex_contract.createRental(
+            nft_address, token_id, price_per_hour, is_fractional, collateral_token, collateral_amount, sender=owner
+        )
+        rental_ids.append(nft_flex_contract.getRentalCounter() - 1)
+    return rental_ids
+
+
+def test_only_rental_owner_can_create_plan(nft_flex_contract, listed_rentals, user):
+    """Ensures a plan can only bundle rentals owned by the sender."""
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.createPlan(listed_rentals, collateral_token, price_per_hour, 720, sender=user)
+
+    assert "NFTFlex__SenderIsNotOwnerOfTheNFT" == exc_info.type.__name__
+
+
+def test_rental_can_only_be_in_one_plan(nft_flex_contract, listed_rentals, owner):
+    """Ensures a rental cannot be bundled into two plans."""
+
+    nft_flex_contract.createPlan(listed_rentals[:2], collateral_token, price_per_hour, 720, sender=owner)
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.createPlan(listed_rentals[1:], collateral_token, price_per_hour, 720, sender=owner)
+
+    assert "NFTFlex__RentalAlreadyInPlan" == exc_info.type.__name__
+
+
+def test_plan_rentals_cannot_be_rented_exclusively(nft_flex_contract, listed_rentals, owner, user):
+    """Ensures a rental is either rented by one renter or shared by subscribers, never both."""
+
+    # A rental that is currently rented cannot join a plan
+    nft_flex_contract.rentNFT(listed_rentals[0], duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.createPlan(listed_rentals[:2], collateral_token, price_per_hour, 720, sender=owner)
+    assert "NFTFlex__NFTAlreadyRented" == exc_info.type.__name__
+
+    # Nor can a rental in a plan be rented on its own
+    nft_flex_contract.createPlan(listed_rentals[1:], collateral_token, price_per_hour, 720, sender=owner)
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.rentNFT(listed_rentals[1], duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    assert "NFTFlex__RentalInPlan" == exc_info.type.__name__
+    assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__RentalInPlan)
+
+    nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)
+    assert nft_flex_contract.s_rentals(listed_rentals[1]).renter == "0x0000000000000000000000000000000000000000"
+    assert nft_flex_contract.hasAccess(listed_rentals[1], user)
+
+
+def test_subscribe_grants_access_to_every_rental_in_plan(nft_flex_contract, listed_rentals, owner, user):
+    """Ensures one subscription covers every rental in the plan until it expires."""
+
+    period_hours = 720
+    tx = nft_flex_contract.createPlan(listed_rentals[:3], collateral_token, price_per_hour, period_hours, sender=owner)
+    plan_id = tx.events.filter(nft_flex_contract.NFTFlex__PlanCreated)[0].planId
+    assert list(nft_flex_contract.getPlanRentals(plan_id)) == listed_rentals[:3]
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.subscribe(plan_id, 2, value=price_per_hour, sender=user)
+    assert "NFTFlex__IncorrectPaymentAmount" == exc_info.type.__name__
+
+    tx = nft_flex_contract.subscribe(plan_id, 2, value=price_per_hour * 2, sender=user)
+    event = tx.events.filter(nft_flex_contract.NFTFlex__Subscribed)[0]
+    assert event.subscriber == user
+    assert event.endTime == chain.blocks.head.timestamp + 2 * period_hours * 3600
+    assert nft_flex_contract.getSubscriptionEnd(plan_id, user) == event.endTime
+
+    for rental in listed_rentals[:3]:
+        assert nft_flex_contract.hasAccess(rental, user)
+        assert not nft_flex_contract.hasAccess(rental, owner)
+    assert not nft_flex_contract.hasAccess(listed_rentals[3], user)  # Not in the plan
+
+    chain.mine(timestamp=event.endTime + 1)
+    assert not nft_flex_contract.hasAccess(listed_rentals[0], user)
+
+
+def test_resubscribing_extends_active_subscription(nft_flex_contract, listed_rentals, owner, user):
+    """Ensures paying again while subscribed adds periods to the current expiry."""
+
+    nft_flex_contract.createPlan(listed_rentals, collateral_token, price_per_hour, 24, sender=owner)
+    tx = nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)
+    first_end = tx.events.filter(nft_flex_contract.NFTFlex__Subscribed)[0].endTime
+
+    tx = nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)
+
+    assert tx.events.filter(nft_flex_contract.NFTFlex__Subscribed)[0].endTime == first_end + 24 * 3600
+
+
+def test_plan_owner_withdraws_subscription_earnings(nft_flex_contract, listed_rentals, owner, user):
+    """Ensures subscription fees go to the plan owner, once."""
+
+    nft_flex_contract.createPlan(listed_rentals, collateral_token, price_per_hour, 720, sender=owner)
+    nft_flex_contract.subscribe(0, 3, value=price_per_hour * 3, sender=user)
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.withdrawPlanEarnings(0, sender=user)
+    assert "NFTFlex__OnlyOwnerCanWithdrawEarnings" == exc_info.type.__name__
+
+    initial_balance = owner.balance
+    tx = nft_flex_contract.withdrawPlanEarnings(0, sender=owner)
+    event = tx.events.filter(nft_flex_contract.NFTFlex__PlanEarningsWithdrawn)[0]
+    assert event.amount == price_per_hour * 3
+    assert owner.balance == initial_balance + price_per_hour * 3 - tx.gas_used * tx.gas_price
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.withdrawPlanEarnings(0, sender=owner)
+    assert "NFTFlex__EarningTransferFailed" == exc_info.type.__name__
+
+
+def test_plan_owner_closes_plan_after_subscriptions_expire(nft_flex_contract, listed_rentals, owner, user):
+    """Ensures a closed plan releases its rentals, but only once every subscription has ended."""
+
+    period_hours = 24
+    nft_flex_contract.createPlan(listed_rentals[:2], collateral_token, price_per_hour, period_hours, sender=owner)
+    tx = nft_flex_contract.subscribe(0, 2, value=price_per_hour * 2, sender=user)
+    end_time = tx.events.filter(nft_flex_contract.NFTFlex__Subscribed)[0].endTime
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.closePlan(0, sender=user)
+    assert "NFTFlex__SenderIsNotOwnerOfTheNFT" == exc_info.type.__name__
+
+    # The subscriber keeps the access they paid for
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.closePlan(0, sender=owner)
+    assert "NFTFlex__PlanHasActiveSubscriptions" == exc_info.type.__name__
+    assert isinstance(exc_info.value, nft_flex_contract.NFTFlex__PlanHasActiveSubscriptions)
+
+    chain.mine(timestamp=end_time + 1)
+    tx = nft_flex_contract.closePlan(0, sender=owner)
+    event = tx.events.filter(nft_flex_contract.NFTFlex__PlanClosed)[0]
+    assert list(event.rentalIds) == listed_rentals[:2]
+    assert nft_flex_contract.s_plans(0).closed
+
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)
+    assert "NFTFlex__PlanIsClosed" == exc_info.type.__name__
+
+    # The rentals can be rented on their own or bundled into a new plan again
+    nft_flex_contract.rentNFT(listed_rentals[0], duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    assert nft_flex_contract.hasAccess(listed_rentals[0], user)
+    nft_flex_contract.createPlan(listed_rentals[1:2], collateral_token, price_per_hour, period_hours, sender=owner)
+
+    # Fees collected before closing stay withdrawable
+    tx = nft_flex_contract.withdrawPlanEarnings(0, sender=owner)
+    assert tx.events.filter(nft_flex_contract.NFTFlex__PlanEarningsWithdrawn)[0].amount == price_per_hour * 2
@@ -0,0 +1,461 @@
+# Stateful property-based tests for the NFTFlex rental lifecycle.
+# Docs -> https://hypothesis.readthedocs.io/en/latest/stateful.html
+#
+# Hypothesis generates random sequences of createRental, rentNFT, rentNFTWithPermit,
+# extendRental, endRental, withdrawEarnings, the plan calls (createPlan, subscribe, closePlan,
+# withdrawPlanEarnings) and time warps across several owners, renters and both payment types,
+# and checks every step against a Python reference model. Contracts are deployed once; each
+# sequence starts from a chain snapshot and is rolled back afterwards instead of redeploying.
+#
+# Raise the budget with e.g. NFTFLEX_FUZZ_EXAMPLES=5000 ape test tests/test_NFTFlex_stateful.py
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pytest
+from ape import accounts, project, chain, exceptions
+from hypothesis import HealthCheck, settings, strategies as st
+from hypothesis.stateful import RuleBasedStateMachine, invariant, precondition, rule, run_state_machine_as_test
+
+from nftflex.permit import permit_signature
+
+
+"""
+Variables
+"""
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+HOUR = 3600
+tokens_per_owner = 3
+max_examples = int(os.environ.get("NFTFLEX_FUZZ_EXAMPLES", 50))
+steps_per_sequence = int(os.environ.get("NFTFLEX_FUZZ_STEPS", 30))
+metadata_url = "ipfs://QmQth5R8PWcM3GVrmeSrfmDrBXFk646x8Er4iU46zAD5Tm"  # Bhawal Resort & Spa
+
+
+@dataclass
+class RentalModel:
+    """Reference state of one rental, updated the way NFTFlex is expected to update it."""
+    owner: str
+    token_id: int
+    collateral_token: str
+    price_per_hour: int
+    collateral_amount: int
+    renter: str = ZERO_ADDRESS
+    start_time: int = 0
+    end_time: int = 0
+    pending_withdrawal: bool = False
+    earnings: int = 0
+    plan_id: Optional[int] = None
+
+
+@dataclass
+class PlanModel:
+    """Reference state of one subscription plan."""
+    owner: str
+    payment_token: str
+    price_per_period: int
+    period_hours: int
+    rental_ids: List[int]
+    earnings: int = 0
+    active_until: int = 0
+    closed: bool = False
+    subscription_end: Dict[str, int] = field(default_factory=dict)
+
+
+def assert_reverts(error_name, call, *args, **kwargs):
+    """Calls a contract method and checks it reverts with the given custom error."""
+    with pytest.raises(exceptions.ContractLogicError) as exc_info:
+        call(*args, **kwargs)
+    assert error_name == exc_info.type.__name__
+
+
+class NFTFlexLifecycle(RuleBasedStateMachine):
+    # Set by the test before the state machine runs
+    nft_flex = None
+    nft_contract = None
+    mock_erc20 = None
+    owners = []
+    renters = []
+    owned_tokens = {}
+
+    def __init__(self):
+        super().__init__()
+        self.snapshot = chain.snapshot()
+        self.rentals = []
+        self.plans = []
+
+    def teardown(self):
+        chain.restore(self.snapshot)
+
+    """
+    Helpers
+    """
+    def pick_rental(self, index):
+        """Returns (rental_id, model); rental_id == len(rentals) stands for a rental that does not exist."""
+        rental_id = index % (len(self.rentals) + 1)
+        return rental_id, (self.rentals[rental_id] if rental_id < len(self.rentals) else None)
+
+    def pick_plan(self, index):
+        """Returns (plan_id, model); plan_id == len(plans) stands for a plan that does not exist."""
+        plan_id = index % (len(self.plans) + 1)
+        return plan_id, (self.plans[plan_id] if plan_id < len(self.plans) else None)
+
+    def outstanding(self, token):
+        """Collateral held for active renters plus unwithdrawn rental and plan earnings, in `token`."""
+        rental_funds = sum(
+            (rental.collateral_amount if rental.renter != ZERO_ADDRESS else 0) + rental.earnings
+            for rental in self.rentals
+            if rental.collateral_token == token
+        )
+        plan_fees = sum(plan.earnings for plan in self.plans if plan.payment_token == token)
+        return rental_funds + plan_fees
+
+    def start_rental(self, rental, renter, hours, now):
+        """Applies a successful rentNFT / rentNFTWithPermit to the model."""
+        rental.renter = renter.address
+        rental.start_time = now
+        rental.end_time = now + hours * HOUR
+        rental.pending_withdrawal = True
+        rental.earnings += rental.price_per_hour * hours
+
+    """
+    Rules
+    """
+    @rule(
+        owner_index=st.integers(0, 1),
+        token_index=st.integers(0, tokens_per_owner - 1),
+        use_erc20=st.booleans(),
+        price_per_hour=st.integers(1, 10**18),
+        collateral_amount=st.integers(0, 10**18),
+    )
+    def create_rental(self, owner_index, token_index, use_erc20, price_per_hour, collateral_amount):
+        owner = self.owners[owner_index]
+        token_id = self.owned_tokens[owner.address][token_index]
+        collateral_token = self.mock_erc20.address if use_erc20 else ZERO_ADDRESS
+
+        self.nft_flex.createRental(
+            self.nft_contract.address, token_id, price_per_hour, False, collateral_token, collateral_amount, sender=owner
+        )
+        self.rentals.append(RentalModel(owner.address, token_id, collateral_token, price_per_hour, collateral_amount))
+
+    @rule(index=st.integers(0, 10**6), renter_index=st.integers(0, 1), hours=st.integers(0, 5))
+    def rent_nft(self, index, renter_index, hours):
+        rental_id, rental = self.pick_rental(index)
+        renter = self.renters[renter_index]
+
+        if rental is None:
+            assert_reverts("NFTFlex__RentalDoesNotExist", self.nft_flex.rentNFT, rental_id, hours, sender=renter)
+            return
+        if rental.renter != ZERO_ADDRESS:
+            assert_reverts("NFTFlex__NFTAlreadyRented", self.nft_flex.rentNFT, rental_id, hours, sender=renter)
+            return
+        if hours == 0:
+            assert_reverts("NFTFlex__DurationMustBeGreaterThanZero", self.nft_flex.rentNFT, rental_id, hours, sender=renter)
+            return
+        if rental.plan_id is not None:
+            assert_reverts("NFTFlex__RentalInPlan", self.nft_flex.rentNFT, rental_id, hours, sender=renter)
+            return
+
+        fee = rental.price_per_hour * hours
+        value = fee + rental.collateral_amount if rental.collateral_token == ZERO_ADDRESS else 0
+        now = chain.pending_timestamp
+        self.nft_flex.rentNFT(rental_id, hours, value=value, sender=renter)
+
+        self.start_rental(rental, renter, hours, now)
+
+    @rule(index=st.integers(0, 10**6), renter_index=st.integers(0, 1), hours=st.integers(0, 5))
+    def rent_nft_with_permit(self, index, renter_index, hours):
+        rental_id, rental = self.pick_rental(index)
+        renter = self.renters[renter_index]
+        deadline = chain.pending_timestamp + HOUR
+        amount = rental.price_per_hour * hours + rental.collateral_amount if rental is not None else 0
+        v, r, s = permit_signature(self.mock_erc20, renter, self.nft_flex.address, amount, deadline, chain.chain_id)
+
+        def rent():
+            return self.nft_flex.rentNFTWithPermit(rental_id, hours, deadline, v, r, s, sender=renter)
+
+        if rental is None:
+            assert_reverts("NFTFlex__RentalDoesNotExist", rent)
+            return
+        if rental.collateral_token == ZERO_ADDRESS:
+            assert_reverts("NFTFlex__PermitRequiresERC20Collateral", rent)
+            return
+        if rental.renter != ZERO_ADDRESS:
+            assert_reverts("NFTFlex__NFTAlreadyRented", rent)
+            return
+        if hours == 0:
+            assert_reverts("NFTFlex__DurationMustBeGreaterThanZero", rent)
+            return
+        if rental.plan_id is not None:
+            assert_reverts("NFTFlex__RentalInPlan", rent)
+            return
+
+        now = chain.pending_timestamp
+        rent()
+        assert self.mock_erc20.allowance(renter, self.nft_flex.address) == 0
+
+        self.start_rental(rental, renter, hours, now)
+        # The permit replaced the standing approval from the setup; restore it for the other rules
+        self.mock_erc20.approve(self.nft_flex.address, 2**256 - 1, sender=renter)
+
+    @rule(index=st.integers(0, 10**6), caller_index=st.integers(0, 3), hours=st.integers(0, 3))
+    def extend_rental(self, index, caller_index, hours):
+        rental_id, rental = self.pick_rental(index)
+        caller = (self.renters + self.owners)[caller_index]
+
+        if rental is None:
+            assert_reverts("NFTFlex__RentalDoesNotExist", self.nft_flex.extendRental, rental_id, hours, sender=caller)
+            return
+        if caller.address != rental.renter:
+            assert_reverts("NFTFlex__OnlyRenterCanExtendRental", self.nft_flex.extendRental, rental_id, hours, sender=caller)
+            return
+        if hours == 0:
+            assert_reverts("NFTFlex__DurationMustBeGreaterThanZero", self.nft_flex.extendRental, rental_id, hours, sender=caller)
+            return
+
+        fee = rental.price_per_hour * hours
+        value = fee if rental.collateral_token == ZERO_ADDRESS else 0
+        now = chain.pending_timestamp
+        self.nft_flex.extendRental(rental_id, hours, value=value, sender=caller)
+
+        rental.end_time = max(rental.end_time, now) + hours * HOUR
+        rental.pending_withdrawal = True
+        rental.earnings += fee
+
+    @rule(index=st.integers(0, 10**6), caller_index=st.integers(0, 3))
+    def end_rental(self, index, caller_index):
+        rental_id, rental = self.pick_rental(index)
+        caller = (self.renters + self.owners)[caller_index]
+
+        if rental is None or caller.address != rental.renter:
+            assert_reverts("NFTFlex__OnlyRenterCanEndRental", self.nft_flex.endRental, rental_id, sender=caller)
+            return
+        if chain.pending_timestamp < rental.end_time:
+            assert_reverts("NFTFlex__RentalPeriodNotEnded", self.nft_flex.endRental, rental_id, sender=caller)
+            return
+        if rental.pending_withdrawal:
+            assert_reverts("NFTFlex__OwnerNeedToWithdrawEarnings", self.nft_flex.endRental, rental_id, sender=caller)
+            return
+
+        self.nft_flex.endRental(rental_id, sender=caller)
+
+        rental.renter = ZERO_ADDRESS
+        rental.start_time = 0
+        rental.end_time = 0
+
+    @rule(index=st.integers(0, 10**6), caller_index=st.integers(0, 3))
+    def withdraw_earnings(self, index, caller_index):
+        rental_id, rental = self.pick_rental(index)
+        caller = (self.renters + self.owners)[caller_index]
+
+        if rental is None or caller.address != rental.owner:
+            assert_reverts("NFTFlex__OnlyOwnerCanWithdrawEarnings", self.nft_flex.withdrawEarnings, rental_id, sender=caller)
+            return
+        if rental.earnings == 0:
+            assert_reverts("NFTFlex__EarningTransferFailed", self.nft_flex.withdrawEarnings, rental_id, sender=caller)
+            return
+
+        tx = self.nft_flex.withdrawEarnings(rental_id, sender=caller)
+        assert tx.events.filter(self.nft_flex.NFTFlex__EarningsWithdrawn)[0].amount == rental.earnings
+
+        rental.earnings = 0
+        rental.pending_withdrawal = False
+
+    @rule(
+        owner_index=st.integers(0, 1),
+        indexes=st.lists(st.integers(0, 10**6), max_size=3),
+        use_erc20=st.booleans(),
+        price_per_period=st.integers(0, 10**18),
+        period_hours=st.integers(0, 48),
+    )
+    def create_plan(self, owner_index, indexes, use_erc20, price_per_period, period_hours):
+        owner = self.owners[owner_index]
+        rental_ids = [self.pick_rental(index)[0] for index in indexes]
+        payment_token = self.mock_erc20.address if use_erc20 else ZERO_ADDRESS
+        args = (rental_ids, payment_token, price_per_period, period_hours)
+
+        if not rental_ids:
+            assert_reverts("NFTFlex__PlanMustIncludeRentals", self.nft_flex.createPlan, *args, sender=owner)
+            return
+        if price_per_period == 0:
+            assert_reverts("NFTFlex__PriceMustBeGreaterThanZero", self.nft_flex.createPlan, *args, sender=owner)
+            return
+        if period_hours == 0:
+            assert_reverts("NFTFlex__DurationMustBeGreaterThanZero", self.nft_flex.createPlan, *args, sender=owner)
+            return
+
+        # Rentals are checked in order, and a rental listed twice is already in the plan the second time
+        seen = set()
+        for rental_id in rental_ids:
+            rental = self.rentals[rental_id] if rental_id < len(self.rentals) else None
+            if rental is None or rental.owner != owner.address:
+                assert_reverts("NFTFlex__SenderIsNotOwnerOfTheNFT", self.nft_flex.createPlan, *args, sender=owner)
+                return
+            if rental.plan_id is not None or rental_id in seen:
+                assert_reverts("NFTFlex__RentalAlreadyInPlan", self.nft_flex.createPlan, *args, sender=owner)
+                return
+            if rental.renter != ZERO_ADDRESS:
+                assert_reverts("NFTFlex__NFTAlreadyRented", self.nft_flex.createPlan, *args, sender=owner)
+                return
+            seen.add(rental_id)
+
+        self.nft_flex.createPlan(*args, sender=owner)
+
+        plan_id = len(self.plans)
+        self.plans.append(PlanModel(owner.address, payment_token, price_per_period, period_hours, rental_ids))
+        for rental_id in rental_ids:
+            self.rentals[rental_id].plan_id = plan_id
+
+    @rule(index=st.integers(0, 10**6), subscriber_index=st.integers(0, 1), periods=st.integers(0, 3))
+    def subscribe(self, index, subscriber_index, periods):
+        plan_id, plan = self.pick_plan(index)
+        subscriber = self.renters[subscriber_index]
+
+        if plan is None:
+            assert_reverts("NFTFlex__PlanDoesNotExist", self.nft_flex.subscribe, plan_id, periods, sender=subscriber)
+            return
+        if plan.closed:
+            assert_reverts("NFTFlex__PlanIsClosed", self.nft_flex.subscribe, plan_id, periods, sender=subscriber)
+            return
+        if periods == 0:
+            assert_reverts("NFTFlex__DurationMustBeGreaterThanZero", self.nft_flex.subscribe, plan_id, periods, sender=subscriber)
+            return
+
+        fee = plan.price_per_period * periods
+        value = fee if plan.payment_token == ZERO_ADDRESS else 0
+        now = chain.pending_timestamp
+        self.nft_flex.subscribe(plan_id, periods, value=value, sender=subscriber)
+
+        current_end = plan.subscription_end.get(subscriber.address, 0)
+        end_time = (current_end if current_end > now else now) + periods * plan.period_hours * HOUR
+        plan.subscription_end[subscriber.address] = end_time
+        plan.active_until = max(plan.active_until, end_time)
+        plan.earnings += fee
+
+    @rule(index=st.integers(0, 10**6), caller_index=st.integers(0, 3))
+    def close_plan(self, index, caller_index):
+        plan_id, plan = self.pick_plan(index)
+        caller = (self.renters + self.owners)[caller_index]
+
+        if plan is None or caller.address != plan.owner:
+            assert_reverts("NFTFlex__SenderIsNotOwnerOfTheNFT", self.nft_flex.closePlan, plan_id, sender=caller)
+            return
+        if plan.closed:
+            assert_reverts("NFTFlex__PlanIsClosed", self.nft_flex.closePlan, plan_id, sender=caller)
+            return
+        if chain.pending_timestamp < plan.active_until:
+            assert_reverts("NFTFlex__PlanHasActiveSubscriptions", self.nft_flex.closePlan, plan_id, sender=caller)
+            return
+
+        self.nft_flex.closePlan(plan_id, sender=caller)
+
+        plan.closed = True
+        for rental_id in plan.rental_ids:
+            self.rentals[rental_id].plan_id = None
+
+    @rule(index=st.integers(0, 10**6), caller_index=st.integers(0, 3))
+    def withdraw_plan_earnings(self, index, caller_index):
+        plan_id, plan = self.pick_plan(index)
+        caller = (self.renters + self.owners)[caller_index]
+
+        if plan is None or caller.address != plan.owner:
+            assert_reverts("NFTFlex__OnlyOwnerCanWithdrawEarnings", self.nft_flex.withdrawPlanEarnings, plan_id, sender=caller)
+            return
+        if plan.earnings == 0:
+            assert_reverts("NFTFlex__EarningTransferFailed", self.nft_flex.withdrawPlanEarnings, plan_id, sender=caller)
+            return
+
+        tx = self.nft_flex.withdrawPlanEarnings(plan_id, sender=caller)
+        assert tx.events.filter(self.nft_flex.NFTFlex__PlanEarningsWithdrawn)[0].amount == plan.earnings
+
+        plan.earnings = 0
+
+    @rule(seconds=st.sampled_from([1, HOUR - 1, HOUR, HOUR + 1, 3 * HOUR, 6 * HOUR]))
+    def warp(self, seconds):
+        chain.mine(timestamp=chain.pending_timestamp + seconds)
+
+    """
+    Invariants
+    """
+    @invariant()
+    def contract_holds_collateral_plus_earnings(self):
+        assert self.nft_flex.balance == self.outstanding(ZERO_ADDRESS)
+        assert self.mock_erc20.balanceOf(self.nft_flex) == self.outstanding(self.mock_erc20.address)
+
+    @precondition(lambda self: self.rentals)
+    @invariant()
+    def rentals_match_model(self):
+        assert self.nft_flex.getRentalCounter() == len(self.rentals)
+        for rental_id, rental in enumerate(self.rentals):
+            on_chain = self.nft_flex.s_rentals(rental_id)
+            assert on_chain.owner == rental.owner
+            assert on_chain.renter == rental.renter
+            assert on_chain.startTime == rental.start_time
+            assert on_chain.endTime == rental.end_time
+            assert on_chain.pricePerHour == rental.price_per_hour
+            assert on_chain.pendingWithdrawal == rental.pending_withdrawal
+            assert self.nft_flex.getPendingEarnings(rental_id) == rental.earnings
+
+    @precondition(lambda self: self.plans)
+    @invariant()
+    def plans_match_model(self):
+        assert self.nft_flex.getPlanCounter() == len(self.plans)
+        for plan_id, plan in enumerate(self.plans):
+            on_chain = self.nft_flex.s_plans(plan_id)
+            assert on_chain.owner == plan.owner
+            assert on_chain.earnings == plan.earnings
+            assert on_chain.activeUntil == plan.active_until
+            assert on_chain.closed == plan.closed
+            assert list(self.nft_flex.getPlanRentals(plan_id)) == plan.rental_ids
+            for subscriber in self.renters:
+                expected_end = plan.subscription_end.get(subscriber.address, 0)
+                assert self.nft_flex.getSubscriptionEnd(plan_id, subscriber) == expected_end
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture(scope="module")
+def lifecycle_setup():
+    """Deploys the contracts, mints NFTs for each owner and funds and approves the renters once."""
+    deployer = accounts.test_accounts[0]
+    owners = [accounts.test_accounts[0], accounts.test_accounts[1]]
+    renters = [accounts.test_accounts[2], accounts.test_accounts[3]]
+
+    nft_flex = deployer.deploy(project.NFTFlex)
+    nft_contract = deployer.deploy(project.SimpleNFT)
+    mock_erc20 = deployer.deploy(project.MockERC20, "MockToken", "MKT", 18, 1_000_000 * 10**18)
+
+    owned_tokens = {}
+    for owner in owners:
+        owned_tokens[owner.address] = []
+        for _ in range(tokens_per_owner):
+            nft_contract.mint(owner, metadata_url, sender=deployer)
+            owned_tokens[owner.address].append(nft_contract.nextTokenId() - 1)
+
+    for renter in renters:
+        mock_erc20.transfer(renter, 100_000 * 10**18, sender=deployer)
+        mock_erc20.approve(nft_flex.address, 2**256 - 1, sender=renter)
+
+    NFTFlexLifecycle.nft_flex = nft_flex
+    NFTFlexLifecycle.nft_contract = nft_contract
+    NFTFlexLifecycle.mock_erc20 = mock_erc20
+    NFTFlexLifecycle.owners = owners
+    NFTFlexLifecycle.renters = renters
+    NFTFlexLifecycle.owned_tokens = owned_tokens
+    return NFTFlexLifecycle
+
+
+"""
+Testing begins
+"""
+
+def test_rental_lifecycle_matches_reference_model(lifecycle_setup):
+    run_state_machine_as_test(
+        lifecycle_setup,
+        settings=settings(
+            max_examples=max_examples,
+            stateful_step_count=steps_per_sequence,
+            deadline=None,
+            suppress_health_check=[HealthCheck.too_slow],
+        ),
+    )
@@ -0,0 +1,132 @@
+from dataclasses import replace
+
+import pytest
+from starlette.testclient import TestClient
+
+from nftflex.api import create_app
+from nftflex.indexer import ZERO_ADDRESS, Rental, RentalIndex
+
+
+"""
+Variables
+"""
+owner_a = "0x00000000000000000000000000000000000000aa"
+owner_b = "0x00000000000000000000000000000000000000bb"
+renter = "0x00000000000000000000000000000000000000cc"
+token = "0x00000000000000000000000000000000000000dd"
+
+
+def make_rental(rental_id, owner=owner_a, price=10**18, rented=False, collateral_token=ZERO_ADDRESS):
+    return Rental(
+        rentalId=rental_id,
+        nftAddress=token,
+        tokenId=rental_id + 1,
+        owner=owner,
+        renter=renter if rented else ZERO_ADDRESS,
+        startTime=1_000 if rented else 0,
+        endTime=1_000 + 3600 * (rental_id + 1) if rented else 0,
+        pricePerHour=price,
+        isFractional=False,
+        collateralToken=collateral_token,
+        collateralAmount=2 * 10**18,
+        pendingWithdrawal=rented,
+    )
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture
+def index():
+    index = RentalIndex()
+    rentals = [
+        make_rental(i, owner=owner_a if i % 2 == 0 else owner_b, price=(10 - i) * 10**17, rented=i % 3 == 0,
+                    collateral_token=token if i >= 8 else ZERO_ADDRESS)
+        for i in range(10)
+    ]
+    index.apply(rentals, block_number=5, block_hash="0x05", block_timestamp=1_700_000_000)
+    return index
+
+@pytest.fixture
+def client(index):
+    return TestClient(create_app(index))
+
+
+"""
+Testing begins
+"""
+
+def test_cursor_pagination_walks_every_rental_once(client):
+    seen = []
+    cursor = None
+    while True:
+        response = client.get("/rentals", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        seen += [rental["rentalId"] for rental in body["rentals"]]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == list(range(10))
+
+
+def test_sort_by_price_descending_with_cursor(client):
+    first = client.get("/rentals", params={"sort": "pricePerHour", "order": "desc", "limit": 4}).json()
+    second = client.get(
+        "/rentals", params={"sort": "pricePerHour", "order": "desc", "limit": 4, "cursor": first["nextCursor"]}
+    ).json()
+
+    prices = [int(rental["pricePerHour"]) for rental in first["rentals"] + second["rentals"]]
+    assert prices == sorted(prices, reverse=True)
+    assert [rental["rentalId"] for rental in first["rentals"]] == [0, 1, 2, 3]
+    assert [rental["rentalId"] for rental in second["rentals"]] == [4, 5, 6, 7]
+
+
+def test_filters(client):
+    def ids(**params):
+        return [rental["rentalId"] for rental in client.get("/rentals", params=params).json()["rentals"]]
+
+    assert ids(owner=owner_b.upper().replace("0X", "0x")) == [1, 3, 5, 7, 9]
+    assert ids(available="true") == [1, 2, 4, 5, 7, 8]
+    assert ids(available="false", owner=owner_a) == [0, 6]
+    assert ids(collateralToken=token) == [8, 9]
+    assert ids(minPrice=5 * 10**17, maxPrice=7 * 10**17) == [3, 4, 5]
+    assert ids(sort="endTime", order="desc", available="false") == [9, 6, 3, 0]
+
+
+def test_plan_rentals_are_not_available(client, index):
+    """A rental bundled into a subscription plan has no renter but cannot be rented on its own."""
+    index.apply([replace(make_rental(2), inPlan=True)], block_number=6, block_hash="0x06", block_timestamp=1_700_000_012)
+
+    ids = [rental["rentalId"] for rental in client.get("/rentals", params={"available": "true"}).json()["rentals"]]
+    assert ids == [1, 4, 5, 7, 8]
+    assert client.get("/rentals/2").json()["rental"]["inPlan"] is True
+
+
+def test_invalid_parameters_return_400(client):
+    assert client.get("/rentals", params={"sort": "owner"}).status_code == 400
+    assert client.get("/rentals", params={"limit": 0}).status_code == 400
+    assert client.get("/rentals", params={"minPrice": "cheap"}).status_code == 400
+    assert client.get("/rentals", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/rentals/99").status_code == 404
+
+
+def test_unchanged_pages_return_304(client, index):
+    response = client.get("/rentals", params={"limit": 5})
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    assert client.get("/rentals", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/rentals", params={"limit": 5}, headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    # New blocks that do not touch any rental keep the cached copy valid
+    index.apply([make_rental(0, price=(10 - 0) * 10**17, rented=True)], 6, "0x06", 1_700_000_012)
+    assert client.get("/rentals", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 304
+
+    # A changed rental invalidates it
+    index.apply([make_rental(1, owner=owner_b, price=1)], 7, "0x07", 1_700_000_024)
+    response = client.get("/rentals", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"7"'
+    assert response.json()["rentals"][1]["pricePerHour"] == "1"
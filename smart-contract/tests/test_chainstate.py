@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+from nftflex import chainstate, seed
+from nftflex.anvil import anvil_available, start_anvil, stop_anvil
+from nftflex.chainstate import boot, load_state, save_abis, save_state, state_key, state_path
+
+
+"""
+Variables
+"""
+contracts = {"network": "local", "SimpleNFT": "0x1", "NFTFlex": "0x2"}
+abis = {
+    "SimpleNFT": [{"inputs": [], "name": "nextTokenId", "outputs": [], "stateMutability": "view", "type": "function"}],
+    "NFTFlex": [{"anonymous": False, "inputs": [], "name": "NFTFlex__RentalExtended", "type": "event"}],
+}
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture
+def project_copy(tmp_path):
+    """The files the state key is built from, copied so they can be edited."""
+    for pattern in chainstate.STATE_INPUTS:
+        directory = os.path.dirname(pattern)
+        os.makedirs(tmp_path / directory, exist_ok=True)
+    for name in os.listdir(os.path.join(chainstate.PROJECT_DIR, "contracts")):
+        shutil.copy(os.path.join(chainstate.PROJECT_DIR, "contracts", name), tmp_path / "contracts" / name)
+    for path in ("ape-config.yaml", "nftflex/seed.py", "scripts/deploy.py"):
+        shutil.copy(os.path.join(chainstate.PROJECT_DIR, path), tmp_path / path)
+    return tmp_path
+
+
+"""
+Testing begins
+"""
+
+def test_state_key_follows_sources_and_seed_data(project_copy):
+    key = state_key(str(project_copy))
+    assert key == state_key(chainstate.PROJECT_DIR)
+
+    # Files that do not change the deployed chain keep the key
+    (project_copy / "README.md").write_text("notes")
+    (project_copy / "contracts" / "notes.txt").write_text("notes")
+    assert state_key(str(project_copy)) == key
+
+    with open(project_copy / "contracts" / "NFTFlex.sol", "a") as file:
+        file.write("\n// changed\n")
+    changed_source = state_key(str(project_copy))
+    assert changed_source != key
+
+    with open(project_copy / "nftflex" / "seed.py", "a") as file:
+        file.write("\nprice_per_hour = int(2e18)\n")
+    assert state_key(str(project_copy)) not in (key, changed_source)
+
+
+def test_state_path_is_versioned_by_format_and_key(tmp_path):
+    path = state_path("0123456789abcdef", str(tmp_path))
+    assert os.path.basename(path) == f"anvil-state-v{chainstate.STATE_FORMAT}-0123456789abcdef.json"
+
+
+def test_save_abis_writes_the_files_deploy_writes(tmp_path):
+    """Booting from a state skips deploy.py, so the ABIs it carries must land where save_abi puts them."""
+    abi_dir = tmp_path / "abis"
+    save_abis(abis, str(abi_dir))
+
+    assert sorted(os.listdir(abi_dir)) == ["NFTFlex_ABI.json", "SimpleNFT_ABI.json"]
+    with open(abi_dir / "NFTFlex_ABI.json", "r") as file:
+        assert json.load(file) == abis["NFTFlex"]
+
+
+@pytest.mark.skipif(not anvil_available(), reason="anvil is not installed")
+def test_dumped_state_loads_into_a_fresh_anvil(tmp_path):
+    """Balances, nonces and blocks of the dumped chain must be there after loading it elsewhere."""
+    source, target = start_anvil(8611), start_anvil(8612)
+    try:
+        w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8611"))
+        Account.enable_unaudited_hdwallet_features()
+        deployer = Account.from_mnemonic(seed.mnemonic, account_path=f"m/44'/60'/0'/0/{seed.deployer_account_index}")
+        recipient = Account.create().address
+        tx = {"to": recipient, "value": 12345, "gas": 21000, "gasPrice": w3.eth.gas_price, "nonce": 0, "chainId": 31337}
+        w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(deployer.sign_transaction(tx).raw_transaction))
+
+        state_dir = str(tmp_path / "state")
+        old_file = os.path.join(state_dir, "anvil-state-v1-stale.json")
+        os.makedirs(state_dir)
+        open(old_file, "w").close()
+
+        path = save_state(w3, contracts, abis, 1.5, state_dir)
+        assert not os.path.exists(old_file)
+
+        saved = load_state("http://127.0.0.1:8612", path)
+        loaded = Web3(Web3.HTTPProvider("http://127.0.0.1:8612"))
+
+        assert saved["contracts"] == contracts
+        assert saved["abis"] == abis
+        assert saved["deploySeconds"] == 1.5
+        assert loaded.eth.get_balance(recipient) == 12345
+        assert loaded.eth.get_transaction_count(deployer.address) == 1
+        assert loaded.eth.block_number == saved["blockNumber"]
+    finally:
+        stop_anvil(source)
+        stop_anvil(target)
+
+
+def test_boot_deploys_when_the_state_cannot_be_loaded(tmp_path, monkeypatch):
+    """The stale file goes, a fresh node is started, and deploy.py is pointed at the requested registry and ABIs."""
+    started, stopped, deploys = [], [], []
+    monkeypatch.setattr(chainstate, "start_anvil", lambda port: started.append(port) or f"anvil-{len(started)}")
+    monkeypatch.setattr(chainstate, "stop_anvil", stopped.append)
+    monkeypatch.setattr(chainstate, "load_state", lambda url, path: json.load(open(path)))
+    monkeypatch.setattr(chainstate.subprocess, "run", lambda command, **kwargs: deploys.append(kwargs["env"]))
+
+    state_dir = str(tmp_path / "state")
+    path = state_path(state_key(), state_dir)
+    os.makedirs(state_dir)
+    with open(path, "w") as file:
+        file.write('{"format": 2, "chainId": 31337')  # Cut short
+
+    process, report = boot(8545, str(tmp_path / "registry.json"), state_dir, abi_dir=str(tmp_path / "abis"))
+
+    assert report["mode"] == "deploy"
+    assert not os.path.exists(path)
+    assert (started, stopped, process) == ([8545, 8545], ["anvil-1"], "anvil-2")
+    assert deploys[0]["NFTFLEX_STATE_DIR"] == state_dir
+    assert deploys[0]["NFTFLEX_REGISTRY"] == str(tmp_path / "registry.json")
+    assert deploys[0]["NFTFLEX_ABI_DIR"] == str(tmp_path / "abis")
+
+
+@pytest.mark.skipif(not anvil_available() or shutil.which("ape") is None, reason="anvil and ape are not installed")
+def test_unloadable_state_falls_back_to_deploy(tmp_path):
+    """A broken state file must be replaced by a deploy that writes the registry and ABIs it was given."""
+    state_dir = str(tmp_path / "state")
+    registry_path = str(tmp_path / "contract_addresses.json")
+    abi_dir = str(tmp_path / "abis")
+    path = state_path(state_key(), state_dir)
+    os.makedirs(state_dir)
+    with open(path, "w") as file:
+        file.write('{"format": 2, "chainId": 31337, "state": "0xnot-a-state"')  # Cut short
+
+    process, report = boot(8613, registry_path, state_dir, abi_dir=abi_dir)
+    try:
+        assert report["mode"] == "deploy"
+        with open(registry_path, "r") as file:
+            assert "NFTFlex" in json.load(file)["31337"]
+        assert sorted(os.listdir(abi_dir)) == ["NFTFlex_ABI.json", "SimpleNFT_ABI.json"]
+        with open(path, "r") as file:
+            assert "abis" in json.load(file)  # Replaced by the deploy's own dump
+    finally:
+        stop_anvil(process)
@@ -0,0 +1,165 @@
+# Gas and transaction-count comparisons between equivalent flows.
+# Run with `ape test tests/test_gas_benchmarks.py -s` to see the printed report.
+import time
+
+import pytest
+from ape import project, chain
+from nftflex.permit import permit_signature
+
+
+"""
+Variables
+"""
+price_per_hour = 10 ** 18
+collateral_token = "0x0000000000000000000000000000000000000000"
+collateral_amount = 10 ** 18
+rental_id = 0
+duration = 2
+metadata_url = "ipfs://QmQth5R8PWcM3GVrmeSrfmDrBXFk646x8Er4iU46zAD5Tm"  # Bhawal Resort & Spa
+
+
+"""
+Setup for testing (owner, user and the deployed contracts come from conftest.py)
+"""
+@pytest.fixture
+def eth_rental(nft_flex_contract, nft_contract, owner, user):
+    """Lists a freshly minted NFT with ETH collateral and rents it to `user`."""
+    nft_contract.mint(owner, metadata_url, sender=owner)
+    token_id = nft_contract.nextTokenId() - 1
+    nft_flex_contract.createRental(
+        nft_contract.address, token_id, price_per_hour, False, collateral_token, collateral_amount, sender=owner
+    )
+    nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    return nft_flex_contract.s_rentals(rental_id)
+
+
+@pytest.fixture
+def mock_erc20(owner, user):
+    token = owner.deploy(project.MockERC20, "MockToken", "MKT", 18, 1_000_000 * 10**18)
+    token.transfer(user, 10**20, sender=owner)
+    return token
+
+@pytest.fixture
+def erc20_listing(nft_flex_contract, nft_contract, mock_erc20, owner):
+    """Lists a freshly minted NFT with ERC-20 collateral."""
+    nft_contract.mint(owner, metadata_url, sender=owner)
+    token_id = nft_contract.nextTokenId() - 1
+    nft_flex_contract.createRental(
+        nft_contract.address, token_id, price_per_hour, False, mock_erc20.address, collateral_amount, sender=owner
+    )
+    return rental_id
+
+
+def report(title, flows, elapsed=None):
+    """
+    Prints gas and tx count per flow, e.g. {"current": [receipt, ...], "new": [...]}.
+    `elapsed` optionally maps the same flow names to wall-clock seconds.
+    """
+    print(f"\n{title}")
+    for name, receipts in flows.items():
+        line = f"  {name:<28} txs={len(receipts):<3} gas={sum(r.gas_used for r in receipts)}"
+        if elapsed:
+            line += f" latency={elapsed[name] * 1000:.1f}ms"
+        print(line)
+
+
+"""
+Benchmarks
+"""
+
+def test_renewal_gas_extend_vs_end_and_rerent(nft_flex_contract, eth_rental, owner, user):
+    """Renewing in place must take fewer transactions and less gas than end + re-rent."""
+    snapshot = chain.snapshot()
+
+    # Current flow: wait for expiry, owner withdraws, renter ends (collateral refund) and rents again
+    chain.mine(timestamp=eth_rental.endTime + 1)
+    current = [
+        nft_flex_contract.withdrawEarnings(rental_id, sender=owner),
+        nft_flex_contract.endRental(rental_id, sender=user),
+        nft_flex_contract.rentNFT(rental_id, duration, value=price_per_hour * duration + collateral_amount, sender=user),
+    ]
+
+    chain.restore(snapshot)
+
+    # New flow: one extension, the collateral never moves; the owner still collects the fees,
+    # which is possible mid-rental, so both flows end with the first period's fees withdrawn
+    extended = [
+        nft_flex_contract.extendRental(rental_id, duration, value=price_per_hour * duration, sender=user),
+        nft_flex_contract.withdrawEarnings(rental_id, sender=owner),
+    ]
+
+    report("Rental renewal", {"withdraw + end + rentNFT": current, "extendRental + withdraw": extended})
+    assert len(extended) < len(current)
+    assert sum(r.gas_used for r in extended) < sum(r.gas_used for r in current)
+
+
+def test_erc20_rental_gas_permit_vs_approve(nft_flex_contract, mock_erc20, erc20_listing, user):
+    """Renting with a permit must take one transaction and less gas than approve + rentNFT."""
+    total_payment = price_per_hour * duration + collateral_amount
+    snapshot = chain.snapshot()
+
+    start = time.perf_counter()
+    current = [
+        mock_erc20.approve(nft_flex_contract.address, total_payment, sender=user),
+        nft_flex_contract.rentNFT(erc20_listing, duration, sender=user),
+    ]
+    current_elapsed = time.perf_counter() - start
+
+    chain.restore(snapshot)
+
+    # Signing happens off-chain but is part of the renter's end-to-end latency
+    start = time.perf_counter()
+    deadline = chain.blocks.head.timestamp + 3600
+    v, r, s = permit_signature(mock_erc20, user, nft_flex_contract.address, total_payment, deadline, chain.chain_id)
+    permit = [
+        nft_flex_contract.rentNFTWithPermit(erc20_listing, duration, deadline, v, r, s, sender=user),
+    ]
+    permit_elapsed = time.perf_counter() - start
+
+    report(
+        "ERC-20 rental",
+        {"approve + rentNFT": current, "rentNFTWithPermit": permit},
+        {"approve + rentNFT": current_elapsed, "rentNFTWithPermit": permit_elapsed},
+    )
+    assert len(permit) < len(current)
+    assert sum(r.gas_used for r in permit) < sum(r.gas_used for r in current)
+
+
+def test_subscription_gas_50_assets_vs_50_rentals(nft_flex_contract, nft_contract, owner, user):
+    """
+    One subscription covering 50 assets must cost less gas than 50 individual rentals, and
+    so must creating the plan (paid once by the owner) plus the first subscription.
+    """
+    asset_count = 50
+    rental_ids = []
+    for _ in range(asset_count):
+        nft_contract.mint(owner, metadata_url, sender=owner)
+        token_id = nft_contract.nextTokenId() - 1
+        nft_flex_contract.createRental(
+            nft_contract.address, token_id, price_per_hour, False, collateral_token, collateral_amount, sender=owner
+        )
+        rental_ids.append(nft_flex_contract.getRentalCounter() - 1)
+
+    # Rentals in a plan cannot be rented on their own, so rent them before the plan exists
+    snapshot = chain.snapshot()
+    individual = [
+        nft_flex_contract.rentNFT(i, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+        for i in rental_ids
+    ]
+    chain.restore(snapshot)
+
+    plan = [nft_flex_contract.createPlan(rental_ids, collateral_token, price_per_hour, duration, sender=owner)]
+    subscription = [nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)]
+
+    report(
+        f"Access to {asset_count} assets",
+        {
+            "rentNFT x50": individual,
+            "createPlan (once per plan)": plan,
+            "subscribe": subscription,
+            "createPlan + subscribe": plan + subscription,
+        },
+    )
+    assert all(nft_flex_contract.hasAccess(i, user) for i in rental_ids)
+    assert sum(r.gas_used for r in subscription) < sum(r.gas_used for r in individual) / asset_count * 2
+    assert sum(r.gas_used for r in plan + subscription) < sum(r.gas_used for r in individual)
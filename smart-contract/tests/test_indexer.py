@@ -0,0 +1,130 @@
+import json
+import os
+
+import pytest
+from ape import chain
+
+from nftflex.indexer import PLAN_EVENTS, RENTAL_EVENTS, ZERO_ADDRESS, ChainIndexer
+
+
+"""
+Variables
+"""
+price_per_hour = 10 ** 18
+collateral_amount = 10 ** 18
+duration = 2
+metadata_url = "ipfs://QmQth5R8PWcM3GVrmeSrfmDrBXFk646x8Er4iU46zAD5Tm"  # Bhawal Resort & Spa
+
+
+"""
+Setup for testing (owner, user and the deployed contracts come from conftest.py)
+"""
+@pytest.fixture
+def indexer(nft_flex_contract, abi):
+    return ChainIndexer(chain.provider.web3, nft_flex_contract.address, abi)
+
+
+@pytest.fixture
+def abi(nft_flex_contract):
+    return [item.model_dump(mode="json", by_alias=True) for item in nft_flex_contract.contract_type.abi]
+
+
+def list_nft(nft_flex_contract, nft_contract, owner):
+    nft_contract.mint(owner, metadata_url, sender=owner)
+    token_id = nft_contract.nextTokenId() - 1
+    nft_flex_contract.createRental(
+        nft_contract.address, token_id, price_per_hour, False, ZERO_ADDRESS, collateral_amount, sender=owner
+    )
+
+
+"""
+Testing begins
+"""
+
+def test_sync_indexes_created_and_rented_rentals(indexer, nft_flex_contract, nft_contract, owner, user):
+    """The indexed view must match s_rentals after every sync, and report only what changed."""
+    for _ in range(3):
+        list_nft(nft_flex_contract, nft_contract, owner)
+
+    changed = indexer.sync()
+
+    assert sorted(rental.rentalId for rental in changed) == [0, 1, 2]
+    assert indexer.index.block_number == chain.blocks.head.number
+    assert all(rental.collateralAmount == collateral_amount for rental in indexer.index.rentals.values())
+
+    nft_flex_contract.rentNFT(1, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    modified_block = chain.blocks.head.number
+    chain.mine(3)
+
+    changed = indexer.sync()
+
+    assert [rental.rentalId for rental in changed] == [1]
+    assert indexer.index.rentals[1].renter == user.address
+    assert indexer.index.rentals[1].endTime == nft_flex_contract.s_rentals(1).endTime
+    assert indexer.index.modified_block == modified_block
+    assert indexer.sync() == []
+
+
+def test_sync_indexes_extended_rentals(indexer, nft_flex_contract, nft_contract, owner, user):
+    """An extension only emits NFTFlex__RentalExtended; the indexed endTime must follow it."""
+    list_nft(nft_flex_contract, nft_contract, owner)
+    nft_flex_contract.rentNFT(0, duration, value=price_per_hour * duration + collateral_amount, sender=user)
+    indexer.sync()
+    end_time = indexer.index.rentals[0].endTime
+
+    nft_flex_contract.extendRental(0, 3, value=price_per_hour * 3, sender=user)
+    changed = indexer.sync()
+
+    assert [rental.rentalId for rental in changed] == [0]
+    assert indexer.index.rentals[0].endTime == end_time + 3 * 3600 == nft_flex_contract.s_rentals(0).endTime
+    assert indexer.index.modified_block == chain.blocks.head.number
+
+
+def test_sync_tracks_plan_membership(indexer, nft_flex_contract, nft_contract, owner, user):
+    """Rentals bundled into a plan cannot be rented on their own, so they are not available until it closes."""
+    for _ in range(3):
+        list_nft(nft_flex_contract, nft_contract, owner)
+    nft_flex_contract.createPlan([0, 1], ZERO_ADDRESS, price_per_hour, 24, sender=owner)
+    tx = nft_flex_contract.subscribe(0, 1, value=price_per_hour, sender=user)
+    indexer.sync()
+
+    assert [indexer.index.rentals[rental_id].inPlan for rental_id in range(3)] == [True, True, False]
+    page, _ = indexer.index.query(available=True)
+    assert [rental.rentalId for rental in page] == [2]
+
+    chain.mine(timestamp=tx.events.filter(nft_flex_contract.NFTFlex__Subscribed)[0].endTime + 1)
+    nft_flex_contract.closePlan(0, sender=owner)
+    changed = indexer.sync()
+
+    assert sorted(rental.rentalId for rental in changed) == [0, 1]
+    assert not any(rental.inPlan for rental in indexer.index.rentals.values())
+    page, _ = indexer.index.query(available=True)
+    assert [rental.rentalId for rental in page] == [0, 1, 2]
+
+
+def test_sync_starts_at_start_block(nft_flex_contract, nft_contract, abi, owner):
+    """A fresh index reads no events from before `start_block`."""
+    list_nft(nft_flex_contract, nft_contract, owner)
+    start_block = chain.blocks.head.number + 1
+    list_nft(nft_flex_contract, nft_contract, owner)
+
+    indexer = ChainIndexer(chain.provider.web3, nft_flex_contract.address, abi, start_block=start_block)
+
+    assert [rental.rentalId for rental in indexer.sync()] == [1]
+
+
+def test_indexer_rejects_abi_without_rental_events(nft_flex_contract, abi):
+    """A stale ABI must fail loudly instead of silently never indexing the missing events."""
+    stale_abi = [item for item in abi if item.get("name") != "NFTFlex__RentalExtended"]
+
+    with pytest.raises(ValueError, match="NFTFlex__RentalExtended"):
+        ChainIndexer(chain.provider.web3, nft_flex_contract.address, stale_abi)
+
+
+def test_committed_abis_have_rental_events():
+    """The ABIs the API, stream and client load by default must carry every event the indexer needs."""
+    project_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    for path in ("abis/NFTFlex_ABI.json", "../client/src/abis/NFTFlex.json"):
+        with open(os.path.join(project_dir, path), "r") as file:
+            events = {item["name"] for item in json.load(file) if item["type"] == "event"}
+        assert set(RENTAL_EVENTS) | set(PLAN_EVENTS) <= events, path
@@ -0,0 +1,139 @@
+import json
+import os
+import urllib.request
+
+import pytest
+from eth_account import Account
+from web3 import EthereumTesterProvider, Web3
+
+from nftflex import instrumentation
+from nftflex.instrumentation import Instrumentation
+
+
+"""
+Variables
+"""
+abi_path = os.path.join(os.path.dirname(__file__), "..", "abis", "NFTFlex_ABI.json")
+rental_id = 3
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture
+def w3():
+    return Web3(EthereumTesterProvider())
+
+@pytest.fixture
+def nft_flex_abi():
+    with open(abi_path, "r") as file:
+        return json.load(file)
+
+@pytest.fixture
+def tracer(tmp_path, nft_flex_abi):
+    tracer = Instrumentation(str(tmp_path / "trace.jsonl"))
+    tracer.register_contract("NFTFlex", nft_flex_abi)
+    yield tracer
+    tracer.close()
+
+
+def send_withdraw_earnings(w3, nft_flex_abi):
+    """Signs and sends withdrawEarnings(rental_id) to a contract-less address, which simply succeeds."""
+    sender = Account.create()
+    w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": sender.address, "value": 10**18})
+
+    nft_flex = w3.eth.contract(address=w3.eth.accounts[1], abi=nft_flex_abi)
+    tx = nft_flex.functions.withdrawEarnings(rental_id).build_transaction(
+        {"from": sender.address, "nonce": 0, "chainId": w3.eth.chain_id}
+    )
+    tx_hash = w3.eth.send_raw_transaction(sender.sign_transaction(tx).raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+"""
+Testing begins
+"""
+
+def test_off_by_default_leaves_provider_untouched(w3, monkeypatch):
+    monkeypatch.delenv(instrumentation.ENV_TRACE, raising=False)
+    monkeypatch.delenv(instrumentation.ENV_METRICS_PORT, raising=False)
+
+    assert instrumentation.from_env() is None
+    make_request = w3.provider.make_request
+    assert instrumentation.instrument(w3) is w3
+    assert w3.provider.make_request == make_request
+    with instrumentation.span("deploy"):
+        pass
+
+
+def test_records_methods_functions_gas_and_receipts(w3, nft_flex_abi, tracer):
+    tracer.instrument(w3)
+    with tracer.span("seed"):
+        receipt = send_withdraw_earnings(w3, nft_flex_abi)
+
+    assert tracer.methods["eth_sendRawTransaction"].count == 1
+    assert tracer.methods["eth_getTransactionReceipt"].count >= 1
+    assert tracer.methods["eth_chainId"].count >= 1
+
+    stats = tracer.functions["NFTFlex.withdrawEarnings"]
+    assert stats.transactions == 1
+    assert stats.gas_used == receipt.gasUsed
+    assert stats.time_to_receipt.count == 1
+    assert stats.reverted == 0
+
+    span = tracer.spans["seed"]
+    assert span["count"] == 1
+    assert 0 < span["rpc"] <= span["wall"]
+
+    assert stats.latency.count >= 2  # eth_estimateGas and eth_sendRawTransaction
+    assert stats.latency.sum <= tracer.methods["eth_sendRawTransaction"].sum + tracer.methods["eth_estimateGas"].sum
+
+    summary = tracer.summary()
+    assert "NFTFlex.withdrawEarnings" in summary
+    assert "eth_sendRawTransaction" in summary
+    assert "rpc p95" in summary
+
+    tracer.close()
+    with open(tracer.trace_path, "r") as file:
+        events = [json.loads(line) for line in file]
+    assert {"rpc", "receipt", "span"} <= {event["type"] for event in events}
+    receipt_event = next(event for event in events if event["type"] == "receipt")
+    assert receipt_event["function"] == "NFTFlex.withdrawEarnings"
+    assert receipt_event["gasUsed"] == receipt.gasUsed
+
+
+def test_prometheus_endpoint(w3, nft_flex_abi, tracer):
+    tracer.instrument(w3)
+    send_withdraw_earnings(w3, nft_flex_abi)
+
+    server = tracer.serve_metrics(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    body = urllib.request.urlopen(url).read().decode()
+
+    assert 'nftflex_rpc_request_duration_seconds_count{method="eth_sendRawTransaction"} 1' in body
+    assert 'nftflex_rpc_request_duration_seconds_bucket{method="eth_sendRawTransaction",le="+Inf"} 1' in body
+    assert 'nftflex_contract_transactions_total{function="NFTFlex.withdrawEarnings"} 1' in body
+    assert 'nftflex_transaction_time_to_receipt_seconds_count{function="NFTFlex.withdrawEarnings"} 1' in body
+    calls = tracer.functions["NFTFlex.withdrawEarnings"].latency.count
+    assert f'nftflex_contract_call_duration_seconds_count{{function="NFTFlex.withdrawEarnings"}} {calls}' in body
+    assert 'nftflex_contract_call_duration_seconds_bucket{function="NFTFlex.withdrawEarnings",le="+Inf"}' in body
+
+
+def test_instrumenting_after_first_request_records_web3_requests(w3, tracer):
+    """web3.py builds its request chain on the first request; instrumenting later must still see requests."""
+    assert w3.eth.chain_id
+    tracer.instrument(w3)
+
+    w3.eth.block_number
+    assert tracer.methods["eth_blockNumber"].count == 1
+
+
+def test_unknown_web3_version_leaves_request_cache_alone(w3, tracer, monkeypatch):
+    """The private request cache is only reset on web3.py versions known to keep it that way."""
+    monkeypatch.setattr(instrumentation, "_web3_major", lambda: 99)
+    assert w3.eth.chain_id
+    cache = w3.provider._request_func_cache
+
+    with pytest.warns(RuntimeWarning, match="instrument providers before their first request"):
+        tracer.instrument(w3)
+    assert w3.provider._request_func_cache is cache
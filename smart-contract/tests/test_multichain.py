@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from web3 import Web3
+
+from nftflex import seed
+from nftflex.anvil import anvil_available, start_anvil, stop_anvil
+from nftflex.multichain import MANIFEST_PATH, deploy_all, load_networks
+from nftflex.registry import load_registry, update_registry
+
+
+"""
+Testing begins
+"""
+
+def test_update_registry_keeps_other_chains(tmp_path):
+    """Deploying to one chain must not drop the addresses of the others."""
+    path = str(tmp_path / "contract_addresses.json")
+    update_registry(path, {31337: {"network": "local", "NFTFlex": "0x1"}})
+    update_registry(path, {80002: {"network": "polygon-amoy", "NFTFlex": "0x2"}})
+
+    registry = update_registry(path, {31337: {"network": "local", "NFTFlex": "0x3"}})
+
+    assert registry == {
+        "31337": {"network": "local", "NFTFlex": "0x3"},
+        "80002": {"network": "polygon-amoy", "NFTFlex": "0x2"},
+    }
+    assert load_registry(path) == registry
+
+
+def test_load_registry_drops_single_network_format(tmp_path):
+    """The old {"network": ..., "NFTFlex": ...} file has no chain ID to index by."""
+    path = tmp_path / "contract_addresses.json"
+    path.write_text('{"network": "local", "SimpleNFT": "0x1", "NFTFlex": "0x2"}')
+
+    assert load_registry(str(path)) == {}
+
+
+def test_load_networks_skips_unset_and_empty_urls(tmp_path, monkeypatch):
+    """`VAR=` in .env expands to an empty URL, which must be skipped like an unset one."""
+    path = tmp_path / "deploy_networks.json"
+    path.write_text(
+        '{"networks": ['
+        '{"name": "local", "rpc_url": "http://127.0.0.1:8545"},'
+        '{"name": "sepolia", "rpc_url": "${SEPOLIA_RPC_URL}"},'
+        '{"name": "polygon-amoy", "rpc_url": "${POLYGON_AMOY_RPC_URL}"},'
+        '{"name": "bsc-testnet", "rpc_url": "${BSC_TESTNET_RPC_URL}"}]}'
+    )
+    monkeypatch.setenv("SEPOLIA_RPC_URL", "")
+    monkeypatch.setenv("POLYGON_AMOY_RPC_URL", "   ")
+    monkeypatch.delenv("BSC_TESTNET_RPC_URL", raising=False)
+
+    assert load_networks(str(path)) == [{"name": "local", "rpc_url": "http://127.0.0.1:8545"}]
+
+    monkeypatch.setenv("SEPOLIA_RPC_URL", " https://sepolia.example ")
+    assert [network["rpc_url"] for network in load_networks(str(path))] == [
+        "http://127.0.0.1:8545",
+        "https://sepolia.example",
+    ]
+
+
+@pytest.mark.skipif(not anvil_available(), reason="anvil is not installed")
+@pytest.mark.skipif(not os.path.exists(MANIFEST_PATH), reason="contracts are not compiled")
+def test_deploy_all_to_several_anvil_chains(tmp_path):
+    """Deploys to two anvil nodes with different chain IDs and checks both are seeded."""
+    chains = {31401: 8601, 31402: 8602}  # chain ID => port
+    nodes = [start_anvil(port, chain_id) for chain_id, port in chains.items()]
+    try:
+        networks = [{"name": f"anvil-{chain_id}", "rpc_url": f"http://127.0.0.1:{port}"} for chain_id, port in chains.items()]
+        registry_path = str(tmp_path / "contract_addresses.json")
+
+        results = deploy_all(networks, registry_path)
+
+        assert all("error" not in result for result in results)
+        registry = load_registry(registry_path)
+        assert sorted(registry) == sorted(str(chain_id) for chain_id in chains)
+
+        for chain_id, port in chains.items():
+            w3 = Web3(Web3.HTTPProvider(f"http://127.0.0.1:{port}"))
+            entry = registry[str(chain_id)]
+            assert entry["network"] == f"anvil-{chain_id}"
+            assert w3.eth.get_code(entry["NFTFlex"]) != b""
+            assert 0 < entry["NFTFlexDeployBlock"] <= w3.eth.block_number
+            # getRentalCounter() selector
+            counter = w3.eth.call({"to": entry["NFTFlex"], "data": Web3.keccak(text="getRentalCounter()")[:4]})
+            assert int.from_bytes(counter, "big") == len(seed.metadata_urls)
+    finally:
+        for node in nodes:
+            stop_anvil(node)
@@ -0,0 +1,67 @@
+import xml.etree.ElementTree as ET
+
+from nftflex.sharding import format_speedup, merge_junit_reports, partition
+
+
+"""
+Testing begins
+"""
+
+def test_partition_spreads_each_file_over_all_shards():
+    """Tests from one file must not all land in the same shard."""
+    test_ids = [f"tests/test_a.py::test_{i}" for i in range(4)] + [f"tests/test_b.py::test_{i}" for i in range(4)]
+
+    groups = partition(test_ids, 4)
+
+    assert len(groups) == 4
+    assert sorted(sum(groups, [])) == sorted(test_ids)
+    for group in groups:
+        assert len(group) == 2
+        assert any("test_a.py" in test_id for test_id in group)
+
+
+def test_partition_never_returns_empty_shards():
+    """Asking for more shards than tests gives one shard per test."""
+    assert partition(["tests/test_a.py::test_0", "tests/test_a.py::test_1"], 8) == [
+        ["tests/test_a.py::test_0"],
+        ["tests/test_a.py::test_1"],
+    ]
+
+
+def test_merge_junit_reports_sums_shard_totals(tmp_path):
+    """The merged report holds every shard's suite and the summed counters."""
+    shard_reports = []
+    for index, (tests, failures) in enumerate([(3, 0), (2, 1)]):
+        path = tmp_path / f"shard-{index}.xml"
+        path.write_text(
+            f'<testsuites><testsuite name="pytest" tests="{tests}" failures="{failures}" '
+            f'errors="0" skipped="0" time="1.5"></testsuite></testsuites>'
+        )
+        shard_reports.append(str(path))
+
+    totals = merge_junit_reports(shard_reports, str(tmp_path / "merged.xml"))
+
+    assert totals == {"tests": 5, "failures": 1, "errors": 0, "skipped": 0}
+    merged = (tmp_path / "merged.xml").read_text()
+    assert merged.count("<testsuite ") == 2
+    assert 'time="3.000"' in merged
+
+
+def test_merge_junit_reports_records_error_for_shard_without_report(tmp_path):
+    """A shard that crashed before writing its report must show up as an error, not vanish."""
+    passing = tmp_path / "shard-0.xml"
+    passing.write_text('<testsuite name="pytest" tests="3" failures="0" errors="0" skipped="0" time="1.0"></testsuite>')
+
+    totals = merge_junit_reports([str(passing), str(tmp_path / "shard-1.xml")], str(tmp_path / "merged.xml"))
+
+    assert totals == {"tests": 4, "failures": 0, "errors": 1, "skipped": 0}
+    root = ET.parse(tmp_path / "merged.xml").getroot()
+    assert root.get("errors") == "1"
+    missing = root.findall("testsuite")[1]
+    assert missing.get("name") == "shard-1"
+    assert missing.find("testcase/error").get("message") == "shard-1 wrote no JUnit report"
+
+
+def test_format_speedup_compares_against_single_process():
+    """The speedup is the single-process wall-clock time over the sharded one."""
+    assert format_speedup(120.0, 40.0, 4) == "Speedup: 3.0x with 4 shards (75% parallel efficiency)"
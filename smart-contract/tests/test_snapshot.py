@@ -0,0 +1,229 @@
+import threading
+from dataclasses import replace
+
+import pytest
+from eth_utils import to_checksum_address
+from starlette.testclient import TestClient
+
+from nftflex.api import create_app
+from nftflex.indexer import ZERO_ADDRESS, Rental, RentalIndex
+from nftflex import snapshot as snapshot_module
+from nftflex.snapshot import Snapshot, SnapshotError, load_index, write_snapshot
+
+
+"""
+Variables
+"""
+owner = to_checksum_address("0x00000000000000000000000000000000000000aa")
+other_owner = to_checksum_address("0x00000000000000000000000000000000000000bb")
+renter = to_checksum_address("0x00000000000000000000000000000000000000cc")
+token = to_checksum_address("0x00000000000000000000000000000000000000dd")
+
+
+def make_rental(rental_id, rented=False, price=10**18):
+    return Rental(
+        rentalId=rental_id,
+        nftAddress=token,
+        tokenId=2**200 + rental_id,
+        owner=owner,
+        renter=renter if rented else ZERO_ADDRESS,
+        startTime=1_000 if rented else 0,
+        endTime=1_000 + 3600 * (rental_id + 1) if rented else 0,
+        pricePerHour=price,
+        isFractional=rental_id % 2 == 1,
+        collateralToken=token if rental_id % 3 == 0 else ZERO_ADDRESS,
+        collateralAmount=2 * 10**18,
+        pendingWithdrawal=rented,
+    )
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture
+def index():
+    index = RentalIndex()
+    rentals = [make_rental(i, rented=i % 2 == 0, price=(10 - i) * 10**17) for i in range(10)]
+    index.apply(reversed(rentals), block_number=42, block_hash="0x" + "ab" * 32, block_timestamp=1_700_000_000)
+    return index
+
+@pytest.fixture
+def snapshot_path(tmp_path, index):
+    path = str(tmp_path / "rentals.snapshot")
+    write_snapshot(path, index)
+    return path
+
+
+"""
+Testing begins
+"""
+
+def test_snapshot_round_trips_every_rental(index, snapshot_path):
+    loaded = load_index(snapshot_path)
+
+    assert (loaded.block_number, loaded.block_hash) == (42, "0x" + "ab" * 32)
+    assert (loaded.modified_block, loaded.modified_timestamp) == (42, 1_700_000_000)
+    assert len(loaded.rentals) == 10
+    assert list(loaded.rentals) == list(range(10))
+    assert all(loaded.rentals[i] == index.rentals[i] for i in range(10))
+    assert loaded.rentals.get(10) is None
+
+
+def test_catching_up_shadows_snapshot_rows(snapshot_path):
+    index = load_index(snapshot_path)
+
+    updates = [make_rental(3, rented=True), make_rental(4, rented=True, price=6 * 10**17), make_rental(10, price=1)]
+    changed = index.apply(updates, 43, "0x43", 1)
+
+    assert [rental.rentalId for rental in changed] == [3, 10]  # Rental 4 was already rented
+    assert index.rentals[3].renter == renter
+    assert len(index.rentals) == 11
+    assert list(index.rentals)[-1] == 10
+
+    rentals, _ = index.query(sort="pricePerHour", limit=3)
+    assert [rental.rentalId for rental in rentals] == [10, 9, 8]
+    assert [rental.rentalId for rental in index.query(available=False, limit=20)[0]] == [0, 2, 3, 4, 6, 8]
+
+
+def test_rewriting_a_loaded_snapshot_keeps_changes(tmp_path, snapshot_path):
+    index = load_index(snapshot_path)
+    index.apply([make_rental(1, rented=True), make_rental(10)], 50, "0x" + "cd" * 32, 2)
+
+    path = str(tmp_path / "next.snapshot")
+    write_snapshot(path, index)
+    reloaded = load_index(path)
+
+    assert reloaded.block_number == 50
+    assert [reloaded.rentals[i] for i in range(11)] == [index.rentals[i] for i in range(11)]
+
+
+def test_snapshot_keeps_last_modified_block_apart_from_synced_block(tmp_path, index):
+    """Blocks that change no rental move block_number only; ETag and Last-Modified must survive a restart."""
+    index.apply([make_rental(1, rented=True)], 45, "0x45", 1_700_000_036)
+    index.apply([make_rental(1, rented=True)], 60, "0x" + "60" * 32, 1_700_000_216)  # Nothing changed
+    before = TestClient(create_app(index)).get("/rentals")
+
+    path = str(tmp_path / "rentals.snapshot")
+    write_snapshot(path, index)
+    loaded = load_index(path)
+
+    assert (loaded.block_number, loaded.modified_block, loaded.modified_timestamp) == (60, 45, 1_700_000_036)
+    after = TestClient(create_app(loaded)).get("/rentals")
+    assert after.headers["etag"] == before.headers["etag"]
+    assert after.headers["last-modified"] == before.headers["last-modified"]
+
+
+def test_snapshot_keeps_plan_membership(tmp_path, index):
+    index.apply([replace(make_rental(3), inPlan=True)], 43, "0x43", 1)
+
+    path = str(tmp_path / "rentals.snapshot")
+    write_snapshot(path, index)
+    loaded = load_index(path)
+
+    assert loaded.rentals[3].inPlan and not loaded.rentals[5].inPlan
+    assert [rental.rentalId for rental in loaded.query(available=True)[0]] == [1, 5, 7, 9]
+
+
+def test_filtered_queries_read_the_columns(tmp_path, monkeypatch):
+    """Owner, collateral and availability filters must match a plain index without decoding every row."""
+    rentals = [
+        replace(make_rental(i, rented=i % 3 == 0, price=(i * 7919) % 100 + 1), owner=owner if i % 4 else other_owner)
+        for i in range(200)
+    ]
+    plain = RentalIndex()
+    plain.apply(rentals, 42, "0x42", 1)
+    path = str(tmp_path / "rentals.snapshot")
+    write_snapshot(path, plain)
+    loaded = load_index(path)
+
+    # Change rows after loading: a new owner, a return, a plan, and a new rental
+    updates = [
+        replace(make_rental(1, price=5), owner=other_owner),
+        make_rental(3, price=3),
+        replace(make_rental(5), inPlan=True),
+        replace(make_rental(200, rented=True), owner=other_owner),
+    ]
+    plain.apply(updates, 43, "0x43", 2)
+    loaded.apply(updates, 43, "0x43", 2)
+
+    decoded = []
+    decode = Snapshot.rental
+    monkeypatch.setattr(Snapshot, "rental", lambda self, position: decoded.append(position) or decode(self, position))
+
+    for filters in (
+        {"owner": other_owner},
+        {"owner": owner.upper().replace("0X", "0x"), "available": True},
+        {"collateral_token": token},
+        {"collateral_token": ZERO_ADDRESS, "available": False},
+        {"available": True},
+        {"owner": other_owner, "collateral_token": token, "available": False},
+    ):
+        for sort in ("rentalId", "pricePerHour", "endTime"):
+            decoded.clear()
+            expected = [rental.rentalId for rental in plain.query(sort=sort, limit=500, **filters)[0]]
+            assert [rental.rentalId for rental in loaded.query(sort=sort, limit=5, **filters)[0]] == expected[:5]
+            assert len(decoded) <= 6  # The page, and the next rental to know there is another page
+            assert [rental.rentalId for rental in loaded.query(sort=sort, limit=500, **filters)[0]] == expected
+
+
+def test_writing_moves_the_index_onto_the_new_snapshot(tmp_path, snapshot_path):
+    index = load_index(snapshot_path)
+    index.apply([make_rental(1, rented=True), make_rental(10)], 50, "0x" + "cd" * 32, 2)
+    assert len(index.rentals._changed) == 2
+
+    write_snapshot(str(tmp_path / "next.snapshot"), index)
+
+    assert index.rentals._changed == {}
+    assert len(index.rentals) == 11
+    assert index.rentals[1].renter == renter
+    assert [rental.rentalId for rental in index.query(available=False, limit=20)[0]] == [0, 1, 2, 4, 6, 8]
+
+
+def test_write_does_not_hold_the_index_lock_while_encoding(tmp_path, snapshot_path, monkeypatch):
+    """A block synced while the snapshot is encoded must neither wait for it nor be lost by the rebase."""
+    index = load_index(snapshot_path)
+    index.apply([make_rental(1, rented=True)], 50, "0x50", 2)
+    build_columns = snapshot_module._build_columns
+
+    def build_while_syncing(rentals):
+        sync = threading.Thread(target=index.apply, args=([make_rental(3, rented=True)], 51, "0x51", 3))
+        sync.start()
+        sync.join(timeout=5)
+        assert not sync.is_alive()
+        return build_columns(rentals)
+
+    monkeypatch.setattr(snapshot_module, "_build_columns", build_while_syncing)
+    path = str(tmp_path / "next.snapshot")
+    write_snapshot(path, index)
+
+    assert load_index(path).block_number == 50
+    assert index.block_number == 51
+    assert list(index.rentals._changed) == [3]
+    assert index.rentals[1].renter == index.rentals[3].renter == renter
+
+
+def test_api_serves_a_loaded_snapshot(snapshot_path):
+    client = TestClient(create_app(load_index(snapshot_path)))
+    body = client.get("/rentals", params={"sort": "pricePerHour", "order": "desc", "limit": 2}).json()
+
+    assert body["block"] == 42
+    assert [rental["rentalId"] for rental in body["rentals"]] == [0, 1]
+    assert body["rentals"][0]["tokenId"] == str(2**200)
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path, snapshot_path):
+    garbage = tmp_path / "garbage"
+    garbage.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(SnapshotError):
+        Snapshot(str(garbage))
+
+    for size in (0, 10):
+        short = tmp_path / f"short-{size}"
+        short.write_bytes(open(snapshot_path, "rb").read()[:size])
+        with pytest.raises(SnapshotError):
+            Snapshot(str(short))
+
+    truncated = tmp_path / "truncated"
+    truncated.write_bytes(open(snapshot_path, "rb").read()[:-1])
+    with pytest.raises(SnapshotError):
+        Snapshot(str(truncated))
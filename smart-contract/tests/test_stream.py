@@ -0,0 +1,148 @@
+import json
+import sys
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+from nftflex.indexer import ZERO_ADDRESS, Rental, RentalIndex
+from nftflex.stream import DeltaLog, RentalStream, create_app
+
+
+"""
+Variables
+"""
+owner = "0x00000000000000000000000000000000000000aa"
+renter = "0x00000000000000000000000000000000000000cc"
+token = "0x00000000000000000000000000000000000000dd"
+
+
+def make_rental(rental_id, rented=False):
+    return Rental(
+        rentalId=rental_id,
+        nftAddress=token,
+        tokenId=rental_id + 1,
+        owner=owner,
+        renter=renter if rented else ZERO_ADDRESS,
+        startTime=1_000 if rented else 0,
+        endTime=1_000 + 3600 if rented else 0,
+        pricePerHour=10**18,
+        isFractional=False,
+        collateralToken=ZERO_ADDRESS,
+        collateralAmount=2 * 10**18,
+        pendingWithdrawal=rented,
+    )
+
+
+"""
+Setup for testing
+"""
+@pytest.fixture
+def index():
+    index = RentalIndex()
+    index.apply([make_rental(i) for i in range(3)], block_number=5, block_hash="0x05", block_timestamp=1_700_000_000)
+    return index
+
+
+"""
+Testing begins
+"""
+
+def test_new_client_gets_snapshot_then_changed_fields_only(index):
+    with TestClient(create_app(index)) as client:
+        with client.websocket_connect("/ws") as websocket:
+            snapshot = websocket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["block"] == 5
+            assert [rental["rentalId"] for rental in snapshot["rentals"]] == [0, 1, 2]
+
+            index.apply([make_rental(1, rented=True)], 6, "0x06", 1_700_000_012)
+            delta = websocket.receive_json()
+            assert delta == {
+                "type": "delta",
+                "block": 6,
+                "rentalId": 1,
+                "changes": {"renter": renter, "startTime": 1_000, "endTime": 4_600, "pendingWithdrawal": True},
+            }
+
+            index.apply([make_rental(3)], 7, "0x07", 1_700_000_024)
+            delta = websocket.receive_json()
+            assert delta["rentalId"] == 3
+            assert delta["changes"]["owner"] == owner
+            assert delta["changes"]["pricePerHour"] == str(10**18)
+
+
+def test_reconnecting_client_resumes_from_block(index):
+    with TestClient(create_app(index)) as client:
+        index.apply([make_rental(0, rented=True)], 6, "0x06", 1_700_000_012)
+        index.apply([make_rental(2, rented=True)], 8, "0x08", 1_700_000_024)
+
+        with client.websocket_connect("/ws?fromBlock=6") as websocket:
+            delta = websocket.receive_json()
+            assert (delta["type"], delta["block"], delta["rentalId"]) == ("delta", 8, 2)
+
+            index.apply([make_rental(2)], 9, "0x09", 1_700_000_036)
+            delta = websocket.receive_json()
+            assert (delta["block"], delta["rentalId"]) == (9, 2)
+            assert delta["changes"]["renter"] == ZERO_ADDRESS
+
+
+def test_resume_point_older_than_retention_gets_snapshot(index):
+    with TestClient(create_app(index, retention=2)) as client:
+        for block, rental_id in ((6, 0), (7, 1), (8, 2)):
+            index.apply([make_rental(rental_id, rented=True)], block, hex(block), 1_700_000_000 + block)
+
+        with client.websocket_connect("/ws?fromBlock=5") as websocket:
+            snapshot = websocket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["block"] == 8
+            assert all(rental["renter"] == renter for rental in snapshot["rentals"])
+
+
+def test_resume_point_older_than_the_stream_gets_snapshot(index):
+    """Blocks indexed before the stream started have no deltas, so resuming from one needs a snapshot."""
+    with TestClient(create_app(index)) as client:
+        with client.websocket_connect("/ws?fromBlock=2") as websocket:
+            snapshot = websocket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["block"] == 5
+            assert [rental["rentalId"] for rental in snapshot["rentals"]] == [0, 1, 2]
+
+
+def test_snapshot_is_consistent_while_syncing(index):
+    """Snapshots taken while the sync thread applies blocks must hold exactly the rentals of their block."""
+    stream = RentalStream(index)
+    last_block = 2_000
+
+    def sync():
+        # Every block adds one rental, so block N has N - 2 rentals
+        for block in range(6, last_block + 1):
+            index.apply([make_rental(block - 3)], block, hex(block), 1_700_000_000 + block)
+
+    # Switch threads as often as possible, so the sync thread runs in the middle of a snapshot
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        thread = threading.Thread(target=sync)
+        thread.start()
+        while thread.is_alive():
+            snapshot = json.loads(stream.snapshot())
+            assert len(snapshot["rentals"]) == snapshot["block"] - 2
+        thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert json.loads(stream.snapshot())["block"] == last_block
+
+
+def test_delta_log_truncation():
+    log = DeltaLog(retention=3)
+    log.append(1, ["a", "b"])
+    log.append(2, ["c"])
+    assert log.since(0) == ["a", "b", "c"]
+
+    log.append(3, ["d", "e"])
+    assert log.since(0) is None
+    assert log.since(1) == ["c", "d", "e"]
+    assert log.since(2) == ["d", "e"]
+    assert log.since(3) == []